@@ -0,0 +1,154 @@
+import os
+import json
+import time
+import fcntl
+import zipfile
+import contextlib
+from django.conf import settings
+from . import conversion_cache
+
+STATUS_FILENAME = 'status.json'
+LOCK_FILENAME = '.lock'
+MANIFEST_FILENAME = 'manifest.json'
+
+
+def batch_dir(batch_id: str) -> str:
+    return os.path.join(settings.MEDIA_ROOT, 'converted', batch_id)
+
+
+def archive_filename(batch_id: str) -> str:
+    return f"{batch_id}__ids_batch.zip"
+
+
+def create(batch_id: str, workbooks: list) -> dict:
+    """
+    배치 디렉토리와 상태 파일 생성
+    workbooks: [{'name', 'folder', 'excel_name', 'hash', 'duplicate_of'}] (업로드 순서)
+    deadline: 이 시각(IDS_BATCH_TIMEOUT_SECONDS 후)까지 끝나지 않은 워크북은 expire 에서 실패로 기록
+    """
+    directory = batch_dir(batch_id)
+    os.makedirs(directory, exist_ok=True)
+    status = {
+        'batch_id': batch_id,
+        'total': len(workbooks),
+        'completed': 0,
+        'filename': archive_filename(batch_id),
+        'file_path': os.path.join(directory, archive_filename(batch_id)),
+        'workbooks': [dict(workbook, status='PENDING') for workbook in workbooks],
+        'deadline': time.time() + settings.IDS_BATCH_TIMEOUT_SECONDS,
+    }
+    with _locked(directory):
+        _write_status(directory, status)
+    return status
+
+
+def add_result(batch_id: str, workbook_hash: str, excel_name: str, documents: list = None, error: str = None,
+               cache_hit: bool = False, on_update=None) -> dict:
+    """
+    변환이 끝난 워크북(같은 해시의 중복 워크북 포함)의 IDS 파일을 배치 아카이브에 추가하고 상태 갱신
+    여러 워커가 동시에 기록하므로 배치 디렉토리 잠금 안에서 아카이브와 상태 파일을 수정하며,
+    on_update(status)도 잠금 안에서 호출하여 진행 상태가 순서대로 등록되도록 함
+    마지막 워크북이 끝나면 manifest.json을 추가하고 아카이브를 최종 파일명으로 rename
+    이미 끝난 배치(expire 로 기한 초과 처리된 배치 포함)에 늦게 도착한 결과는 무시
+    """
+    directory = batch_dir(batch_id)
+    with _locked(directory):
+        status = _read_status(directory)
+        if status['completed'] == status['total']:
+            return status
+        partial_path = status['file_path'] + '.part'
+        with zipfile.ZipFile(partial_path, 'a', compression=zipfile.ZIP_DEFLATED) as archive:
+            for workbook in status['workbooks']:
+                if workbook['hash'] != workbook_hash or workbook['status'] != 'PENDING':
+                    continue
+                if error is not None:
+                    workbook['status'] = 'FAILURE'
+                    workbook['error'] = error
+                else:
+                    files = []
+                    for document in conversion_cache.rename_documents(documents, excel_name, workbook['excel_name']):
+                        arcname = workbook['folder'] + '/' + document['filename']
+                        with archive.open(arcname, 'w') as entry:
+                            entry.write(document['content'])
+                        files.append({'filename': arcname, 'specification_count': document['specification_count']})
+                    workbook['status'] = 'SUCCESS'
+                    workbook['files'] = files
+                    workbook['cache_hit'] = cache_hit
+                status['completed'] += 1
+
+            if status['completed'] == status['total']:
+                archive.writestr(MANIFEST_FILENAME, json.dumps(_manifest(status), ensure_ascii=False, indent=2))
+
+        if status['completed'] == status['total']:
+            os.replace(partial_path, status['file_path'])
+        _write_status(directory, status)
+        if on_update is not None:
+            on_update(status)
+    return status
+
+
+def expire(batch_id: str, on_update=None) -> bool:
+    """
+    기한(deadline)이 지나도록 결과가 오지 않은 워크북(유실된 태스크 등)을 실패로 기록하고 배치 아카이브 완료
+    (manifest.json 추가 후 최종 파일명으로 rename, on_update(status) 호출)
+    배치 상태 조회 시 호출되며, 기한 전이거나 이미 끝난 배치는 변경하지 않음
+    반환값: 이번 호출에서 배치를 완료했는지 여부
+    """
+    directory = batch_dir(batch_id)
+    if not os.path.exists(os.path.join(directory, STATUS_FILENAME)):
+        return False
+    with _locked(directory):
+        status = _read_status(directory)
+        deadline = status.get('deadline')
+        if status['completed'] == status['total'] or deadline is None or time.time() < deadline:
+            return False
+        for workbook in status['workbooks']:
+            if workbook['status'] == 'PENDING':
+                workbook['status'] = 'FAILURE'
+                workbook['error'] = f'배치 변환 시간이 초과되었습니다. ({settings.IDS_BATCH_TIMEOUT_SECONDS}초)'
+                status['completed'] += 1
+
+        partial_path = status['file_path'] + '.part'
+        with zipfile.ZipFile(partial_path, 'a', compression=zipfile.ZIP_DEFLATED) as archive:
+            archive.writestr(MANIFEST_FILENAME, json.dumps(_manifest(status), ensure_ascii=False, indent=2))
+        os.replace(partial_path, status['file_path'])
+        _write_status(directory, status)
+        if on_update is not None:
+            on_update(status)
+    return True
+
+
+def _manifest(status: dict) -> dict:
+    return {
+        'total_workbooks': status['total'],
+        'failed_workbooks': sum(1 for workbook in status['workbooks'] if workbook['status'] == 'FAILURE'),
+        'total_specifications': sum(
+            file['specification_count'] for workbook in status['workbooks'] for file in workbook.get('files', [])
+        ),
+        'workbooks': [
+            {key: workbook[key] for key in ('name', 'status', 'duplicate_of', 'files', 'error') if key in workbook}
+            for workbook in status['workbooks']
+        ],
+    }
+
+
+@contextlib.contextmanager
+def _locked(directory: str):
+    with open(os.path.join(directory, LOCK_FILENAME), 'w') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def _read_status(directory: str) -> dict:
+    with open(os.path.join(directory, STATUS_FILENAME), 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _write_status(directory: str, status: dict) -> None:
+    partial_path = os.path.join(directory, STATUS_FILENAME + '.part')
+    with open(partial_path, 'w', encoding='utf-8') as f:
+        json.dump(status, f, ensure_ascii=False)
+    os.replace(partial_path, os.path.join(directory, STATUS_FILENAME))
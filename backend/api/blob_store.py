@@ -0,0 +1,257 @@
+import os
+import re
+import json
+import time
+import uuid
+import fcntl
+import shutil
+import logging
+import contextlib
+from django.conf import settings
+from . import upload_spool
+
+logger = logging.getLogger(__name__)
+
+LOCK_FILENAME = '.lock'
+INDEX_FILENAME = '.index.json'
+CHECKOUT_DIRNAME = '.checkout'
+METADATA_SUFFIX = '.json'
+
+_SHA256 = re.compile(r'[0-9a-f]{64}')
+
+
+def is_hash(digest) -> bool:
+    return isinstance(digest, str) and _SHA256.fullmatch(digest) is not None
+
+
+def blob_path(digest: str) -> str:
+    """
+    SHA-256 해시로 저장된 파일 경로 (store/<해시 앞 2자리>/<해시>)
+    """
+    if not is_hash(digest):
+        raise FileNotFoundError('파일을 찾을 수 없습니다.')
+    return os.path.join(settings.IDS_BLOB_STORE_DIR, digest[:2], digest)
+
+
+def lookup(digest: str, touch: bool = False):
+    """
+    해시로 저장된 파일 조회 ("이미 있는 파일인가?"), 있으면 {'hash', 'size'}, 없으면 None
+    잠금과 메타데이터 기록 없이 읽기만 하고, touch 면 파일 수정 시각만 갱신하여 LRU 순서에 반영 (HEAD 조회는 갱신 없음)
+    """
+    if not is_hash(digest):
+        return None
+    metadata = _read_metadata(digest)
+    if metadata is None:
+        return None
+    if touch:
+        try:
+            os.utime(blob_path(digest))
+        except OSError:
+            return None
+    return {'hash': digest, 'size': metadata['size']}
+
+
+def put(upload: dict, filename: str) -> dict:
+    """
+    스풀된 업로드를 해시 기준으로 저장하고 태스크 입력 참조 획득 (acquire 참조)
+    같은 내용의 파일은 한 번만 저장하고 중복 업로드의 스풀은 삭제
+    저장소 전체 크기는 인덱스 파일에 누적하고, IDS_BLOB_STORE_MAX_BYTES 를 넘을 때만 참조되지 않은 파일부터 LRU 제거
+    """
+    digest = upload['hash']
+    path = blob_path(digest)
+    with _locked():
+        metadata = _read_metadata(digest)
+        if metadata is None:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            shutil.move(upload['path'], path)
+            metadata = {'hash': digest, 'size': upload['size'], 'created': time.time(), 'leases': {}}
+            total_size = _add_total_size(upload['size'])
+            logger.info(f"파일 저장소 추가: {digest} ({upload['size']} bytes)")
+        else:
+            total_size = _total_size()
+            logger.info(f"파일 저장소 중복 업로드 재사용: {digest}")
+        reference = _lease(metadata, filename)
+        _remove_stale_checkouts()
+    upload_spool.release(upload)
+    if total_size > settings.IDS_BLOB_STORE_MAX_BYTES:
+        evict(settings.IDS_BLOB_STORE_MAX_BYTES)
+    return reference
+
+
+def acquire(digest: str, filename: str) -> dict:
+    """
+    태스크 입력으로 사용할 파일의 참조 획득 (참조가 남아 있는 동안 LRU 제거 대상에서 제외)
+    {'hash', 'size', 'filename', 'lease'} 반환 (Celery 태스크에는 파일 대신 이 참조만 전달), 없으면 FileNotFoundError
+    태스크가 실행되지 못해 반환되지 않은 참조는 IDS_BLOB_LEASE_SECONDS 후 만료
+    """
+    with _locked():
+        metadata = _read_metadata(digest) if is_hash(digest) else None
+        if metadata is None:
+            raise FileNotFoundError('파일을 찾을 수 없습니다. 파일을 다시 업로드하세요.')
+        return _lease(metadata, filename)
+
+
+def checkout(reference: dict) -> str:
+    """
+    참조한 파일을 원래 파일명으로 여는 경로 (저장소 파일의 하드 링크, 내용 복사 없음, release 에서 삭제)
+    ifcopenshell 처럼 확장자로 형식을 판단하는 라이브러리를 위해 파일명을 유지하고, 사용 중 LRU 제거되어도 내용이 유지됨
+    """
+    directory = _checkout_dir(reference['lease'])
+    path = os.path.join(directory, reference['filename'])
+    if not os.path.exists(path):
+        os.makedirs(directory, exist_ok=True)
+        try:
+            os.link(blob_path(reference['hash']), path)
+        except FileNotFoundError:
+            raise FileNotFoundError('파일을 찾을 수 없습니다. 파일을 다시 업로드하세요.')
+    return path
+
+
+def release(reference: dict) -> None:
+    """
+    태스크가 끝난 참조 반환 (파일은 다음 요청을 위해 저장소에 남고, 용량 제한을 넘은 상태면 LRU 제거)
+    """
+    shutil.rmtree(_checkout_dir(reference['lease']), ignore_errors=True)
+    with _locked():
+        metadata = _read_metadata(reference['hash'])
+        if metadata is not None and metadata['leases'].pop(reference['lease'], None) is not None:
+            _write_metadata(metadata)
+        total_size = _total_size()
+    if total_size > settings.IDS_BLOB_STORE_MAX_BYTES:
+        evict(settings.IDS_BLOB_STORE_MAX_BYTES)
+
+
+def evict(max_bytes: int) -> None:
+    """
+    저장소 전체 크기가 max_bytes 이하가 될 때까지 참조(만료되지 않은 lease)가 없는 파일을 오래 사용되지 않은 순서로 제거 (LRU)
+    인덱스의 전체 크기가 max_bytes 이하면 메타데이터를 읽지 않고, 넘을 때만 전체 메타데이터를 읽어 제거 후 인덱스를 다시 기록
+    마지막 사용 시각은 참조 획득 시각과 조회(lookup touch) 시각 중 늦은 쪽
+    """
+    with _locked():
+        if _total_size() <= max_bytes:
+            return
+        entries = []
+        total_size = 0
+        now = time.time()
+        for metadata in _scan_metadata():
+            total_size += metadata['size']
+            if not any(expires > now for expires in metadata['leases'].values()):
+                try:
+                    last_used = max(metadata['last_used'], os.stat(blob_path(metadata['hash'])).st_mtime)
+                except OSError:
+                    last_used = metadata['last_used']
+                entries.append((last_used, metadata['size'], metadata['hash']))
+
+        entries.sort()
+        for last_used, size, digest in entries:
+            if total_size <= max_bytes:
+                break
+            path = blob_path(digest)
+            for stale_path in (path + METADATA_SUFFIX, path):
+                try:
+                    os.remove(stale_path)
+                except OSError:
+                    pass
+            total_size -= size
+            logger.info(f"파일 저장소 제거 (LRU): {digest}")
+        _write_total_size(total_size)
+
+
+@contextlib.contextmanager
+def _locked():
+    os.makedirs(settings.IDS_BLOB_STORE_DIR, exist_ok=True)
+    with open(os.path.join(settings.IDS_BLOB_STORE_DIR, LOCK_FILENAME), 'a') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def _lease(metadata: dict, filename: str) -> dict:
+    now = time.time()
+    lease = uuid.uuid4().hex
+    metadata['leases'] = {key: expires for key, expires in metadata['leases'].items() if expires > now}
+    metadata['leases'][lease] = now + settings.IDS_BLOB_LEASE_SECONDS
+    metadata['last_used'] = now
+    _write_metadata(metadata)
+    return {'hash': metadata['hash'], 'size': metadata['size'], 'filename': upload_spool.safe_filename(filename), 'lease': lease}
+
+
+def _checkout_dir(lease: str) -> str:
+    if not re.fullmatch(r'[0-9a-f]{32}', lease or ''):
+        raise ValueError('잘못된 파일 참조입니다.')
+    return os.path.join(settings.IDS_BLOB_STORE_DIR, CHECKOUT_DIRNAME, lease)
+
+
+def _read_metadata(digest: str):
+    try:
+        with open(blob_path(digest) + METADATA_SUFFIX, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_metadata(metadata: dict) -> None:
+    path = blob_path(metadata['hash']) + METADATA_SUFFIX
+    partial_path = path + '.part'
+    with open(partial_path, 'w', encoding='utf-8') as f:
+        json.dump(metadata, f)
+    os.replace(partial_path, path)
+
+
+def _remove_stale_checkouts() -> None:
+    # 반환되지 않은 만료 참조의 하드 링크 정리
+    now = time.time()
+    try:
+        checkouts = list(os.scandir(os.path.join(settings.IDS_BLOB_STORE_DIR, CHECKOUT_DIRNAME)))
+    except OSError:
+        return
+    for entry in checkouts:
+        try:
+            if entry.stat().st_mtime < now - settings.IDS_BLOB_LEASE_SECONDS:
+                shutil.rmtree(entry.path, ignore_errors=True)
+        except OSError:
+            continue
+
+
+def _total_size() -> int:
+    # 인덱스 파일의 저장소 전체 크기 (잠금 안에서 호출, 인덱스가 없거나 읽을 수 없으면 메타데이터를 읽어 다시 생성)
+    try:
+        with open(os.path.join(settings.IDS_BLOB_STORE_DIR, INDEX_FILENAME), 'r', encoding='utf-8') as f:
+            return json.load(f)['total_size']
+    except (OSError, ValueError, KeyError, TypeError):
+        total_size = sum(metadata['size'] for metadata in _scan_metadata())
+        _write_total_size(total_size)
+        return total_size
+
+
+def _add_total_size(size: int) -> int:
+    total_size = _total_size() + size
+    _write_total_size(total_size)
+    return total_size
+
+
+def _write_total_size(total_size: int) -> None:
+    path = os.path.join(settings.IDS_BLOB_STORE_DIR, INDEX_FILENAME)
+    partial_path = path + '.part'
+    with open(partial_path, 'w', encoding='utf-8') as f:
+        json.dump({'total_size': total_size}, f)
+    os.replace(partial_path, path)
+
+
+def _scan_metadata():
+    try:
+        prefixes = [entry.path for entry in os.scandir(settings.IDS_BLOB_STORE_DIR) if entry.is_dir() and not entry.name.startswith('.')]
+    except OSError:
+        return
+    for prefix in prefixes:
+        try:
+            names = os.listdir(prefix)
+        except OSError:
+            continue
+        for name in names:
+            if name.endswith(METADATA_SUFFIX) and is_hash(name[:-len(METADATA_SUFFIX)]):
+                metadata = _read_metadata(name[:-len(METADATA_SUFFIX)])
+                if metadata is not None:
+                    yield metadata
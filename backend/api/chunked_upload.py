@@ -0,0 +1,257 @@
+import os
+import re
+import json
+import time
+import uuid
+import fcntl
+import shutil
+import hashlib
+import logging
+import tempfile
+import contextlib
+from django.conf import settings
+from . import upload_spool, blob_store
+
+logger = logging.getLogger(__name__)
+
+STATUS_FILENAME = 'status.json'
+LOCK_FILENAME = '.lock'
+DATA_FILENAME = 'data.part'
+CHUNK_PREFIX = '.chunk-'
+READ_SIZE = 1024 * 1024
+ALLOWED_EXTENSIONS = ('.ifc', '.ifczip', '.ifc.gz', '.ids', '.xlsx', '.xls')
+
+_UPLOAD_ID = re.compile(r'[0-9a-f]{32}')
+_SHA256 = re.compile(r'[0-9a-f]{64}')
+
+
+def upload_dir(upload_id: str) -> str:
+    if not _UPLOAD_ID.fullmatch(upload_id or ''):
+        raise FileNotFoundError('업로드를 찾을 수 없습니다.')
+    return os.path.join(settings.IDS_CHUNKED_UPLOAD_DIR, upload_id)
+
+
+def init(filename: str, size: int, sha256: str, chunk_size: int = None) -> dict:
+    """
+    청크 업로드 시작: 업로드 디렉토리, 전체 크기로 미리 할당한 데이터 파일과 상태 파일 생성
+    sha256: 파일 전체의 SHA-256 (complete 에서 조립된 파일과 비교)
+    잘못된 요청이면 ValueError
+    """
+    filename = upload_spool.safe_filename(filename or '')
+    if not filename.lower().endswith(ALLOWED_EXTENSIONS):
+        raise ValueError(f"업로드할 수 없는 파일 형식입니다: {filename} ({', '.join(ALLOWED_EXTENSIONS)})")
+    if not isinstance(size, int) or isinstance(size, bool) or size < 0:
+        raise ValueError('파일 크기가 올바르지 않습니다.')
+    if size > settings.IDS_CHUNKED_UPLOAD_MAX_BYTES:
+        raise ValueError(f'파일 크기는 {settings.IDS_CHUNKED_UPLOAD_MAX_BYTES // (1024 * 1024)}MB를 초과할 수 없습니다.')
+    if not isinstance(sha256, str) or not _SHA256.fullmatch(sha256.lower()):
+        raise ValueError('파일 SHA-256 해시가 올바르지 않습니다.')
+    if chunk_size is None:
+        chunk_size = settings.IDS_CHUNKED_UPLOAD_CHUNK_SIZE
+    if not isinstance(chunk_size, int) or isinstance(chunk_size, bool) or not 0 < chunk_size <= settings.IDS_CHUNKED_UPLOAD_MAX_CHUNK_SIZE:
+        raise ValueError(f'청크 크기는 1 ~ {settings.IDS_CHUNKED_UPLOAD_MAX_CHUNK_SIZE} bytes 이어야 합니다.')
+
+    evict_stale(settings.IDS_CHUNKED_UPLOAD_MAX_AGE_SECONDS)
+
+    upload_id = uuid.uuid4().hex
+    directory = upload_dir(upload_id)
+    os.makedirs(directory)
+    with open(os.path.join(directory, DATA_FILENAME), 'wb') as f:
+        f.truncate(size)
+    status = {
+        'upload_id': upload_id,
+        'filename': filename,
+        'size': size,
+        'sha256': sha256.lower(),
+        'chunk_size': chunk_size,
+        'total_chunks': -(-size // chunk_size),
+        'received_chunks': [],
+        'state': 'UPLOADING',
+        'created': time.time(),
+    }
+    with _locked(directory):
+        _write_status(directory, status)
+    logger.info(f"청크 업로드 시작: {upload_id} ({filename}, {size} bytes, 청크 {status['total_chunks']}개)")
+    return status
+
+
+def get_status(upload_id: str) -> dict:
+    """
+    업로드 상태 (받은 청크/남은 청크 목록 포함), 없으면 FileNotFoundError
+    """
+    directory = upload_dir(upload_id)
+    with _locked(directory):
+        return _public_status(_read_status(directory))
+
+
+def write_chunk(upload_id: str, offset: int, sha256: str, stream) -> dict:
+    """
+    offset 위치의 청크를 stream 에서 읽어 청크별 임시 파일에 기록하고 청크 SHA-256 검증 후 데이터 파일의 해당 위치에 복사
+    청크는 chunk_size 경계에서 시작하고 마지막 청크 외에는 chunk_size 크기여야 함, 같은 청크는 다시 보낼 수 있음
+    여러 청크를 동시에 받을 수 있도록 수신은 잠금 밖에서, 검증된 청크의 복사와 받은 청크 목록 갱신만 잠금 안에서 수행
+    검증에 실패한 청크는 데이터 파일에 기록하지 않음 (이미 받은 청크를 잘못 다시 보내도 기존 내용 유지, ValueError)
+    """
+    directory = upload_dir(upload_id)
+    with _locked(directory):
+        status = _read_status(directory)
+    if status['state'] != 'UPLOADING':
+        raise ValueError('이미 완료된 업로드입니다.')
+    if not isinstance(sha256, str) or not _SHA256.fullmatch(sha256.lower()):
+        raise ValueError('청크 SHA-256 해시가 올바르지 않습니다.')
+    if offset < 0 or offset % status['chunk_size'] or offset >= status['size']:
+        raise ValueError(f"청크 위치가 올바르지 않습니다: {offset} (청크 크기 {status['chunk_size']} bytes 단위)")
+    index = offset // status['chunk_size']
+    length = min(status['chunk_size'], status['size'] - offset)
+
+    fd, chunk_path = tempfile.mkstemp(prefix=CHUNK_PREFIX, dir=directory)
+    try:
+        digest = hashlib.sha256()
+        received = 0
+        with os.fdopen(fd, 'wb') as f:
+            while received <= length:
+                data = stream.read(min(READ_SIZE, length + 1 - received))
+                if not data:
+                    break
+                f.write(data[:length - received])
+                digest.update(data)
+                received += len(data)
+        if received != length:
+            raise ValueError(f'청크 크기가 올바르지 않습니다: {received} bytes (필요: {length} bytes)')
+        if digest.hexdigest() != sha256.lower():
+            raise ValueError('청크 해시가 일치하지 않습니다.')
+
+        with _locked(directory):
+            status = _read_status(directory)
+            if status['state'] != 'UPLOADING':
+                raise ValueError('이미 완료된 업로드입니다.')
+            _copy_chunk(chunk_path, os.path.join(directory, DATA_FILENAME), offset)
+            if index not in status['received_chunks']:
+                status['received_chunks'] = sorted(status['received_chunks'] + [index])
+                _write_status(directory, status)
+    finally:
+        try:
+            os.remove(chunk_path)
+        except OSError:
+            pass
+    return _public_status(status)
+
+
+def complete(upload_id: str) -> dict:
+    """
+    모든 청크를 받은 업로드를 완료: 조립된 파일 전체의 SHA-256 을 init 의 해시와 비교한 뒤 파일 저장소로 이동 (같은 내용이 있으면 재사용)
+    완료된 업로드 ID는 Excel→IDS 변환, IDS→Blender Add-on, IFC-IDS 검토 API에서 파일 대신 사용 (claim), 이후에는 해시로도 사용 가능
+    """
+    directory = upload_dir(upload_id)
+    with _locked(directory):
+        status = _read_status(directory)
+        if status['state'] == 'COMPLETE':
+            return _public_status(status)
+        missing = _missing_chunks(status)
+        if missing:
+            raise ValueError(f'받지 못한 청크가 있습니다: {len(missing)}개')
+
+        data_path = os.path.join(directory, DATA_FILENAME)
+        digest = hashlib.sha256()
+        with open(data_path, 'rb') as f:
+            for data in iter(lambda: f.read(READ_SIZE), b''):
+                digest.update(data)
+        if digest.hexdigest() != status['sha256']:
+            raise ValueError('파일 해시가 일치하지 않습니다.')
+
+        status['reference'] = blob_store.put({'path': data_path, 'size': status['size'], 'hash': status['sha256']}, status['filename'])
+        status['state'] = 'COMPLETE'
+        _write_status(directory, status)
+    logger.info(f"청크 업로드 완료: {upload_id} ({status['filename']})")
+    return _public_status(status)
+
+
+def claim(upload_id: str) -> dict:
+    """
+    완료된 업로드의 파일 저장소 참조를 반환하고 업로드 ID 삭제 (업로드 ID는 한 번만 사용 가능, 참조는 태스크가 반환)
+    없으면 FileNotFoundError, 완료되지 않았으면 ValueError
+    """
+    directory = upload_dir(upload_id)
+    with _locked(directory):
+        status = _read_status(directory)
+        if status['state'] != 'COMPLETE':
+            raise ValueError('업로드가 완료되지 않았습니다.')
+        os.remove(os.path.join(directory, STATUS_FILENAME))
+    shutil.rmtree(directory, ignore_errors=True)
+    return status['reference']
+
+
+def evict_stale(max_age_seconds: int) -> None:
+    """
+    max_age_seconds 동안 갱신되지 않은 업로드 제거 (중단된 업로드, 사용되지 않은 완료 업로드의 파일 저장소 참조 반환)
+    """
+    deadline = time.time() - max_age_seconds
+    try:
+        scanned = list(os.scandir(settings.IDS_CHUNKED_UPLOAD_DIR))
+    except OSError:
+        return
+
+    for entry in scanned:
+        if not _UPLOAD_ID.fullmatch(entry.name):
+            continue
+        try:
+            if os.stat(os.path.join(entry.path, STATUS_FILENAME)).st_mtime >= deadline:
+                continue
+            status = _read_status(entry.path)
+        except (OSError, ValueError):
+            continue
+        if 'reference' in status:
+            blob_store.release(status['reference'])
+        shutil.rmtree(entry.path, ignore_errors=True)
+        logger.info(f"오래된 청크 업로드 제거: {entry.name}")
+
+
+def _copy_chunk(chunk_path: str, data_path: str, offset: int) -> None:
+    with open(chunk_path, 'rb') as chunk:
+        fd = os.open(data_path, os.O_WRONLY)
+        try:
+            position = offset
+            for data in iter(lambda: chunk.read(READ_SIZE), b''):
+                os.pwrite(fd, data, position)
+                position += len(data)
+        finally:
+            os.close(fd)
+
+
+def _missing_chunks(status: dict) -> list:
+    received = set(status['received_chunks'])
+    return [index for index in range(status['total_chunks']) if index not in received]
+
+
+def _public_status(status: dict) -> dict:
+    public = {key: status[key] for key in ('upload_id', 'filename', 'size', 'sha256', 'chunk_size', 'total_chunks', 'received_chunks', 'state')}
+    public['missing_chunks'] = _missing_chunks(status)
+    return public
+
+
+@contextlib.contextmanager
+def _locked(directory: str):
+    try:
+        lock = open(os.path.join(directory, LOCK_FILENAME), 'a')
+    except OSError:
+        raise FileNotFoundError('업로드를 찾을 수 없습니다.')
+    with lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def _read_status(directory: str) -> dict:
+    try:
+        with open(os.path.join(directory, STATUS_FILENAME), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        raise FileNotFoundError('업로드를 찾을 수 없습니다.')
+
+
+def _write_status(directory: str, status: dict) -> None:
+    partial_path = os.path.join(directory, STATUS_FILENAME + '.part')
+    with open(partial_path, 'w', encoding='utf-8') as f:
+        json.dump(status, f, ensure_ascii=False)
+    os.replace(partial_path, os.path.join(directory, STATUS_FILENAME))
@@ -0,0 +1,204 @@
+import os
+import json
+import time
+import shutil
+import hashlib
+import logging
+import tempfile
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_FILENAME = 'manifest.json'
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def content_hash(content) -> str:
+    """
+    바이트 또는 업로드 파일 객체의 SHA-256 해시 계산 (파일 객체는 청크 단위로 읽음)
+    """
+    digest = hashlib.sha256()
+    if isinstance(content, (bytes, bytearray, memoryview)):
+        digest.update(content)
+    elif hasattr(content, 'chunks'):
+        for chunk in content.chunks(HASH_CHUNK_SIZE):
+            digest.update(chunk)
+        content.seek(0)
+    else:
+        for chunk in iter(lambda: content.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+        content.seek(0)
+    return digest.hexdigest()
+
+
+def cache_key(workbook_hash: str, converter_version: str) -> str:
+    """
+    워크북 SHA-256 + 변환기 버전으로 캐시 키 생성
+    """
+    return f"{workbook_hash}-{converter_version}"
+
+
+def rename_documents(documents: list, source_excel_name: str, excel_name: str) -> list:
+    """
+    다른 이름의 워크북에서 변환된 IDS 문서 목록의 파일명 앞부분(엑셀 이름)을 excel_name 으로 바꾼 목록 반환
+    """
+    source_prefix = source_excel_name + '_'
+    renamed = []
+    for document in documents:
+        filename = document['filename']
+        if filename.startswith(source_prefix):
+            filename = excel_name + '_' + filename[len(source_prefix):]
+        renamed.append(dict(document, filename=filename))
+    return renamed
+
+
+def _entry_dir(key: str) -> str:
+    return os.path.join(settings.IDS_CONVERSION_CACHE_DIR, key)
+
+
+def lookup(key: str, excel_name: str):
+    """
+    캐시된 IDS 변환 결과 조회. 적중 시 IDS 문서 목록, 미적중 시 None 반환
+    (같은 워크북이 다른 이름으로 업로드된 경우 IDS 파일명의 엑셀 이름 부분을 바꿔서 반환)
+    """
+    if not settings.IDS_CONVERSION_CACHE_ENABLED:
+        return None
+
+    entry_dir = _entry_dir(key)
+    manifest_path = os.path.join(entry_dir, MANIFEST_FILENAME)
+    try:
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+
+        documents = []
+        for document in manifest['documents']:
+            with open(os.path.join(entry_dir, document['filename']), 'rb') as f:
+                documents.append({
+                    'filename': document['filename'],
+                    'content': f.read(),
+                    'specification_count': document['specification_count'],
+                })
+        documents = rename_documents(documents, manifest['excel_name'], excel_name)
+
+        # LRU 갱신: 마지막 사용 시각을 manifest 수정 시각으로 기록
+        os.utime(manifest_path)
+    except (OSError, ValueError, KeyError):
+        return None
+
+    logger.info(f"변환 캐시 적중: {key}")
+    return documents
+
+
+def store(key: str, excel_name: str, documents: list) -> None:
+    """
+    IDS 변환 결과를 캐시에 저장하고 용량 제한을 넘으면 오래된 항목부터 제거
+    """
+    if not settings.IDS_CONVERSION_CACHE_ENABLED:
+        return
+
+    cache_dir = settings.IDS_CONVERSION_CACHE_DIR
+    os.makedirs(cache_dir, exist_ok=True)
+    entry_dir = _entry_dir(key)
+    if os.path.exists(entry_dir):
+        return
+
+    # 임시 디렉토리에 기록한 뒤 rename 하여 다른 워커가 불완전한 항목을 읽지 않도록 함
+    staging_dir = tempfile.mkdtemp(prefix='.staging-', dir=cache_dir)
+    try:
+        for document in documents:
+            with open(os.path.join(staging_dir, document['filename']), 'wb') as f:
+                f.write(document['content'])
+        manifest = {
+            'key': key,
+            'excel_name': excel_name,
+            'created': time.time(),
+            'documents': [
+                {'filename': document['filename'], 'specification_count': document['specification_count']}
+                for document in documents
+            ],
+        }
+        with open(os.path.join(staging_dir, MANIFEST_FILENAME), 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False)
+        os.rename(staging_dir, entry_dir)
+        logger.info(f"변환 캐시 저장: {key}")
+    except OSError as e:
+        logger.warning(f"변환 캐시 저장 실패: {str(e)}")
+        shutil.rmtree(staging_dir, ignore_errors=True)
+        return
+
+    evict(settings.IDS_CONVERSION_CACHE_MAX_BYTES)
+
+
+def evict(max_bytes: int) -> None:
+    """
+    캐시 전체 크기가 max_bytes 이하가 될 때까지 가장 오래 사용되지 않은 항목 제거 (LRU)
+    """
+    cache_dir = settings.IDS_CONVERSION_CACHE_DIR
+    entries = []
+    total_size = 0
+    try:
+        names = os.listdir(cache_dir)
+    except OSError:
+        return
+
+    for name in names:
+        if name.startswith('.'):
+            continue
+        entry_dir = os.path.join(cache_dir, name)
+        try:
+            last_used = os.stat(os.path.join(entry_dir, MANIFEST_FILENAME)).st_mtime
+            size = sum(entry.stat().st_size for entry in os.scandir(entry_dir) if entry.is_file())
+        except OSError:
+            continue
+        entries.append((last_used, size, entry_dir))
+        total_size += size
+
+    entries.sort()
+    for last_used, size, entry_dir in entries:
+        if total_size <= max_bytes:
+            break
+        shutil.rmtree(entry_dir, ignore_errors=True)
+        total_size -= size
+        logger.info(f"변환 캐시 제거 (LRU): {os.path.basename(entry_dir)}")
+
+
+def incremental_state_path(workbook_hash: str) -> str:
+    """
+    워크북 SHA-256 별 증분 변환 상태 파일 경로
+    변환한 워크북의 해시로 저장하고, 다음 버전의 워크북은 클라이언트가 보낸 이전 버전의 해시(excel_base_hash)로 조회
+    (워크북 이름이 같은 다른 사용자의 상태를 재사용하지 않음)
+    """
+    return os.path.join(settings.IDS_INCREMENTAL_STATE_DIR, f"{workbook_hash}.state")
+
+
+def evict_incremental_states(max_bytes: int) -> None:
+    """
+    증분 변환 상태 파일 전체 크기가 max_bytes 이하가 될 때까지 가장 오래 저장된 파일부터 제거 (LRU)
+    """
+    entries = []
+    total_size = 0
+    try:
+        scanned = list(os.scandir(settings.IDS_INCREMENTAL_STATE_DIR))
+    except OSError:
+        return
+
+    for entry in scanned:
+        if entry.name.startswith('.') or not entry.is_file():
+            continue
+        try:
+            stat = entry.stat()
+        except OSError:
+            continue
+        entries.append((stat.st_mtime, stat.st_size, entry.path))
+        total_size += stat.st_size
+
+    entries.sort()
+    for last_used, size, path in entries:
+        if total_size <= max_bytes:
+            break
+        try:
+            os.remove(path)
+        except OSError:
+            continue
+        total_size -= size
+        logger.info(f"증분 변환 상태 제거 (LRU): {os.path.basename(path)}")
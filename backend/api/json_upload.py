@@ -0,0 +1,331 @@
+import re
+import json
+import zlib
+import binascii
+import logging
+from . import upload_spool
+
+logger = logging.getLogger(__name__)
+
+READ_SIZE = 64 * 1024
+INFLATE_CHUNK_SIZE = 1024 * 1024
+MAX_FIELD_BYTES = 64 * 1024
+GZIP_WBITS = 16 + zlib.MAX_WBITS
+
+DECODE_ERROR = '파일 디코딩 실패'
+SYNTAX_ERROR = 'JSON 형식이 올바르지 않습니다.'
+
+_BASE64_ALPHABET = b'ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/='
+_NOT_BASE64 = bytes(byte for byte in range(256) if byte not in _BASE64_ALPHABET)
+_STRING_SPECIAL = re.compile(rb'["\\]')
+_ESCAPES = {ord('"'): b'"', ord('\\'): b'\\', ord('/'): b'/', ord('b'): b'\b', ord('f'): b'\f', ord('n'): b'\n', ord('r'): b'\r', ord('t'): b'\t'}
+_WHITESPACE = b' \t\r\n'
+_UTF8_BOM = b'\xef\xbb\xbf'
+
+
+def read_json_uploads(stream, file_fields: dict, max_body_bytes: int = None) -> tuple:
+    """
+    Base64 + gzip 으로 인코딩된 파일을 담은 JSON 객체 요청을 청크 단위로 읽어 파일을 업로드 스풀에 바로 기록
+    (요청 본문, JSON 문자열, 디코딩/압축 해제된 바이트를 메모리에 올리지 않음, 요청 형식은 json.loads + b64decode + gzip.decompress 와 동일)
+    stream: 요청 본문 (read(size) 를 지원하는 객체, Django 요청 포함)
+    file_fields: {필드 이름: (파일 종류, 압축 해제 후 최대 크기)}, 압축 해제 중 최대 크기를 넘으면 즉시 중단
+    (다른 필드, 스풀 참조 {필드 이름: {'path', 'size', 'hash', 'filename', 'compressed_size'}}) 반환
+    잘못된 요청이면 이미 스풀한 파일을 삭제하고 ValueError
+    """
+    reader = _JsonReader(stream, max_body_bytes)
+    data = {}
+    uploads = {}
+    try:
+        reader.skip_bom()
+        reader.expect(b'{')
+        if reader.peek() == b'}':
+            reader.advance()
+        else:
+            while True:
+                reader.expect(b'"')
+                key = json.loads(b'"' + reader.raw_string() + b'"')
+                reader.expect(b':')
+                if key in file_fields and reader.peek() == b'"':
+                    reader.advance()
+                    label, max_bytes = file_fields[key]
+                    decoded = _Counted(_base64_decode(reader.string_chunks()))
+                    upload = upload_spool.spool(_gunzip(decoded, label, max_bytes), key)
+                    upload['compressed_size'] = decoded.size
+                    data.pop(key, None)
+                    if key in uploads:
+                        upload_spool.release(uploads[key])
+                    uploads[key] = upload
+                else:
+                    data[key] = json.loads(reader.raw_value())
+                    if key in uploads:
+                        upload_spool.release(uploads.pop(key))
+                separator = reader.peek()
+                reader.advance()
+                if separator == b'}':
+                    break
+                if separator != b',':
+                    raise ValueError(SYNTAX_ERROR)
+        if reader.peek(required=False):
+            raise ValueError(SYNTAX_ERROR)
+    except BaseException as e:
+        for upload in uploads.values():
+            upload_spool.release(upload)
+        if isinstance(e, (UnicodeDecodeError, json.JSONDecodeError)):
+            raise ValueError(SYNTAX_ERROR) from e
+        raise
+    return data, uploads
+
+
+class _JsonReader:
+    """
+    요청 본문을 READ_SIZE 단위로 읽는 JSON 토큰 읽기 (버퍼에는 읽는 중인 토큰만 보관)
+    """
+
+    def __init__(self, stream, max_body_bytes: int = None):
+        self.stream = stream
+        self.max_body_bytes = max_body_bytes
+        self.body_bytes = 0
+        self.buffer = b''
+        self.pos = 0
+
+    def _fill(self) -> bool:
+        data = self.stream.read(READ_SIZE)
+        if not data:
+            return False
+        self.body_bytes += len(data)
+        if self.max_body_bytes is not None and self.body_bytes > self.max_body_bytes:
+            raise ValueError('요청 크기가 너무 큽니다.')
+        self.buffer = self.buffer[self.pos:] + data
+        self.pos = 0
+        return True
+
+    def _ensure(self, count: int) -> None:
+        while len(self.buffer) - self.pos < count:
+            if not self._fill():
+                raise ValueError(SYNTAX_ERROR)
+
+    def skip_bom(self) -> None:
+        """본문 앞의 UTF-8 BOM 건너뛰기 (json.loads 가 바이트 본문의 BOM 을 허용하는 것과 같음)"""
+        while len(self.buffer) - self.pos < len(_UTF8_BOM) and self._fill():
+            pass
+        if self.buffer.startswith(_UTF8_BOM, self.pos):
+            self.pos += len(_UTF8_BOM)
+
+    def peek(self, required: bool = True) -> bytes:
+        """공백을 건너뛴 다음 문자 (본문 끝이면 required 가 아닐 때 b'')"""
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos:self.pos + 1]
+            if not self._fill():
+                if required:
+                    raise ValueError(SYNTAX_ERROR)
+                return b''
+
+    def advance(self) -> None:
+        self.pos += 1
+
+    def expect(self, character: bytes) -> None:
+        if self.peek() != character:
+            raise ValueError(SYNTAX_ERROR)
+        self.advance()
+
+    def string_chunks(self):
+        """여는 따옴표 다음부터 문자열 내용을 이스케이프를 풀어 청크 단위로 반환 (닫는 따옴표까지 소비)"""
+        while True:
+            if self.pos >= len(self.buffer) and not self._fill():
+                raise ValueError(SYNTAX_ERROR)
+            match = _STRING_SPECIAL.search(self.buffer, self.pos)
+            if match is None:
+                chunk = self.buffer[self.pos:]
+                self.pos = len(self.buffer)
+                yield chunk
+                continue
+            index = match.start()
+            if index > self.pos:
+                yield self.buffer[self.pos:index]
+            self.pos = index
+            if self.buffer[index] == ord('"'):
+                self.pos += 1
+                return
+            self._ensure(2)
+            escape = self.buffer[self.pos + 1]
+            if escape == ord('u'):
+                self._ensure(6)
+                try:
+                    code = int(self.buffer[self.pos + 2:self.pos + 6], 16)
+                except ValueError:
+                    raise ValueError(SYNTAX_ERROR)
+                yield chr(code).encode('utf-8', 'surrogatepass')
+                self.pos += 6
+            elif escape in _ESCAPES:
+                yield _ESCAPES[escape]
+                self.pos += 2
+            else:
+                raise ValueError(SYNTAX_ERROR)
+
+    def raw_string(self) -> bytes:
+        """여는 따옴표 다음부터 이스케이프를 그대로 둔 문자열 내용 (MAX_FIELD_BYTES 제한, 닫는 따옴표까지 소비)"""
+        parts = []
+        size = 0
+        while True:
+            if self.pos >= len(self.buffer) and not self._fill():
+                raise ValueError(SYNTAX_ERROR)
+            match = _STRING_SPECIAL.search(self.buffer, self.pos)
+            index = len(self.buffer) if match is None else match.start()
+            parts.append(self.buffer[self.pos:index])
+            size += index - self.pos
+            self.pos = index
+            if match is not None:
+                if self.buffer[index] == ord('"'):
+                    self.pos += 1
+                    return b''.join(parts)
+                self._ensure(2)
+                parts.append(self.buffer[self.pos:self.pos + 2])
+                size += 2
+                self.pos += 2
+            if size > MAX_FIELD_BYTES:
+                raise ValueError('JSON 필드 크기가 너무 큽니다.')
+
+    def raw_value(self) -> bytes:
+        """파일 필드가 아닌 값의 JSON 텍스트 (문자열, 숫자, 리터럴, 중첩 객체/배열)"""
+        first = self.peek()
+        if first == b'"':
+            self.advance()
+            return b'"' + self.raw_string() + b'"'
+        parts = []
+        size = 0
+        depth = 0
+        while True:
+            if self.pos >= len(self.buffer) and not self._fill():
+                if depth:
+                    raise ValueError(SYNTAX_ERROR)
+                break
+            character = self.buffer[self.pos:self.pos + 1]
+            if character == b'"':
+                self.advance()
+                part = b'"' + self.raw_string() + b'"'
+            else:
+                if character in (b'{', b'['):
+                    depth += 1
+                elif character in (b'}', b']'):
+                    if depth == 0:
+                        break
+                    depth -= 1
+                elif character == b',' and depth == 0:
+                    break
+                self.advance()
+                part = character
+            parts.append(part)
+            size += len(part)
+            if size > MAX_FIELD_BYTES:
+                raise ValueError('JSON 필드 크기가 너무 큽니다.')
+        return b''.join(parts)
+
+
+class _Counted:
+    """청크 크기를 세면서 그대로 전달 (압축된 크기 기록용)"""
+
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.size = 0
+
+    def __iter__(self):
+        for chunk in self.chunks:
+            self.size += len(chunk)
+            yield chunk
+
+
+def _base64_decode(chunks):
+    """
+    Base64 문자열 청크를 4문자 단위로 디코딩 (b64decode 와 같이 알파벳 밖의 문자는 무시, ASCII 가 아니거나 패딩이 맞지 않으면 오류)
+    a2b_base64 와 같이 4문자 단위를 완성하는 패딩 뒤의 내용(추가 '=' 포함)은 무시하고, 단위 시작 부분의 '=' 도 무시
+    """
+    pending = b''
+    pads = 0
+    done = False
+    for chunk in chunks:
+        if not chunk.isascii():
+            raise ValueError(DECODE_ERROR)
+        if done:
+            continue
+        data = chunk.translate(None, _NOT_BASE64)
+        while data and not done:
+            pad = data.find(b'=')
+            part, data = (data, b'') if pad < 0 else (data[:pad], data[pad:])
+            if part:
+                pads = 0
+                part = pending + part
+                usable = len(part) - len(part) % 4
+                pending = part[usable:]
+                if usable:
+                    yield _a2b_base64(part[:usable])
+            if data:
+                count = len(data) - len(data.lstrip(b'='))
+                data = data[count:]
+                if len(pending) >= 2:
+                    pads += count
+                    if len(pending) + pads >= 4:
+                        yield _a2b_base64(pending + b'=' * (4 - len(pending)))
+                        pending = b''
+                        done = True
+    if pending:
+        raise ValueError(DECODE_ERROR)
+
+
+def _a2b_base64(data: bytes) -> bytes:
+    try:
+        return binascii.a2b_base64(data)
+    except binascii.Error:
+        raise ValueError(DECODE_ERROR)
+
+
+def _gunzip(chunks, label: str, max_bytes: int):
+    """
+    gzip 청크를 INFLATE_CHUNK_SIZE 단위로 압축 해제 (gzip.decompress 와 같이 여러 멤버 지원), 누적 크기가 max_bytes 를 넘으면 즉시 중단
+    gzip.decompress 와 같이 멤버 뒤의 0 바이트 패딩은 무시
+    """
+    decompressor = zlib.decompressobj(GZIP_WBITS)
+    member_started = False
+    members = 0
+    size = 0
+    for chunk in chunks:
+        while chunk:
+            if not member_started and members:
+                # 멤버 사이와 마지막 멤버 뒤의 0 바이트 패딩
+                chunk = chunk.lstrip(b'\x00')
+                if not chunk:
+                    break
+            member_started = True
+            output = _inflate(decompressor, chunk)
+            size += len(output)
+            if size > max_bytes:
+                raise ValueError(f'{label} 파일 크기는 {max_bytes // (1024 * 1024)}MB를 초과할 수 없습니다.')
+            if output:
+                yield output
+            if decompressor.eof:
+                # 다음 gzip 멤버
+                chunk = decompressor.unused_data
+                decompressor = zlib.decompressobj(GZIP_WBITS)
+                member_started = False
+                members += 1
+            else:
+                chunk = decompressor.unconsumed_tail
+
+    # 입력이 끝난 뒤 압축 해제기에 남은 출력
+    while member_started and not decompressor.eof:
+        output = _inflate(decompressor, b'')
+        if not output:
+            raise ValueError(DECODE_ERROR)
+        size += len(output)
+        if size > max_bytes:
+            raise ValueError(f'{label} 파일 크기는 {max_bytes // (1024 * 1024)}MB를 초과할 수 없습니다.')
+        yield output
+
+
+def _inflate(decompressor, data: bytes) -> bytes:
+    try:
+        return decompressor.decompress(data, INFLATE_CHUNK_SIZE)
+    except zlib.error:
+        raise ValueError(DECODE_ERROR)
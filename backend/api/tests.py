@@ -1,3 +1,583 @@
-from django.test import TestCase
+import io
+import os
+import gzip
+import json
+import base64
+import random
+import shutil
+import hashlib
+import zipfile
+import tempfile
+from unittest import mock
+from celery.exceptions import SoftTimeLimitExceeded
+from django.conf import settings
+from django.test import SimpleTestCase, override_settings
 
-# Create your tests here.
+SAMPLE_WORKBOOK_PATH = os.path.join(settings.BASE_DIR.parent, 'sample', 'test.xlsx')
+SAMPLE_IFC_PATH = os.path.join(settings.BASE_DIR.parent, 'sample', 'IDS_wooden-windows_IFC.ifc')
+
+
+class MediaTestCase(SimpleTestCase):
+    """
+    스풀, 청크 업로드, 파일 저장소, 배치 아카이브를 임시 media 디렉토리에서 실행하는 테스트 기반 클래스
+    """
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        override = override_settings(
+            MEDIA_ROOT=media_root,
+            IDS_UPLOAD_SPOOL_DIR=f'{media_root}/spool',
+            IDS_CHUNKED_UPLOAD_DIR=f'{media_root}/uploads',
+            IDS_BLOB_STORE_DIR=f'{media_root}/blobs',
+            IDS_CONVERSION_CACHE_DIR=f'{media_root}/cache/excel-to-ids',
+            IDS_INCREMENTAL_STATE_DIR=f'{media_root}/cache/excel-to-ids-incremental',
+        )
+        override.enable()
+        self.addCleanup(override.disable)
+        self.media_root = media_root
+
+    def store_file(self, path: str) -> dict:
+        """파일을 스풀을 거쳐 파일 저장소에 등록하고 참조 반환"""
+        from . import blob_store, upload_spool
+        with open(path, 'rb') as f:
+            return blob_store.put(upload_spool.spool(f.read(), os.path.basename(path)), os.path.basename(path))
+
+
+class ConversionTimeLimitTests(MediaTestCase):
+    """변환 시간 상한 (soft_time_limit) 초과 시 태스크가 실패 결과를 반환하는지 확인"""
+
+    reference = {'hash': '0' * 64, 'size': 1, 'filename': 'slow.xlsx', 'lease': '0' * 32}
+
+    def test_excel_to_ids_task_returns_failure(self):
+        from . import tasks
+        with mock.patch.object(tasks, 'convert_workbook', side_effect=SoftTimeLimitExceeded()), \
+                mock.patch.object(tasks.blob_store, 'release') as release:
+            result = tasks.excel_to_ids_task.run(self.reference, 'slow.xlsx')
+        self.assertFalse(result['success'])
+        self.assertIn('시간이 초과', result['error'])
+        release.assert_called_once_with(self.reference)
+
+    def test_batch_item_task_records_failure(self):
+        from . import tasks
+        with mock.patch.object(tasks, 'convert_workbook', side_effect=SoftTimeLimitExceeded()), \
+                mock.patch.object(tasks.blob_store, 'release'), \
+                mock.patch.object(tasks.batch_archive, 'add_result') as add_result:
+            result = tasks.excel_to_ids_batch_item_task.run('batch', self.reference, 'slow')
+        self.assertFalse(result['success'])
+        self.assertIn('시간이 초과', add_result.call_args.args[4])
+
+
+class BatchDeadlineTests(MediaTestCase):
+    """기한이 지나도록 결과가 오지 않은 배치 워크북의 실패 처리 확인"""
+
+    workbooks = [
+        {'name': 'a.xlsx', 'folder': 'a', 'excel_name': 'a', 'hash': '1' * 64, 'duplicate_of': None},
+        {'name': 'b.xlsx', 'folder': 'b', 'excel_name': 'b', 'hash': '2' * 64, 'duplicate_of': None},
+    ]
+    documents = [{'filename': 'a_Specifications.ids', 'content': b'<ids/>', 'specification_count': 1}]
+
+    def test_expire_before_deadline_keeps_batch(self):
+        from . import batch_archive
+        batch_archive.create('batch', self.workbooks)
+        self.assertFalse(batch_archive.expire('batch'))
+
+    @override_settings(IDS_BATCH_TIMEOUT_SECONDS=-1)
+    def test_expire_after_deadline_fails_pending_workbooks(self):
+        from . import batch_archive
+        status = batch_archive.create('batch', self.workbooks)
+        batch_archive.add_result('batch', '1' * 64, 'a', self.documents)
+        on_update = mock.Mock()
+
+        self.assertTrue(batch_archive.expire('batch', on_update=on_update))
+        final_status = on_update.call_args.args[0]
+        self.assertEqual(final_status['completed'], 2)
+        self.assertEqual([workbook['status'] for workbook in final_status['workbooks']], ['SUCCESS', 'FAILURE'])
+        self.assertFalse(os.path.exists(status['file_path'] + '.part'))
+        with zipfile.ZipFile(status['file_path']) as archive:
+            manifest = json.loads(archive.read(batch_archive.MANIFEST_FILENAME))
+            self.assertEqual(manifest['failed_workbooks'], 1)
+            self.assertIn('a/a_Specifications.ids', archive.namelist())
+
+        # 완료된 배치에 늦게 도착한 결과와 다시 호출된 expire 는 무시
+        self.assertFalse(batch_archive.expire('batch'))
+        late_status = batch_archive.add_result('batch', '2' * 64, 'b', self.documents)
+        self.assertEqual(late_status['workbooks'][1]['status'], 'FAILURE')
+        self.assertFalse(os.path.exists(status['file_path'] + '.part'))
+
+
+class BatchUploadTests(MediaTestCase):
+    """배치 워크북 수와 전체 크기를 파일 저장 전에 검증하는지 확인"""
+
+    def archive(self, count: int, size: int = 100) -> io.BytesIO:
+        archive_file = io.BytesIO()
+        with zipfile.ZipFile(archive_file, 'w', zipfile.ZIP_DEFLATED) as archive:
+            for number in range(count):
+                archive.writestr(f'workbooks/{number}.xlsx', bytes([number]) * size)
+            archive.writestr('readme.txt', b'x')
+        archive_file.seek(0)
+        archive_file.name = 'workbooks.zip'
+        return archive_file
+
+    def post_archive(self, archive_file):
+        from . import blob_store
+        with mock.patch.object(blob_store, 'put', wraps=blob_store.put) as put:
+            response = self.client.post('/api/excel-to-ids/batch/', {'archive': archive_file})
+        return response, put
+
+    @override_settings(IDS_BATCH_MAX_WORKBOOKS=2)
+    def test_too_many_workbooks_rejected_before_extracting(self):
+        response, put = self.post_archive(self.archive(3))
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('최대 2개', response.json()['error'])
+        put.assert_not_called()
+
+    @override_settings(IDS_BATCH_MAX_BYTES=1024 * 1024)
+    def test_declared_size_rejected_before_extracting(self):
+        response, put = self.post_archive(self.archive(2, 600 * 1024))
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('전체 크기', response.json()['error'])
+        put.assert_not_called()
+
+    def test_excel_files_rejected_before_storing(self):
+        from . import blob_store
+        files = [io.BytesIO(b'x'), io.BytesIO(b'y'), io.BytesIO(b'z')]
+        for number, excel_file in enumerate(files):
+            excel_file.name = f'{number}.xlsx'
+        with override_settings(IDS_BATCH_MAX_WORKBOOKS=2), mock.patch.object(blob_store, 'put') as put:
+            response = self.client.post('/api/excel-to-ids/batch/', {'excel_files': files})
+        self.assertEqual(response.status_code, 400)
+        put.assert_not_called()
+
+
+@override_settings(IDS_CONVERSION_CACHE_ENABLED=False)
+class IdsBundleTests(MediaTestCase):
+    """File separators 로 나뉜 워크북의 모든 IDS 파일을 하나의 ZIP 번들로 반환하는지 확인"""
+
+    def convert_separated_workbook(self) -> dict:
+        from . import tasks
+        tasks.get_ids_converter()
+        import benchmark
+        path = os.path.join(self.media_root, 'separated.xlsx')
+        benchmark.generate_workbook(path, 60, separators=True)
+        reference = self.store_file(path)
+        try:
+            conversion = tasks.convert_workbook(reference, 'separated')
+        finally:
+            tasks.blob_store.release(reference)
+        self.assertTrue(conversion['success'])
+        return conversion
+
+    def test_bundle_contains_every_ids_file(self):
+        from . import tasks
+        conversion = self.convert_separated_workbook()
+        documents = conversion['documents']
+        self.assertGreater(len(documents), 1)
+
+        result = tasks.build_excel_to_ids_result('task', 'separated', documents, False, {}, {})
+        self.assertTrue(result['is_bundle'])
+        self.assertEqual(result['filename'], 'task__separated_ids_bundle.zip')
+        self.assertFalse(os.path.exists(result['file_path'] + '.part'))
+        with zipfile.ZipFile(result['file_path']) as bundle:
+            manifest = json.loads(bundle.read('manifest.json'))
+            self.assertEqual(manifest['total_files'], len(documents))
+            self.assertEqual(manifest['total_specifications'], sum(document['specification_count'] for document in documents))
+            for document in documents:
+                self.assertEqual(bundle.read(document['filename']), document['content'])
+
+        with mock.patch('celery.result.AsyncResult', return_value=mock.Mock(state='SUCCESS', result=result)):
+            response = self.client.get('/api/download-result/task/')
+        self.assertEqual(response['Content-Type'], 'application/zip')
+        with open(result['file_path'], 'rb') as f:
+            self.assertEqual(b''.join(response.streaming_content), f.read())
+
+    def test_single_ids_file_is_not_bundled(self):
+        from . import tasks
+        documents = [{'filename': 'test_Specifications.ids', 'content': b'<ids/>', 'specification_count': 1}]
+        result = tasks.build_excel_to_ids_result('task', 'test', documents, False, {}, {})
+        self.assertFalse(result['is_bundle'])
+        self.assertEqual(result['filename'], 'task__test_Specifications.ids')
+        with open(result['file_path'], 'rb') as f:
+            self.assertEqual(f.read(), b'<ids/>')
+
+
+@override_settings(IDS_CONVERSION_CACHE_ENABLED=True)
+class ConversionCacheTests(MediaTestCase):
+    """워크북 SHA-256 + 변환기 버전 기준 변환 캐시의 적중, 파일명 변경, LRU 제거 확인"""
+
+    def documents(self, name: str, size: int) -> list:
+        return [{'filename': f'{name}_Specifications.ids', 'content': b'x' * size, 'specification_count': 1}]
+
+    def test_second_conversion_is_cache_hit(self):
+        from . import tasks
+        reference = self.store_file(SAMPLE_WORKBOOK_PATH)
+        try:
+            first = tasks.convert_workbook(reference, 'test')
+            with mock.patch.object(tasks.blob_store, 'checkout') as checkout:
+                second = tasks.convert_workbook(reference, 'renamed')
+        finally:
+            tasks.blob_store.release(reference)
+        checkout.assert_not_called()
+        self.assertFalse(first['cache_hit'])
+        self.assertTrue(second['cache_hit'])
+        self.assertEqual([document['filename'] for document in second['documents']], ['renamed_Specifications.ids'])
+        self.assertEqual([document['content'] for document in second['documents']], [document['content'] for document in first['documents']])
+
+    def test_key_depends_on_converter_version(self):
+        from . import conversion_cache
+        conversion_cache.store(conversion_cache.cache_key('1' * 64, '1'), 'a', self.documents('a', 10))
+        self.assertIsNotNone(conversion_cache.lookup(conversion_cache.cache_key('1' * 64, '1'), 'a'))
+        self.assertIsNone(conversion_cache.lookup(conversion_cache.cache_key('1' * 64, '2'), 'a'))
+
+    def test_evicts_least_recently_used(self):
+        from . import conversion_cache
+        for name in ('a', 'b', 'c'):
+            conversion_cache.store(name, name, self.documents(name, 1000))
+            os.utime(os.path.join(settings.IDS_CONVERSION_CACHE_DIR, name, conversion_cache.MANIFEST_FILENAME), (ord(name), ord(name)))
+        # 조회한 항목은 마지막 사용 시각이 갱신되어 제거 대상에서 뒤로 밀림
+        self.assertIsNotNone(conversion_cache.lookup('a', 'a'))
+        conversion_cache.evict(2500)
+        self.assertIsNotNone(conversion_cache.lookup('a', 'a'))
+        self.assertIsNone(conversion_cache.lookup('b', 'b'))
+        self.assertIsNotNone(conversion_cache.lookup('c', 'c'))
+
+
+@override_settings(IDS_CONVERSION_CACHE_ENABLED=False)
+class IncrementalConversionTests(MediaTestCase):
+    """증분 변환 상태를 워크북 해시(이전 버전의 excel_base_hash)로 재사용하는지 확인"""
+
+    def convert(self, base_hash=None) -> dict:
+        from . import tasks
+        reference = self.store_file(SAMPLE_WORKBOOK_PATH)
+        try:
+            conversion = tasks.convert_workbook(reference, 'test', base_hash=base_hash)
+        finally:
+            tasks.blob_store.release(reference)
+        self.assertTrue(conversion['success'])
+        return conversion
+
+    def test_state_is_reused_only_with_base_hash(self):
+        from . import conversion_cache
+        conversion = self.convert()
+        diagnostics = conversion['diagnostics']
+        self.assertEqual(diagnostics['reprocessed_rows'], diagnostics['rows'])
+        with open(SAMPLE_WORKBOOK_PATH, 'rb') as f:
+            workbook_hash = conversion_cache.content_hash(f.read())
+        self.assertTrue(os.path.exists(conversion_cache.incremental_state_path(workbook_hash)))
+
+        self.assertEqual(self.convert()['diagnostics']['reprocessed_rows'], diagnostics['rows'])
+        self.assertEqual(self.convert(workbook_hash)['diagnostics']['reprocessed_rows'], 0)
+
+    def test_state_signed_with_other_key_is_ignored(self):
+        from . import conversion_cache
+        with open(SAMPLE_WORKBOOK_PATH, 'rb') as f:
+            workbook_hash = conversion_cache.content_hash(f.read())
+        with override_settings(SECRET_KEY='other-secret-key'):
+            self.convert()
+        diagnostics = self.convert(workbook_hash)['diagnostics']
+        self.assertEqual(diagnostics['reprocessed_rows'], diagnostics['rows'])
+
+
+class PreviewTests(MediaTestCase):
+    """미리보기 요청이 요청 내에서 변환하지 않고 시간 상한이 있는 변환 태스크(preview=True)로 실행되는지 확인"""
+
+    def test_preview_runs_in_task(self):
+        from . import tasks
+        with open(SAMPLE_WORKBOOK_PATH, 'rb') as f, \
+                mock.patch.object(tasks.excel_to_ids_task, 'delay', return_value=mock.Mock(id='preview-task')) as delay, \
+                mock.patch.object(tasks, 'preview_workbook', wraps=tasks.preview_workbook) as preview_workbook:
+            response = self.client.post('/api/excel-to-ids/', {'excel_file': f, 'preview': 'true'})
+            self.assertEqual(response.status_code, 200)
+            preview_workbook.assert_not_called()
+
+            body = response.json()
+            self.assertTrue(body['preview'])
+            self.assertEqual(body['task_id'], 'preview-task')
+            self.assertEqual(body['status_url'], '/api/task-status/preview-task/')
+            reference, filename = delay.call_args.args
+            self.assertEqual(delay.call_args.kwargs, {'preview': True})
+            self.assertEqual(body['workbook_hash'], reference['hash'])
+
+            result = tasks.excel_to_ids_task.run(reference, filename, **delay.call_args.kwargs)
+        self.assertTrue(result['success'])
+        self.assertTrue(result['preview'])
+        self.assertEqual([(file['filename'], file['specification_count']) for file in result['files']], [('test_Specifications.ids', 158)])
+        self.assertEqual(result['row_errors'], [])
+        self.assertEqual(result['diagnostics']['rows'], 133)
+        self.assertFalse(os.listdir(os.path.join(settings.IDS_BLOB_STORE_DIR, tasks.blob_store.CHECKOUT_DIRNAME)))
+
+    def test_preview_time_limit(self):
+        from . import tasks
+        reference = self.store_file(SAMPLE_WORKBOOK_PATH)
+        with mock.patch.object(tasks, 'preview_workbook', side_effect=SoftTimeLimitExceeded()):
+            result = tasks.excel_to_ids_task.run(reference, 'test.xlsx', preview=True)
+        self.assertFalse(result['success'])
+        self.assertIn('시간이 초과', result['error'])
+
+
+class JsonUploadTests(MediaTestCase):
+    """Base64 + gzip JSON 업로드의 스트리밍 디코딩이 json.loads + b64decode + gzip.decompress 와 같은지 확인"""
+
+    file_fields = {'ifc_file': ('IFC', 10 * 1024 * 1024)}
+
+    def encoded_file(self) -> bytes:
+        # READ_SIZE 보다 크고 패딩으로 끝나는 Base64 문자열
+        content = random.Random(0).randbytes(200 * 1024 + 1) * 2
+        encoded = base64.b64encode(gzip.compress(content, mtime=0))
+        self.assertTrue(encoded.endswith(b'='))
+        return encoded
+
+    def assertDecodedLikeBaseline(self, body: bytes):
+        from . import json_upload
+        expected = json.loads(body)
+        expected_content = gzip.decompress(base64.b64decode(expected.pop('ifc_file')))
+        data, uploads = json_upload.read_json_uploads(io.BytesIO(body), self.file_fields)
+        with open(uploads['ifc_file']['path'], 'rb') as f:
+            self.assertEqual(f.read(), expected_content)
+        self.assertEqual(data, expected)
+
+    def test_utf8_bom(self):
+        self.assertDecodedLikeBaseline(b'\xef\xbb\xbf{"ifc_file": "' + self.encoded_file() + b'"}')
+
+    def test_extra_padding(self):
+        encoded = self.encoded_file()
+        self.assertDecodedLikeBaseline(b'{"ifc_file": "' + encoded + b'==="}')
+        self.assertDecodedLikeBaseline(b'{"ifc_file": "' + encoded + b'==QUJD"}')
+
+    def test_escapes_and_nested_values(self):
+        encoded = self.encoded_file().replace(b'/', b'\\/')
+        encoded = encoded[:1000] + b'\\n\\u%04x' % encoded[1000] + encoded[1001:]
+        self.assertDecodedLikeBaseline(
+            b'{"name": "\\"x\\u00e9\\"", "options": {"a": [1, {"b": "}]"}], "c": null}, "ifc_file": "' + encoded + b'", "n": -1.5e3}'
+        )
+
+    def test_gzip_zero_padding(self):
+        content = random.Random(0).randbytes(200 * 1024)
+        member = gzip.compress(content, mtime=0)
+        for compressed in (member + b'\x00' * 100 * 1024, member + b'\x00' * 3 + member + b'\x00'):
+            self.assertDecodedLikeBaseline(b'{"ifc_file": "' + base64.b64encode(compressed) + b'"}')
+
+    def test_gunzip_matches_gzip_decompress(self):
+        from .json_upload import _gunzip
+        rng = random.Random(0)
+        member = gzip.compress(b'abc' * 1000, mtime=0)
+        for compressed in (member + b'\x00' * 9, member + b'\x00\x00' + member, b'\x00' + member, member + b'\x00\x1f'):
+            for _ in range(50):
+                cuts = sorted(rng.sample(range(len(compressed) + 1), 3))
+                chunks = [compressed[start:end] for start, end in zip([0] + cuts, cuts + [len(compressed)])]
+                try:
+                    expected = gzip.decompress(compressed)
+                except (OSError, EOFError):
+                    expected = None
+                try:
+                    decompressed = b''.join(_gunzip(iter(chunks), 'IFC', 10 * 1024 * 1024))
+                except ValueError:
+                    decompressed = None
+                self.assertEqual(decompressed, expected, (compressed, chunks))
+
+    def test_base64_decode_matches_b64decode(self):
+        from .json_upload import _base64_decode
+        rng = random.Random(0)
+        for _ in range(20000):
+            text = bytes(rng.choice(b'QUJDRA==\n +/x-') for _ in range(rng.randint(0, 14)))
+            cuts = sorted(rng.sample(range(len(text) + 1), min(len(text) + 1, rng.randint(0, 3))))
+            chunks = [text[start:end] for start, end in zip([0] + cuts, cuts + [len(text)])]
+            try:
+                expected = base64.b64decode(text)
+            except ValueError:
+                expected = None
+            try:
+                decoded = b''.join(_base64_decode(iter(chunks)))
+            except ValueError:
+                decoded = None
+            self.assertEqual(decoded, expected, (text, chunks))
+
+
+class ChunkedUploadTests(MediaTestCase):
+    """청크 업로드의 청크 검증 확인"""
+
+    def test_bad_resend_keeps_received_chunk(self):
+        from . import chunked_upload
+        content = bytes(range(256)) * 8
+        status = chunked_upload.init('model.ifc', len(content), hashlib.sha256(content).hexdigest(), chunk_size=1024)
+        chunks = [content[:1024], content[1024:]]
+        for offset, chunk in zip((0, 1024), chunks):
+            chunked_upload.write_chunk(status['upload_id'], offset, hashlib.sha256(chunk).hexdigest(), io.BytesIO(chunk))
+
+        with self.assertRaisesMessage(ValueError, '청크 해시가 일치하지 않습니다.'):
+            chunked_upload.write_chunk(status['upload_id'], 0, hashlib.sha256(chunks[0]).hexdigest(), io.BytesIO(b'x' * 1024))
+
+        completed = chunked_upload.complete(status['upload_id'])
+        self.assertEqual(completed['state'], 'COMPLETE')
+        directory = chunked_upload.upload_dir(status['upload_id'])
+        self.assertFalse([name for name in os.listdir(directory) if name.startswith(chunked_upload.CHUNK_PREFIX)])
+        reference = chunked_upload.claim(status['upload_id'])
+        self.assertEqual(reference['hash'], hashlib.sha256(content).hexdigest())
+
+
+class CompressedIfcTests(MediaTestCase):
+    """압축 IFC 파일(.ifczip, .ifc.gz)을 압축 해제 크기 상한 안에서 메모리로 읽는지 확인"""
+
+    def setUp(self):
+        super().setUp()
+        with open(SAMPLE_IFC_PATH, 'rb') as f:
+            self.content = f.read()
+
+    def write_ifczip(self) -> str:
+        path = os.path.join(self.media_root, 'model.ifczip')
+        with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as archive:
+            archive.writestr('model.ifc', self.content)
+        return path
+
+    def write_ifc_gz(self) -> str:
+        path = os.path.join(self.media_root, 'model.ifc.gz')
+        with open(path, 'wb') as f:
+            f.write(gzip.compress(self.content))
+        return path
+
+    def assertSameModel(self, model):
+        import ifcopenshell
+        expected = ifcopenshell.open(SAMPLE_IFC_PATH)
+        self.assertEqual(model.schema, expected.schema)
+        self.assertEqual(len(list(model)), len(list(expected)))
+        self.assertEqual([window.GlobalId for window in model.by_type('IfcWindow')], [window.GlobalId for window in expected.by_type('IfcWindow')])
+
+    def test_ifczip(self):
+        from . import tasks
+        self.assertSameModel(tasks.open_ifc_model(self.write_ifczip()))
+
+    def test_ifc_gz(self):
+        from . import tasks
+        self.assertSameModel(tasks.open_ifc_model(self.write_ifc_gz()))
+
+    def test_decompressed_size_limit(self):
+        from . import tasks
+        for path in (self.write_ifczip(), self.write_ifc_gz()):
+            with self.assertRaisesMessage(ValueError, '압축 해제된 IFC 파일 크기는'):
+                tasks.open_ifc_model(path, len(self.content) - 1)
+        # 헤더 크기 없이 읽는 중에 상한을 넘는 스트림
+        with mock.patch.object(tasks, 'IFC_READ_SIZE', 1000), self.assertRaisesMessage(ValueError, '압축 해제된 IFC 파일 크기는'):
+            tasks.read_ifc_text(lambda: io.BytesIO(self.content), len(self.content) - 1)
+
+    def test_non_utf8_text_decoded_as_latin1(self):
+        from . import tasks
+        for content in (b'caf\xc3\xa9 ' * 500 + b'\xe9t\xe9', b'caf\xc3\xa9 ' * 500 + b'\xc3', b'\xe9' + b'x' * 5000):
+            for read_size in (1, 7, 1000, 100000):
+                try:
+                    expected = content.decode('utf-8')
+                except UnicodeDecodeError:
+                    expected = content.decode('latin-1')
+                with mock.patch.object(tasks, 'IFC_READ_SIZE', read_size):
+                    self.assertEqual(tasks.read_ifc_text(lambda: io.BytesIO(content), len(content)), expected)
+
+
+class UploadSpoolTests(MediaTestCase):
+    """업로드 스풀: 임시 파일 디렉토리의 지연 생성, 하드 링크 등록, 크기 제한과 정리 확인"""
+
+    @override_settings(FILE_UPLOAD_MAX_MEMORY_SIZE=0)
+    def test_temporary_upload_dir_created_on_upload(self):
+        from . import tasks, upload_spool
+        incoming_dir = os.path.join(settings.IDS_UPLOAD_SPOOL_DIR, upload_spool.INCOMING_DIRNAME)
+        self.assertFalse(os.path.exists(incoming_dir))
+        with open(SAMPLE_WORKBOOK_PATH, 'rb') as f, \
+                mock.patch.object(tasks.excel_to_ids_task, 'delay', return_value=mock.Mock(id='task')) as delay:
+            response = self.client.post('/api/excel-to-ids/', {'excel_file': f, 'preview': 'true'})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(os.path.isdir(incoming_dir))
+        with open(SAMPLE_WORKBOOK_PATH, 'rb') as f:
+            self.assertEqual(delay.call_args.args[0]['hash'], hashlib.sha256(f.read()).hexdigest())
+
+    def test_temporary_upload_is_linked(self):
+        from . import upload_spool
+        uploaded = upload_spool.SpoolTemporaryUploadedFile('model.ifc', 'application/octet-stream', 0, None)
+        uploaded.write(b'a' * 100)
+        uploaded.flush()
+        upload = upload_spool.spool(uploaded, '../model.ifc')
+        self.assertEqual(os.path.dirname(os.path.dirname(upload['path'])), settings.IDS_UPLOAD_SPOOL_DIR)
+        self.assertEqual(upload['filename'], 'model.ifc')
+        self.assertEqual(os.stat(upload['path']).st_ino, os.stat(uploaded.temporary_file_path()).st_ino)
+        self.assertEqual((upload['size'], upload['hash']), (100, hashlib.sha256(b'a' * 100).hexdigest()))
+        uploaded.close()
+        upload_spool.release(upload)
+        self.assertFalse(os.path.exists(os.path.dirname(upload['path'])))
+
+    def test_size_limit_removes_spool(self):
+        from . import upload_spool
+        with self.assertRaisesMessage(ValueError, '파일 크기는 1MB를 초과할 수 없습니다: model.ifc'):
+            upload_spool.spool(iter([b'a' * 1024 * 1024, b'a']), 'model.ifc', 1024 * 1024)
+        self.assertEqual(os.listdir(settings.IDS_UPLOAD_SPOOL_DIR), [])
+
+    def test_release_keeps_paths_outside_spool(self):
+        from . import upload_spool
+        directory = os.path.join(settings.MEDIA_ROOT, 'outside')
+        os.makedirs(directory)
+        upload_spool.release({'path': os.path.join(directory, 'model.ifc')})
+        self.assertTrue(os.path.isdir(directory))
+
+    def test_evict_stale_keeps_incoming_dir(self):
+        from . import upload_spool
+        upload = upload_spool.spool(b'a', 'model.ifc')
+        incoming_dir = os.path.join(settings.IDS_UPLOAD_SPOOL_DIR, upload_spool.INCOMING_DIRNAME)
+        os.makedirs(incoming_dir)
+        for directory in (incoming_dir, os.path.dirname(upload['path'])):
+            os.utime(directory, (0, 0))
+        upload_spool.evict_stale(60)
+        self.assertEqual(os.listdir(settings.IDS_UPLOAD_SPOOL_DIR), [upload_spool.INCOMING_DIRNAME])
+
+
+class BlobStoreTests(MediaTestCase):
+    """파일 저장소의 전체 크기 인덱스와 LRU 제거, 조회 시 기록 여부 확인"""
+
+    def spool(self, content: bytes, filename: str = 'model.ifc') -> dict:
+        from . import upload_spool
+        return upload_spool.spool(content, filename)
+
+    def test_put_under_limit_does_not_scan(self):
+        from . import blob_store
+        with mock.patch.object(blob_store, '_scan_metadata', wraps=blob_store._scan_metadata) as scan:
+            blob_store.put(self.spool(b'a' * 10), 'a.ifc')
+            scan.reset_mock()
+            first = blob_store.put(self.spool(b'b' * 20), 'b.ifc')
+            blob_store.put(self.spool(b'b' * 20), 'b.ifc')
+            blob_store.release(first)
+        scan.assert_not_called()
+        with blob_store._locked():
+            self.assertEqual(blob_store._total_size(), 30)
+
+    def test_lookup_does_not_write_metadata(self):
+        from . import blob_store
+        reference = blob_store.put(self.spool(b'a' * 10), 'a.ifc')
+        metadata_path = blob_store.blob_path(reference['hash']) + blob_store.METADATA_SUFFIX
+        os.utime(metadata_path, (0, 0))
+        os.utime(blob_store.blob_path(reference['hash']), (0, 0))
+
+        self.assertEqual(blob_store.lookup(reference['hash']), {'hash': reference['hash'], 'size': 10})
+        self.assertEqual(os.stat(blob_store.blob_path(reference['hash'])).st_mtime, 0)
+        blob_store.lookup(reference['hash'], touch=True)
+        self.assertNotEqual(os.stat(blob_store.blob_path(reference['hash'])).st_mtime, 0)
+        self.assertEqual(os.stat(metadata_path).st_mtime, 0)
+
+    def test_head_request_does_not_touch_blob(self):
+        from . import blob_store
+        reference = blob_store.put(self.spool(b'a' * 10), 'a.ifc')
+        os.utime(blob_store.blob_path(reference['hash']), (0, 0))
+        response = self.client.head(f"/api/blobs/{reference['hash']}/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(os.stat(blob_store.blob_path(reference['hash'])).st_mtime, 0)
+
+    @override_settings(IDS_BLOB_STORE_MAX_BYTES=25)
+    def test_evicts_least_recently_used_when_over_limit(self):
+        from . import blob_store
+        old = blob_store.put(self.spool(b'a' * 10), 'a.ifc')
+        new = blob_store.put(self.spool(b'b' * 10), 'b.ifc')
+        blob_store.release(old)
+        blob_store.release(new)
+        blob_store.lookup(old['hash'], touch=True)
+
+        # 참조 중인 파일은 제거되지 않고, 조회로 갱신된 old 보다 new 가 먼저 제거됨
+        kept = blob_store.put(self.spool(b'c' * 10), 'c.ifc')
+        self.assertIsNotNone(blob_store.lookup(old['hash']))
+        self.assertIsNone(blob_store.lookup(new['hash']))
+        self.assertIsNotNone(blob_store.lookup(kept['hash']))
+        with blob_store._locked():
+            self.assertEqual(blob_store._total_size(), 20)
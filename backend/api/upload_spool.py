@@ -0,0 +1,140 @@
+import os
+import time
+import uuid
+import shutil
+import hashlib
+import logging
+import tempfile
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile, TemporaryUploadedFile
+from django.core.files.uploadhandler import FileUploadHandler, TemporaryFileUploadHandler
+
+logger = logging.getLogger(__name__)
+
+SPOOL_CHUNK_SIZE = 1024 * 1024
+INCOMING_DIRNAME = '.incoming'
+
+
+def safe_filename(filename: str) -> str:
+    """
+    업로드 파일명에서 경로 부분을 제거한 파일명 (스풀 디렉토리 밖에 기록되지 않도록 함)
+    """
+    name = os.path.basename(filename.replace('\\', '/')).lstrip('.')
+    return name or 'upload'
+
+
+class SpoolTemporaryUploadedFile(TemporaryUploadedFile):
+    """
+    스풀 볼륨(IDS_UPLOAD_SPOOL_DIR/.incoming)의 임시 파일로 받는 업로드 파일, 디렉토리가 없으면 생성
+    """
+
+    def __init__(self, name, content_type, size, charset, content_type_extra=None):
+        directory = os.path.join(settings.IDS_UPLOAD_SPOOL_DIR, INCOMING_DIRNAME)
+        os.makedirs(directory, exist_ok=True)
+        file = tempfile.NamedTemporaryFile(suffix='.upload' + os.path.splitext(name)[1], dir=directory)
+        UploadedFile.__init__(self, file, name, content_type, size, charset, content_type_extra)
+
+
+class SpoolTemporaryFileUploadHandler(TemporaryFileUploadHandler):
+    """
+    메모리 한도(FILE_UPLOAD_MAX_MEMORY_SIZE)를 넘는 업로드를 스풀 볼륨에 받는 업로드 핸들러 (spool 에서 하드 링크로 등록)
+    """
+
+    def new_file(self, *args, **kwargs):
+        FileUploadHandler.new_file(self, *args, **kwargs)
+        self.file = SpoolTemporaryUploadedFile(self.file_name, self.content_type, 0, self.charset, self.content_type_extra)
+
+
+def spool(source, filename: str, max_bytes: int = None) -> dict:
+    """
+    업로드 파일을 스풀 디렉토리(MEDIA_ROOT 아래 공유 볼륨)에 스트리밍 저장하고 태스크에 전달할 참조 반환
+    source: Django 업로드 파일, 파일 객체, 바이트 또는 바이트 청크의 이터레이터 (스트리밍 디코딩 결과)
+    {'path', 'size', 'hash', 'filename'} 반환 (Celery 브로커에는 파일 내용 대신 이 참조만 전달), max_bytes 초과 시 ValueError
+    Django가 디스크에 받은 업로드(SpoolTemporaryFileUploadHandler)는 같은 볼륨이면 하드 링크로 등록하여 내용을 복사하지 않음
+    """
+    filename = safe_filename(filename)
+    directory = os.path.join(settings.IDS_UPLOAD_SPOOL_DIR, uuid.uuid4().hex)
+    os.makedirs(directory)
+    path = os.path.join(directory, filename)
+    try:
+        if hasattr(source, 'temporary_file_path') and _link(source.temporary_file_path(), path):
+            with open(path, 'rb') as f:
+                size, digest = _copy(iter(lambda: f.read(SPOOL_CHUNK_SIZE), b''), None, filename, max_bytes)
+        else:
+            with open(path, 'wb') as f:
+                size, digest = _copy(_chunks(source), f, filename, max_bytes)
+    except BaseException:
+        shutil.rmtree(directory, ignore_errors=True)
+        raise
+
+    logger.info(f"업로드 스풀 저장: {path} ({size} bytes)")
+    return {'path': path, 'size': size, 'hash': digest, 'filename': filename}
+
+
+def release(upload: dict) -> None:
+    """
+    태스크가 끝난 업로드의 스풀 파일 삭제 (스풀 디렉토리 밖의 경로는 삭제하지 않음)
+    처리되지 못하고 남은 오래된 스풀도 함께 정리
+    """
+    spool_dir = os.path.abspath(settings.IDS_UPLOAD_SPOOL_DIR)
+    directory = os.path.dirname(os.path.abspath(upload['path']))
+    if os.path.dirname(directory) == spool_dir:
+        shutil.rmtree(directory, ignore_errors=True)
+    evict_stale(settings.IDS_UPLOAD_SPOOL_MAX_AGE_SECONDS)
+
+
+def evict_stale(max_age_seconds: int) -> None:
+    """
+    max_age_seconds 보다 오래된 스풀 디렉토리 제거 (태스크가 실행되지 못해 남은 업로드)
+    """
+    deadline = time.time() - max_age_seconds
+    try:
+        scanned = list(os.scandir(settings.IDS_UPLOAD_SPOOL_DIR))
+    except OSError:
+        return
+
+    for entry in scanned:
+        if entry.name.startswith('.') or not entry.is_dir():
+            continue
+        try:
+            if entry.stat().st_mtime >= deadline:
+                continue
+        except OSError:
+            continue
+        shutil.rmtree(entry.path, ignore_errors=True)
+        logger.info(f"오래된 업로드 스풀 제거: {entry.name}")
+
+
+def _link(source_path: str, path: str) -> bool:
+    try:
+        os.link(source_path, path)
+    except OSError:
+        return False
+    return True
+
+
+def _chunks(source):
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        yield source
+    elif hasattr(source, 'chunks'):
+        yield from source.chunks(SPOOL_CHUNK_SIZE)
+    elif hasattr(source, 'read'):
+        yield from iter(lambda: source.read(SPOOL_CHUNK_SIZE), b'')
+    else:
+        yield from source
+
+
+def _copy(chunks, target, filename: str, max_bytes: int = None) -> tuple:
+    """
+    청크를 target 에 기록(target 이 None 이면 읽기만)하면서 크기와 SHA-256 해시 계산, max_bytes 초과 시 즉시 중단
+    """
+    digest = hashlib.sha256()
+    size = 0
+    for chunk in chunks:
+        size += len(chunk)
+        if max_bytes is not None and size > max_bytes:
+            raise ValueError(f'파일 크기는 {max_bytes // (1024 * 1024)}MB를 초과할 수 없습니다: {filename}')
+        digest.update(chunk)
+        if target is not None:
+            target.write(chunk)
+    return size, digest.hexdigest()
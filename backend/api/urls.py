@@ -3,10 +3,16 @@ from . import views
 
 urlpatterns = [
     path('excel-to-ids/', views.excel_to_ids, name='excel_to_ids'),
+    path('excel-to-ids/batch/', views.excel_to_ids_batch, name='excel_to_ids_batch'),
     path('download/template/', views.download_template, name='download_template'),
     path('download/manual/', views.download_manual, name='download_manual'),
     path('ids-to-blender-addon/', views.ids_to_blender_addon, name='ids_to_blender_addon'),
     path('ifc-ids-review/', views.ifc_ids_review, name='ifc_ids_review'),
+    path('uploads/', views.chunked_upload_init, name='chunked_upload_init'),
+    path('uploads/<str:upload_id>/', views.chunked_upload_status, name='chunked_upload_status'),
+    path('uploads/<str:upload_id>/chunk/', views.chunked_upload_chunk, name='chunked_upload_chunk'),
+    path('uploads/<str:upload_id>/complete/', views.chunked_upload_complete, name='chunked_upload_complete'),
+    path('blobs/<str:digest>/', views.blob_lookup, name='blob_lookup'),
     path('task-status/<str:task_id>/', views.task_status, name='task_status'),
     path('download-result/<str:task_id>/', views.download_result, name='download_result'),
 ]
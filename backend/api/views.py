@@ -1,17 +1,24 @@
 import subprocess
 import os
+import uuid
 import tempfile
+import zipfile
 import logging
-from django.http import HttpResponse, JsonResponse, FileResponse
+from celery import states
+from django.http import JsonResponse, FileResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
 from django.conf import settings
 import json
 import ifcopenshell
 from ifctester import ids, reporter
+from . import conversion_cache, batch_archive, upload_spool, json_upload, chunked_upload, blob_store
 
 logger = logging.getLogger(__name__)
 
+# IFC 검토에 사용할 수 있는 IFC 파일 형식 (압축 파일은 태스크가 메모리에서 압축 해제)
+IFC_EXTENSIONS = ('.ifc', '.ifczip', '.ifc.gz')
+
 @csrf_exempt
 @require_http_methods(["POST"])
 def excel_to_ids(request):
@@ -23,36 +30,103 @@ def excel_to_ids(request):
     logger.info(f"FILES: {request.FILES}")
 
     try:
-        # 업로드된 Excel 파일 처리
-        if 'excel_file' not in request.FILES:
-            logger.error("Excel 파일이 없습니다.")
-            return JsonResponse({'error': 'Excel 파일이 없습니다.'}, status=400)
-        
-        excel_file = request.FILES['excel_file']
-        logger.info(f"업로드된 파일: {excel_file.name}, 크기: {excel_file.size}")
-        
-        # 파일 확장자 검증
-        if not excel_file.name.lower().endswith(('.xlsx', '.xls')):
-            logger.error(f"잘못된 파일 형식: {excel_file.name}")
-            return JsonResponse({'error': 'Excel 파일만 업로드 가능합니다.'}, status=400)
-        
-        # 파일 크기 검증 (10MB 제한)
-        if excel_file.size > 10 * 1024 * 1024:
-            logger.error(f"파일 크기 초과: {excel_file.size} bytes")
-            return JsonResponse({'error': '파일 크기는 10MB를 초과할 수 없습니다.'}, status=400)
-        
-        # 파일 내용을 읽어서 Celery 태스크에 전달
-        file_content = excel_file.read()
+        # 청크 업로드로 받은 Excel 파일 (excel_upload_id): multipart 파일 대신 사용
+        if request.POST.get('excel_upload_id'):
+            try:
+                reference = claim_chunked_upload(request.POST['excel_upload_id'], 'Excel', ('.xlsx', '.xls'), 10 * 1024 * 1024)
+            except (ValueError, FileNotFoundError) as e:
+                logger.error(f"청크 업로드 사용 오류: {str(e)}")
+                return JsonResponse({'error': str(e)}, status=400)
+            excel_filename = reference['filename']
+        
+        # 파일 저장소에 이미 있는 Excel 파일 (excel_hash + excel_filename): 업로드 생략
+        elif request.POST.get('excel_hash'):
+            try:
+                reference = acquire_stored_file(request.POST['excel_hash'], request.POST.get('excel_filename'), 'Excel', ('.xlsx', '.xls'), 10 * 1024 * 1024)
+            except (ValueError, FileNotFoundError) as e:
+                logger.error(f"저장된 파일 사용 오류: {str(e)}")
+                return JsonResponse({'error': str(e)}, status=400)
+            excel_filename = reference['filename']
         
+        # 업로드된 Excel 파일 처리
+        else:
+            if 'excel_file' not in request.FILES:
+                logger.error("Excel 파일이 없습니다.")
+                return JsonResponse({'error': 'Excel 파일이 없습니다.'}, status=400)
+        
+            excel_file = request.FILES['excel_file']
+            logger.info(f"업로드된 파일: {excel_file.name}, 크기: {excel_file.size}")
+        
+            # 파일 확장자 검증
+            if not excel_file.name.lower().endswith(('.xlsx', '.xls')):
+                logger.error(f"잘못된 파일 형식: {excel_file.name}")
+                return JsonResponse({'error': 'Excel 파일만 업로드 가능합니다.'}, status=400)
+        
+            # 파일 크기 검증 (10MB 제한)
+            if excel_file.size > 10 * 1024 * 1024:
+                logger.error(f"파일 크기 초과: {excel_file.size} bytes")
+                return JsonResponse({'error': '파일 크기는 10MB를 초과할 수 없습니다.'}, status=400)
+        
+            # 업로드를 스풀 볼륨에 받아 파일 저장소에 등록하고 (같은 내용이면 재사용) Celery 태스크에는 해시 참조만 전달
+            reference = blob_store.put(upload_spool.spool(excel_file, excel_file.name), excel_file.name)
+            excel_filename = excel_file.name
+        
+        # 증분 변환: 이전 버전 워크북의 SHA-256 (이전 변환 응답의 workbook_hash)
+        base_hash = request.POST.get('excel_base_hash', '').lower() or None
+        if base_hash is not None and not blob_store.is_hash(base_hash):
+            blob_store.release(reference)
+            logger.error(f"잘못된 이전 워크북 해시: {base_hash}")
+            return JsonResponse({'error': 'excel_base_hash 는 SHA-256 해시(16진수 64자)여야 합니다.'}, status=400)
+
+        from .tasks import excel_to_ids_task, get_ids_converter, build_excel_to_ids_result
+
+        # 미리보기: 파싱과 병합만 수행하는 태스크 실행 (변환과 같은 시간 상한, 결과는 작업 상태로 조회)
+        if request.POST.get('preview', '').lower() in ('1', 'true', 'yes'):
+            task = excel_to_ids_task.delay(reference, excel_filename, preview=True)
+
+            logger.info(f"Celery 미리보기 태스크 시작: {task.id}")
+
+            return JsonResponse({
+                'success': True,
+                'task_id': task.id,
+                'preview': True,
+                'workbook_hash': reference['hash'],
+                'message': 'Excel 파일 변환 미리보기가 시작되었습니다. 작업 상태를 확인하세요.',
+                'status_url': f'/api/task-status/{task.id}/'
+            })
+
+        # 변환 캐시 조회: 적중 시 태스크 없이 결과를 바로 등록
+        converter = get_ids_converter()
+        excel_name = excel_filename.split('.')[0]
+        key = conversion_cache.cache_key(reference['hash'], converter.CONVERTER_VERSION)
+        cached_documents = conversion_cache.lookup(key, excel_name)
+        if cached_documents is not None:
+            blob_store.release(reference)
+            task_id = str(uuid.uuid4())
+            result = build_excel_to_ids_result(task_id, excel_name, cached_documents, True, {}, {})
+            excel_to_ids_task.backend.store_result(task_id, result, states.SUCCESS)
+
+            logger.info(f"변환 캐시 적중 - 결과 등록: {task_id}")
+
+            return JsonResponse({
+                'success': True,
+                'task_id': task_id,
+                'cache_hit': True,
+                'workbook_hash': reference['hash'],
+                'message': '이전 변환 결과를 재사용했습니다.',
+                'status_url': f'/api/task-status/{task_id}/'
+            })
+
         # Celery 태스크 실행
-        from .tasks import excel_to_ids_task
-        task = excel_to_ids_task.delay(file_content, excel_file.name)
+        task = excel_to_ids_task.delay(reference, excel_filename, base_hash=base_hash)
         
         logger.info(f"Celery 태스크 시작: {task.id}")
         
         return JsonResponse({
             'success': True,
             'task_id': task.id,
+            'cache_hit': False,
+            'workbook_hash': reference['hash'],
             'message': 'Excel 파일 변환이 시작되었습니다. 작업 상태를 확인하세요.',
             'status_url': f'/api/task-status/{task.id}/'
         })
@@ -62,6 +136,149 @@ def excel_to_ids(request):
         return JsonResponse({'error': f'요청 처리 중 오류가 발생했습니다: {str(e)}'}, status=500)
 
 
+def read_batch_workbooks(request) -> list:
+    """
+    배치 요청에서 워크북 목록을 추출하여 파일 저장소에 등록: ZIP 파일(archive) 또는 여러 Excel 파일(excel_files)
+    워크북 수와 전체 크기(ZIP 은 압축 해제 전 선언된 크기)는 파일을 저장하기 전에 검증
+    [(이름, 파일 저장소 참조)] 반환, 잘못된 요청이면 이미 받은 참조를 반환하고 ValueError
+    """
+    workbooks = []
+    try:
+        if 'archive' in request.FILES:
+            archive_file = request.FILES['archive']
+            if not archive_file.name.lower().endswith('.zip'):
+                raise ValueError('ZIP 파일만 업로드 가능합니다.')
+            try:
+                with zipfile.ZipFile(archive_file) as archive:
+                    entries = []
+                    for info in archive.infolist():
+                        name = info.filename
+                        if info.is_dir() or name.startswith('__MACOSX/') or os.path.basename(name).startswith(('.', '~$')):
+                            continue
+                        if not name.lower().endswith(('.xlsx', '.xls')):
+                            continue
+                        # 압축 해제 전 크기 검증 (10MB 제한), 해제하면서도 실제 크기로 다시 검증
+                        if info.file_size > 10 * 1024 * 1024:
+                            raise ValueError(f'파일 크기는 10MB를 초과할 수 없습니다: {name}')
+                        entries.append(info)
+                    validate_batch_size(len(entries), sum(info.file_size for info in entries))
+
+                    for info in entries:
+                        with archive.open(info) as entry:
+                            workbooks.append((info.filename, blob_store.put(upload_spool.spool(entry, info.filename, 10 * 1024 * 1024), info.filename)))
+            except zipfile.BadZipFile:
+                raise ValueError('ZIP 파일을 읽을 수 없습니다.')
+        else:
+            excel_files = request.FILES.getlist('excel_files')
+            for excel_file in excel_files:
+                if not excel_file.name.lower().endswith(('.xlsx', '.xls')):
+                    raise ValueError(f'Excel 파일만 업로드 가능합니다: {excel_file.name}')
+                if excel_file.size > 10 * 1024 * 1024:
+                    raise ValueError(f'파일 크기는 10MB를 초과할 수 없습니다: {excel_file.name}')
+            validate_batch_size(len(excel_files), sum(excel_file.size for excel_file in excel_files))
+
+            for excel_file in excel_files:
+                workbooks.append((excel_file.name, blob_store.put(upload_spool.spool(excel_file, excel_file.name), excel_file.name)))
+    except BaseException:
+        for name, reference in workbooks:
+            blob_store.release(reference)
+        raise
+    return workbooks
+
+
+def validate_batch_size(count: int, total_size: int) -> None:
+    """
+    배치 워크북 수(IDS_BATCH_MAX_WORKBOOKS)와 전체 크기(IDS_BATCH_MAX_BYTES) 검증, 초과하면 ValueError
+    """
+    if not count:
+        raise ValueError('Excel 파일이 없습니다.')
+    if count > settings.IDS_BATCH_MAX_WORKBOOKS:
+        raise ValueError(f'한 번에 최대 {settings.IDS_BATCH_MAX_WORKBOOKS}개의 워크북만 변환할 수 있습니다.')
+    if total_size > settings.IDS_BATCH_MAX_BYTES:
+        raise ValueError(f'워크북 전체 크기는 {settings.IDS_BATCH_MAX_BYTES // (1024 * 1024)}MB를 초과할 수 없습니다.')
+
+
+@csrf_exempt
+@require_http_methods(["POST"])
+def excel_to_ids_batch(request):
+    """
+    여러 Excel 파일(ZIP 또는 다중 업로드)을 IDS 파일로 일괄 변환하는 API (비동기)
+    같은 내용의 워크북은 해시로 중복 제거하여 한 번만 변환하고, 워크북별 변환 태스크를 워커 풀에 분산
+    각 결과는 완료되는 대로 하나의 배치 아카이브에 추가되며 진행 상태는 배치 ID로 조회
+    """
+    logger.info("=== Excel to IDS 배치 API 요청 시작 ===")
+    logger.info(f"FILES: {request.FILES}")
+
+    try:
+        try:
+            uploaded_workbooks = read_batch_workbooks(request)
+        except ValueError as e:
+            logger.error(f"배치 요청 오류: {str(e)}")
+            return JsonResponse({'error': str(e)}, status=400)
+
+        from .tasks import excel_to_ids_batch_item_task, store_batch_state
+
+        # 워크북 해시로 중복 제거 (처음 나온 워크북만 변환, 중복 워크북의 참조는 바로 반환)
+        workbooks = []
+        references = {}
+        first_names = {}
+        folders = set()
+        for name, reference in uploaded_workbooks:
+            workbook_hash = reference['hash']
+            folder = batch_folder_name(name, folders)
+            folders.add(folder)
+            workbooks.append({
+                'name': name,
+                'folder': folder,
+                'excel_name': os.path.basename(name).split('.')[0],
+                'hash': workbook_hash,
+                'duplicate_of': first_names.get(workbook_hash),
+            })
+            if workbook_hash not in references:
+                references[workbook_hash] = reference
+                first_names[workbook_hash] = name
+            else:
+                blob_store.release(reference)
+
+        batch_id = str(uuid.uuid4())
+        status = batch_archive.create(batch_id, workbooks)
+        store_batch_state(status)
+
+        # 워크북별 변환 태스크 실행 (워커 풀에 분산)
+        for workbook in workbooks:
+            if workbook['duplicate_of'] is None:
+                excel_to_ids_batch_item_task.delay(batch_id, references[workbook['hash']], workbook['excel_name'])
+
+        logger.info(f"배치 변환 시작: {batch_id} (워크북 {len(workbooks)}개, 변환 {len(references)}개)")
+
+        return JsonResponse({
+            'success': True,
+            'task_id': batch_id,
+            'total_workbooks': len(workbooks),
+            'unique_workbooks': len(references),
+            'message': f'{len(workbooks)}개 워크북의 배치 변환이 시작되었습니다. 작업 상태를 확인하세요.',
+            'status_url': f'/api/task-status/{batch_id}/'
+        })
+
+    except Exception as e:
+        logger.error(f"API 요청 처리 중 오류: {str(e)}")
+        return JsonResponse({'error': f'요청 처리 중 오류가 발생했습니다: {str(e)}'}, status=500)
+
+
+def batch_folder_name(name: str, folders: set) -> str:
+    """
+    배치 아카이브 안에서 워크북 결과를 담을 폴더 이름 (확장자 제외 경로, 중복 시 번호 추가)
+    """
+    parts = [part for part in name.replace('\\', '/').split('/') if part not in ('', '.', '..')]
+    folder = '/'.join(parts).rsplit('.', 1)[0] or 'workbook'
+    candidate = folder
+    number = 2
+    while candidate in folders:
+        candidate = f"{folder}_{number}"
+        number += 1
+    return candidate
+
+
 @require_http_methods(["GET"])
 def download_template(request):
     """템플릿 파일 다운로드"""
@@ -105,30 +322,50 @@ def ids_to_blender_addon(request):
     logger.info(f"FILES: {request.FILES}")
     
     try:
+        # 청크 업로드로 받은 IDS 파일 (ids_upload_id): multipart 파일 대신 사용
+        if request.POST.get('ids_upload_id'):
+            try:
+                reference = claim_chunked_upload(request.POST['ids_upload_id'], 'IDS', ('.ids',), 10 * 1024 * 1024)
+            except (ValueError, FileNotFoundError) as e:
+                logger.error(f"청크 업로드 사용 오류: {str(e)}")
+                return JsonResponse({'error': str(e)}, status=400)
+            ids_filename = reference['filename']
+        
+        # 파일 저장소에 이미 있는 IDS 파일 (ids_hash + ids_filename): 업로드 생략
+        elif request.POST.get('ids_hash'):
+            try:
+                reference = acquire_stored_file(request.POST['ids_hash'], request.POST.get('ids_filename'), 'IDS', ('.ids',), 10 * 1024 * 1024)
+            except (ValueError, FileNotFoundError) as e:
+                logger.error(f"저장된 파일 사용 오류: {str(e)}")
+                return JsonResponse({'error': str(e)}, status=400)
+            ids_filename = reference['filename']
+        
         # 업로드된 IDS 파일 처리
-        if 'ids_file' not in request.FILES:
-            logger.error("IDS 파일이 없습니다.")
-            return JsonResponse({'error': 'IDS 파일이 없습니다.'}, status=400)
+        else:
+            if 'ids_file' not in request.FILES:
+                logger.error("IDS 파일이 없습니다.")
+                return JsonResponse({'error': 'IDS 파일이 없습니다.'}, status=400)
         
-        ids_file = request.FILES['ids_file']
-        logger.info(f"업로드된 파일: {ids_file.name}, 크기: {ids_file.size}")
+            ids_file = request.FILES['ids_file']
+            logger.info(f"업로드된 파일: {ids_file.name}, 크기: {ids_file.size}")
         
-        # 파일 확장자 검증
-        if not ids_file.name.lower().endswith('.ids'):
-            logger.error(f"잘못된 파일 형식: {ids_file.name}")
-            return JsonResponse({'error': 'IDS 파일만 업로드 가능합니다.'}, status=400)
+            # 파일 확장자 검증
+            if not ids_file.name.lower().endswith('.ids'):
+                logger.error(f"잘못된 파일 형식: {ids_file.name}")
+                return JsonResponse({'error': 'IDS 파일만 업로드 가능합니다.'}, status=400)
         
-        # 파일 크기 검증 (10MB 제한)
-        if ids_file.size > 10 * 1024 * 1024:
-            logger.error(f"파일 크기 초과: {ids_file.size} bytes")
-            return JsonResponse({'error': '파일 크기는 10MB를 초과할 수 없습니다.'}, status=400)
+            # 파일 크기 검증 (10MB 제한)
+            if ids_file.size > 10 * 1024 * 1024:
+                logger.error(f"파일 크기 초과: {ids_file.size} bytes")
+                return JsonResponse({'error': '파일 크기는 10MB를 초과할 수 없습니다.'}, status=400)
         
-        # 파일 내용을 읽어서 Celery 태스크에 전달
-        file_content = ids_file.read()
+            # 업로드를 스풀 볼륨에 받아 파일 저장소에 등록하고 (같은 내용이면 재사용) Celery 태스크에는 해시 참조만 전달
+            reference = blob_store.put(upload_spool.spool(ids_file, ids_file.name), ids_file.name)
+            ids_filename = ids_file.name
         
         # Celery 태스크 실행
         from .tasks import ids_to_blender_addon_task
-        task = ids_to_blender_addon_task.delay(file_content, ids_file.name)
+        task = ids_to_blender_addon_task.delay(reference, ids_filename)
         
         logger.info(f"Celery 태스크 시작: {task.id}")
         
@@ -147,7 +384,10 @@ def ids_to_blender_addon(request):
 @csrf_exempt
 @require_http_methods(["POST"])
 def ifc_ids_review(request):
-    """IFC 파일과 IDS 파일을 비교하여 검증 리포트 생성 (비동기)"""
+    """
+    IFC 파일과 IDS 파일을 비교하여 검증 리포트 생성 (비동기)
+    IFC 파일은 .ifc 외에 압축 파일(.ifczip, .ifc.gz)도 가능 (업로드 크기 제한은 압축된 크기 기준, 압축 해제 크기는 태스크에서 제한)
+    """
     logger.info("=== IFC-IDS 검토 API 요청 시작 ===")
     logger.info(f"요청 메서드: {request.method}")
     logger.info(f"Content-Type: {request.META.get('CONTENT_TYPE', 'N/A')}")
@@ -155,90 +395,95 @@ def ifc_ids_review(request):
     try:
         # JSON 요청 처리 (Smart X Filter 우회용)
         if request.content_type == 'application/json':
-            import json
-            import base64
-            import gzip
-            
-            data = json.loads(request.body)
-            logger.info("JSON 요청 수신 - 압축 해제 시작")
-            
-            # 필수 필드 검증
-            if 'ifc_file' not in data or 'ids_file' not in data:
-                return JsonResponse({'error': '파일 데이터가 없습니다.'}, status=400)
-            
-            if 'ifc_filename' not in data or 'ids_filename' not in data:
-                return JsonResponse({'error': '파일명이 없습니다.'}, status=400)
-            
-            ifc_filename = data['ifc_filename']
-            ids_filename = data['ids_filename']
-            
-            # 파일 형식 검증
-            if not ifc_filename.lower().endswith('.ifc'):
-                return JsonResponse({'error': 'IFC 파일만 업로드 가능합니다.'}, status=400)
-            
-            if not ids_filename.lower().endswith('.ids'):
-                return JsonResponse({'error': 'IDS 파일만 업로드 가능합니다.'}, status=400)
-            
-            # Base64 디코딩 + gzip 압축 해제
+            # 요청 본문을 청크 단위로 읽으며 Base64 디코딩 + gzip 압축 해제하여 스풀에 바로 기록
+            # (본문과 디코딩된 파일을 메모리에 올리지 않고, 크기 제한은 압축 해제 중에 검증)
+            logger.info("JSON 요청 수신 - 스트리밍 압축 해제 시작")
             try:
-                # Base64 디코딩
-                ifc_compressed = base64.b64decode(data['ifc_file'])
-                ids_compressed = base64.b64decode(data['ids_file'])
-                
-                logger.info(f"압축된 크기 - IFC: {len(ifc_compressed)} bytes, IDS: {len(ids_compressed)} bytes")
-                
-                # gzip 압축 해제
-                ifc_content = gzip.decompress(ifc_compressed)
-                ids_content = gzip.decompress(ids_compressed)
-                
-                logger.info(f"압축 해제 완료 - IFC: {len(ifc_content)} bytes, IDS: {len(ids_content)} bytes")
-                logger.info(f"압축률 - IFC: {(1 - len(ifc_compressed)/len(ifc_content))*100:.1f}%")
-                
-            except Exception as e:
-                logger.error(f"파일 디코딩/압축 해제 오류: {str(e)}")
-                return JsonResponse({'error': '파일 디코딩 실패'}, status=400)
-            
-            # 파일 크기 검증 (압축 해제 후)
-            if len(ifc_content) > 100 * 1024 * 1024:
-                return JsonResponse({'error': 'IFC 파일 크기는 100MB를 초과할 수 없습니다.'}, status=400)
-            
-            if len(ids_content) > 10 * 1024 * 1024:
-                return JsonResponse({'error': 'IDS 파일 크기는 10MB를 초과할 수 없습니다.'}, status=400)
-        
+                data, json_uploads = json_upload.read_json_uploads(request, {
+                    'ifc_file': ('IFC', 100 * 1024 * 1024),
+                    'ids_file': ('IDS', 10 * 1024 * 1024),
+                }, settings.DATA_UPLOAD_MAX_MEMORY_SIZE)
+            except ValueError as e:
+                logger.error(f"JSON 요청 처리 오류: {str(e)}")
+                return JsonResponse({'error': str(e)}, status=400)
+
+            for field, upload in json_uploads.items():
+                logger.info(f"압축 해제 완료 - {field}: {upload['compressed_size']} → {upload['size']} bytes")
+                if upload['size']:
+                    logger.info(f"압축률 - {field}: {(1 - upload['compressed_size']/upload['size'])*100:.1f}%")
+
+            try:
+                ifc_filename, ids_filename, ifc_reference, ids_reference = read_review_json_uploads(data, json_uploads)
+            except (ValueError, FileNotFoundError) as e:
+                return JsonResponse({'error': str(e)}, status=400)
+            finally:
+                # 파일 저장소로 이동하지 않은 스풀 삭제
+                for upload in json_uploads.values():
+                    upload_spool.release(upload)
+
         # 기존 multipart/form-data 방식도 지원
+        # 각 파일 대신 완료된 청크 업로드 ID(ifc_upload_id, ids_upload_id, 대용량 IFC) 또는
+        # 파일 저장소에 이미 있는 파일의 해시(ifc_hash + ifc_filename, ids_hash + ids_filename, 업로드 생략)도 사용 가능
         else:
-            if 'ifc_file' not in request.FILES:
+            if 'ifc_file' not in request.FILES and not request.POST.get('ifc_upload_id') and not request.POST.get('ifc_hash'):
                 return JsonResponse({'error': 'IFC 파일이 없습니다.'}, status=400)
-            
-            if 'ids_file' not in request.FILES:
+
+            if 'ids_file' not in request.FILES and not request.POST.get('ids_upload_id') and not request.POST.get('ids_hash'):
                 return JsonResponse({'error': 'IDS 파일이 없습니다.'}, status=400)
+
+            ifc_file = request.FILES.get('ifc_file')
+            ids_file = request.FILES.get('ids_file')
+            ifc_hash = None if ifc_file is not None else request.POST.get('ifc_hash')
+            ids_hash = None if ids_file is not None else request.POST.get('ids_hash')
             
-            ifc_file = request.FILES['ifc_file']
-            ids_file = request.FILES['ids_file']
-            
-            ifc_filename = ifc_file.name
-            ids_filename = ids_file.name
-            
-            # 파일 형식 검증
-            if not ifc_filename.lower().endswith('.ifc'):
-                return JsonResponse({'error': 'IFC 파일만 업로드 가능합니다.'}, status=400)
-            
-            if not ids_filename.lower().endswith('.ids'):
-                return JsonResponse({'error': 'IDS 파일만 업로드 가능합니다.'}, status=400)
-            
-            # 파일 크기 제한
-            if ifc_file.size > 100 * 1024 * 1024:
-                return JsonResponse({'error': 'IFC 파일 크기는 100MB를 초과할 수 없습니다.'}, status=400)
+            if ifc_file is not None:
+                ifc_filename = ifc_file.name
+                
+                # 파일 형식 검증
+                if not ifc_filename.lower().endswith(IFC_EXTENSIONS):
+                    return JsonResponse({'error': 'IFC 파일만 업로드 가능합니다.'}, status=400)
+                
+                # 파일 크기 제한 (압축 파일은 압축된 크기)
+                if ifc_file.size > 100 * 1024 * 1024:
+                    return JsonResponse({'error': 'IFC 파일 크기는 100MB를 초과할 수 없습니다.'}, status=400)
             
-            if ids_file.size > 10 * 1024 * 1024:
-                return JsonResponse({'error': 'IDS 파일 크기는 10MB를 초과할 수 없습니다.'}, status=400)
+            if ids_file is not None:
+                ids_filename = ids_file.name
+                
+                if not ids_filename.lower().endswith('.ids'):
+                    return JsonResponse({'error': 'IDS 파일만 업로드 가능합니다.'}, status=400)
+                
+                if ids_file.size > 10 * 1024 * 1024:
+                    return JsonResponse({'error': 'IDS 파일 크기는 10MB를 초과할 수 없습니다.'}, status=400)
             
-            ifc_content = ifc_file.read()
-            ids_content = ids_file.read()
-        
+            # 청크 업로드와 저장된 파일은 두 파일을 모두 검증한 뒤에 사용 (업로드 ID는 한 번만 사용 가능)
+            ifc_reference = None
+            ids_reference = None
+            try:
+                if ifc_hash:
+                    ifc_reference = acquire_stored_file(ifc_hash, request.POST.get('ifc_filename'), 'IFC', IFC_EXTENSIONS, settings.IDS_CHUNKED_UPLOAD_MAX_BYTES)
+                    ifc_filename = ifc_reference['filename']
+                elif ifc_file is None:
+                    ifc_filename = check_chunked_upload(request.POST['ifc_upload_id'], 'IFC', IFC_EXTENSIONS, settings.IDS_CHUNKED_UPLOAD_MAX_BYTES)['filename']
+                if ids_hash:
+                    ids_reference = acquire_stored_file(ids_hash, request.POST.get('ids_filename'), 'IDS', ('.ids',), 10 * 1024 * 1024)
+                    ids_filename = ids_reference['filename']
+                elif ids_file is None:
+                    ids_filename = check_chunked_upload(request.POST['ids_upload_id'], 'IDS', ('.ids',), 10 * 1024 * 1024)['filename']
+            except (ValueError, FileNotFoundError) as e:
+                if ifc_reference is not None:
+                    blob_store.release(ifc_reference)
+                return JsonResponse({'error': str(e)}, status=400)
+
+            # 업로드를 스풀 볼륨에 받아 파일 저장소에 등록하고 Celery 태스크에는 해시 참조만 전달 (청크 업로드는 이미 저장소에 있음)
+            if ifc_reference is None:
+                ifc_reference = chunked_upload.claim(request.POST['ifc_upload_id']) if ifc_file is None else blob_store.put(upload_spool.spool(ifc_file, ifc_filename), ifc_filename)
+            if ids_reference is None:
+                ids_reference = chunked_upload.claim(request.POST['ids_upload_id']) if ids_file is None else blob_store.put(upload_spool.spool(ids_file, ids_filename), ids_filename)
+
         # Celery 태스크 실행
         from .tasks import ifc_ids_review_task
-        task = ifc_ids_review_task.delay(ifc_content, ifc_filename, ids_content, ids_filename)
+        task = ifc_ids_review_task.delay(ifc_reference, ifc_filename, ids_reference, ids_filename)
         
         logger.info(f"Celery 태스크 시작: {task.id}")
         
@@ -254,6 +499,208 @@ def ifc_ids_review(request):
         return JsonResponse({'error': f'요청 처리 중 오류가 발생했습니다: {str(e)}'}, status=500)
 
 
+def read_review_json_uploads(data: dict, json_uploads: dict) -> tuple:
+    """
+    IFC-IDS 검토 JSON 요청의 필드 검증 후 (IFC 파일명, IDS 파일명, IFC 파일 참조, IDS 파일 참조) 반환
+    파일 데이터(ifc_file, ids_file) 대신 파일 저장소에 이미 있는 파일의 해시(ifc_hash, ids_hash)도 사용 가능
+    스풀된 파일은 파일 저장소로 이동, 잘못된 요청이면 ValueError, 해시의 파일이 저장소에 없으면 FileNotFoundError
+    """
+    # 필수 필드 검증
+    for field in ('ifc', 'ids'):
+        if f'{field}_file' not in data and f'{field}_file' not in json_uploads and f'{field}_hash' not in data:
+            raise ValueError('파일 데이터가 없습니다.')
+    
+    if 'ifc_filename' not in data or 'ids_filename' not in data:
+        raise ValueError('파일명이 없습니다.')
+    
+    ifc_filename = data['ifc_filename']
+    ids_filename = data['ids_filename']
+    
+    # 파일 형식 검증
+    if not isinstance(ifc_filename, str) or not ifc_filename.lower().endswith(IFC_EXTENSIONS):
+        raise ValueError('IFC 파일만 업로드 가능합니다.')
+    
+    if not isinstance(ids_filename, str) or not ids_filename.lower().endswith('.ids'):
+        raise ValueError('IDS 파일만 업로드 가능합니다.')
+    
+    # 문자열이 아닌 파일 데이터
+    for field in ('ifc', 'ids'):
+        if f'{field}_file' not in json_uploads and f'{field}_hash' not in data:
+            raise ValueError(json_upload.DECODE_ERROR)
+
+    references = []
+    try:
+        for field, filename, kind, extensions, max_bytes in (
+            ('ifc', ifc_filename, 'IFC', IFC_EXTENSIONS, settings.IDS_CHUNKED_UPLOAD_MAX_BYTES),
+            ('ids', ids_filename, 'IDS', ('.ids',), 10 * 1024 * 1024),
+        ):
+            if f'{field}_file' in json_uploads:
+                references.append(blob_store.put(json_uploads[f'{field}_file'], filename))
+            else:
+                references.append(acquire_stored_file(data[f'{field}_hash'], filename, kind, extensions, max_bytes))
+    except BaseException:
+        for reference in references:
+            blob_store.release(reference)
+        raise
+    return ifc_filename, ids_filename, references[0], references[1]
+
+
+def acquire_stored_file(digest: str, filename: str, kind: str, extensions: tuple, max_bytes: int) -> dict:
+    """
+    업로드 대신 사용할 파일 저장소의 파일(SHA-256 해시) 검증 (파일 형식, 크기) 후 태스크 입력 참조 획득
+    잘못된 요청이면 ValueError, 저장소에 없으면 FileNotFoundError (클라이언트는 파일을 다시 업로드)
+    """
+    if not isinstance(filename, str) or not filename.lower().endswith(extensions):
+        raise ValueError(f'{kind} 파일만 업로드 가능합니다.')
+    reference = blob_store.acquire(str(digest).lower(), filename)
+    if reference['size'] > max_bytes:
+        blob_store.release(reference)
+        raise ValueError(f'{kind} 파일 크기는 {max_bytes // (1024 * 1024)}MB를 초과할 수 없습니다.')
+    return reference
+
+
+def check_chunked_upload(upload_id: str, kind: str, extensions: tuple, max_bytes: int) -> dict:
+    """
+    multipart 파일 대신 사용할 청크 업로드 검증 (완료 여부, 파일 형식, 크기) 후 업로드 상태 반환
+    잘못된 업로드면 ValueError, 없으면 FileNotFoundError (업로드는 유지되어 다시 사용 가능)
+    """
+    status = chunked_upload.get_status(upload_id)
+    if status['state'] != 'COMPLETE':
+        raise ValueError('업로드가 완료되지 않았습니다.')
+    if not status['filename'].lower().endswith(extensions):
+        raise ValueError(f'{kind} 파일만 업로드 가능합니다.')
+    if status['size'] > max_bytes:
+        raise ValueError(f'{kind} 파일 크기는 {max_bytes // (1024 * 1024)}MB를 초과할 수 없습니다.')
+    return status
+
+
+def claim_chunked_upload(upload_id: str, kind: str, extensions: tuple, max_bytes: int) -> dict:
+    """
+    청크 업로드를 검증(check_chunked_upload)한 뒤 파일 저장소 참조를 받아 업로드 ID 삭제 (참조는 태스크가 반환)
+    """
+    check_chunked_upload(upload_id, kind, extensions, max_bytes)
+    return chunked_upload.claim(upload_id)
+
+
+@csrf_exempt
+@require_http_methods(["POST"])
+def chunked_upload_init(request):
+    """
+    청크 업로드 시작 API: JSON {filename, size, sha256, chunk_size(선택)}
+    대용량 파일을 여러 청크로 나누어 (병렬로) 전송하고, 연결이 끊기면 status 의 missing_chunks 부터 이어서 전송
+    """
+    try:
+        try:
+            data = json.loads(request.body)
+        except ValueError:
+            data = None
+        if not isinstance(data, dict):
+            return JsonResponse({'error': '요청 형식이 올바르지 않습니다.'}, status=400)
+
+        try:
+            status = chunked_upload.init(data.get('filename'), data.get('size'), data.get('sha256'), data.get('chunk_size'))
+        except ValueError as e:
+            logger.error(f"청크 업로드 시작 오류: {str(e)}")
+            return JsonResponse({'error': str(e)}, status=400)
+
+        return JsonResponse(dict(status, **{
+            'success': True,
+            'chunk_url': f"/api/uploads/{status['upload_id']}/chunk/",
+            'complete_url': f"/api/uploads/{status['upload_id']}/complete/",
+            'status_url': f"/api/uploads/{status['upload_id']}/",
+        }))
+
+    except Exception as e:
+        logger.error(f"API 요청 처리 중 오류: {str(e)}")
+        return JsonResponse({'error': f'요청 처리 중 오류가 발생했습니다: {str(e)}'}, status=500)
+
+
+@csrf_exempt
+@require_http_methods(["PUT"])
+def chunked_upload_chunk(request, upload_id):
+    """
+    청크 전송 API: 본문 = 청크 바이트, ?offset=청크 시작 위치, X-Chunk-SHA256 헤더 = 청크 SHA-256
+    본문을 메모리에 모으지 않고 업로드 파일의 해당 위치에 바로 기록, 해시가 맞지 않으면 400 (같은 청크 재전송 가능)
+    """
+    try:
+        try:
+            offset = int(request.GET.get('offset', ''))
+        except ValueError:
+            return JsonResponse({'error': '청크 위치(offset)가 없습니다.'}, status=400)
+
+        try:
+            status = chunked_upload.write_chunk(upload_id, offset, request.META.get('HTTP_X_CHUNK_SHA256'), request)
+        except FileNotFoundError as e:
+            return JsonResponse({'error': str(e)}, status=404)
+        except ValueError as e:
+            logger.error(f"청크 업로드 오류: {upload_id} - {str(e)}")
+            return JsonResponse({'error': str(e)}, status=400)
+
+        return JsonResponse(dict(status, success=True))
+
+    except Exception as e:
+        logger.error(f"API 요청 처리 중 오류: {str(e)}")
+        return JsonResponse({'error': f'요청 처리 중 오류가 발생했습니다: {str(e)}'}, status=500)
+
+
+@csrf_exempt
+@require_http_methods(["POST"])
+def chunked_upload_complete(request, upload_id):
+    """
+    청크 업로드 완료 API: 모든 청크를 받았는지 확인하고 조립된 파일 전체의 SHA-256 검증
+    완료된 upload_id 는 excel_upload_id, ids_upload_id, ifc_upload_id 로 각 API에 파일 대신 전달
+    """
+    try:
+        try:
+            status = chunked_upload.complete(upload_id)
+        except FileNotFoundError as e:
+            return JsonResponse({'error': str(e)}, status=404)
+        except ValueError as e:
+            logger.error(f"청크 업로드 완료 오류: {upload_id} - {str(e)}")
+            return JsonResponse({'error': str(e)}, status=400)
+
+        return JsonResponse(dict(status, success=True))
+
+    except Exception as e:
+        logger.error(f"API 요청 처리 중 오류: {str(e)}")
+        return JsonResponse({'error': f'요청 처리 중 오류가 발생했습니다: {str(e)}'}, status=500)
+
+
+@require_http_methods(["GET"])
+def chunked_upload_status(request, upload_id):
+    """청크 업로드 상태 조회 API (받은 청크 received_chunks, 남은 청크 missing_chunks)"""
+    try:
+        try:
+            status = chunked_upload.get_status(upload_id)
+        except FileNotFoundError as e:
+            return JsonResponse({'error': str(e)}, status=404)
+
+        return JsonResponse(dict(status, success=True))
+
+    except Exception as e:
+        logger.error(f"청크 업로드 상태 조회 오류: {str(e)}")
+        return JsonResponse({'error': f'청크 업로드 상태 조회 중 오류가 발생했습니다: {str(e)}'}, status=500)
+
+
+@require_http_methods(["GET", "HEAD"])
+def blob_lookup(request, digest):
+    """
+    파일 저장소 조회 API: 해당 SHA-256 의 파일이 이미 있으면 200, 없으면 404
+    있으면 파일 대신 excel_hash, ids_hash, ifc_hash (+ 파일명)로 각 API에 전달하여 업로드 생략
+    """
+    try:
+        # GET 조회만 LRU 순서 갱신 (HEAD 는 저장소에 기록하지 않음)
+        stored = blob_store.lookup(digest.lower(), touch=request.method == 'GET')
+        if stored is None:
+            return JsonResponse({'exists': False, 'hash': digest}, status=404)
+
+        return JsonResponse(dict(stored, exists=True))
+
+    except Exception as e:
+        logger.error(f"파일 저장소 조회 오류: {str(e)}")
+        return JsonResponse({'error': f'파일 저장소 조회 중 오류가 발생했습니다: {str(e)}'}, status=500)
+
+
 @require_http_methods(["GET"])
 def task_status(request, task_id):
     """Celery 태스크 상태 확인 API"""
@@ -262,6 +709,12 @@ def task_status(request, task_id):
         
         # 태스크 결과 조회
         result = AsyncResult(task_id)
+
+        # 배치 변환: 기한이 지나도록 끝나지 않은 워크북은 실패로 기록하고 배치 완료
+        if result.state == 'PROGRESS' and 'workbooks' in result.info:
+            from .tasks import store_batch_state
+            if batch_archive.expire(task_id, on_update=store_batch_state):
+                result = AsyncResult(task_id)
         
         if result.state == 'PENDING':
             response = {
@@ -277,6 +730,9 @@ def task_status(request, task_id):
                 'total': result.info.get('total', 1),
                 'status': result.info.get('status', '')
             }
+            # 배치 변환: 워크북별 상태
+            if 'workbooks' in result.info:
+                response['workbooks'] = result.info['workbooks']
         elif result.state == 'SUCCESS':
             response = {
                 'task_id': task_id,
@@ -327,11 +783,11 @@ def download_result(request, task_id):
         if not file_path or not os.path.exists(file_path):
             return JsonResponse({'error': '결과 파일을 찾을 수 없습니다.'}, status=404)
         
-        # 파일 다운로드
-        with open(file_path, 'rb') as f:
-            response = HttpResponse(f.read(), content_type='application/octet-stream')
-            response['Content-Disposition'] = f'attachment; filename="{filename}"'
-            return response
+        # 파일 다운로드 (스트리밍 응답, 파일 전체를 메모리에 올리지 않음)
+        content_type = 'application/zip' if filename.lower().endswith('.zip') else 'application/octet-stream'
+        response = FileResponse(open(file_path, 'rb'), content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
             
     except Exception as e:
         logger.error(f"결과 파일 다운로드 오류: {str(e)}")
@@ -347,7 +803,13 @@ def api_info(request):
                 'url': '/api/excel-to-ids/',
                 'method': 'POST',
                 'description': 'Excel 파일을 IDS 파일로 변환',
-                'parameters': ['excel_file (multipart/form-data)']
+                'parameters': ['excel_file (multipart/form-data) 또는 excel_upload_id (완료된 청크 업로드) 또는 excel_hash, excel_filename (저장된 파일)', 'excel_base_hash (선택, 이전 버전 워크북의 응답 workbook_hash - 증분 변환)', 'preview (선택, true면 IDS 파일 없이 미리보기 결과만 생성)']
+            },
+            'excel_to_ids_batch': {
+                'url': '/api/excel-to-ids/batch/',
+                'method': 'POST',
+                'description': '여러 Excel 파일을 IDS 파일로 일괄 변환 (결과는 하나의 ZIP 아카이브)',
+                'parameters': ['archive (ZIP, multipart/form-data) 또는 excel_files (여러 파일, multipart/form-data)']
             },
             'download_template': {
                 'url': '/api/download/template/',
@@ -365,13 +827,43 @@ def api_info(request):
                 'url': '/api/ids-to-blender-addon/',
                 'method': 'POST',
                 'description': 'IDS 파일을 Blender Add-on으로 변환',
-                'parameters': ['ids_file (multipart/form-data)']
+                'parameters': ['ids_file (multipart/form-data) 또는 ids_upload_id (완료된 청크 업로드) 또는 ids_hash, ids_filename (저장된 파일)']
             },
             'ifc_ids_review': {
                 'url': '/api/ifc-ids-review/',
                 'method': 'POST',
-                'description': 'IFC 파일과 IDS 파일 검증 및 리뷰 리포트 생성',
-                'parameters': ['ifc_file', 'ids_file (multipart/form-data)']
+                'description': 'IFC 파일(.ifc, .ifczip, .ifc.gz)과 IDS 파일 검증 및 리뷰 리포트 생성',
+                'parameters': ['ifc_file', 'ids_file (multipart/form-data) 또는 ifc_upload_id, ids_upload_id (완료된 청크 업로드) 또는 ifc_hash, ids_hash (저장된 파일, 파일명 ifc_filename, ids_filename)']
+            },
+            'chunked_upload_init': {
+                'url': '/api/uploads/',
+                'method': 'POST',
+                'description': '청크 업로드 시작 (대용량 파일, 중단 시 이어서 전송)',
+                'parameters': ['filename', 'size', 'sha256', 'chunk_size (선택, JSON)']
+            },
+            'chunked_upload_chunk': {
+                'url': '/api/uploads/{upload_id}/chunk/?offset={offset}',
+                'method': 'PUT',
+                'description': '청크 전송 (본문 = 청크 바이트)',
+                'parameters': ['offset (query)', 'X-Chunk-SHA256 (header)']
+            },
+            'chunked_upload_complete': {
+                'url': '/api/uploads/{upload_id}/complete/',
+                'method': 'POST',
+                'description': '청크 업로드 완료 (파일 전체 SHA-256 검증)',
+                'parameters': ['upload_id (URL parameter)']
+            },
+            'chunked_upload_status': {
+                'url': '/api/uploads/{upload_id}/',
+                'method': 'GET',
+                'description': '청크 업로드 상태 조회 (받은 청크, 남은 청크)',
+                'parameters': ['upload_id (URL parameter)']
+            },
+            'blob_lookup': {
+                'url': '/api/blobs/{sha256}/',
+                'method': 'GET',
+                'description': '파일 저장소 조회 (같은 내용의 파일이 이미 있으면 업로드 생략)',
+                'parameters': ['sha256 (URL parameter)']
             },
             'task_status': {
                 'url': '/api/task-status/{task_id}/',
@@ -120,15 +120,73 @@ CORS_ALLOWED_ORIGINS = [
 CORS_ALLOW_CREDENTIALS = True
 
 # 파일 업로드 설정
-FILE_UPLOAD_MAX_MEMORY_SIZE = 150 * 1024 * 1024  # 150MB (Base64 인코딩으로 약 133% 증가)
+# 업로드 파일은 메모리에 올리지 않고 스풀 볼륨의 임시 파일로 받음 (스풀 등록 시 하드 링크로 복사 없이 이동)
+FILE_UPLOAD_MAX_MEMORY_SIZE = env.int('FILE_UPLOAD_MAX_MEMORY_SIZE', default=2621440)  # 2.5MB
 DATA_UPLOAD_MAX_MEMORY_SIZE = 150 * 1024 * 1024  # 150MB (Base64 인코딩으로 약 133% 증가)
 
+# 업로드 스풀: 뷰가 업로드를 MEDIA_ROOT 아래 공유 볼륨에 저장하고 Celery 태스크에는 경로/크기/해시만 전달
+IDS_UPLOAD_SPOOL_DIR = env('IDS_UPLOAD_SPOOL_DIR', default=os.path.join(MEDIA_ROOT, 'spool'))
+IDS_UPLOAD_SPOOL_MAX_AGE_SECONDS = env.int('IDS_UPLOAD_SPOOL_MAX_AGE_SECONDS', default=24 * 60 * 60)  # 처리되지 못한 스풀 보관 기간
+# 메모리 한도를 넘는 업로드의 임시 파일은 스풀 볼륨(IDS_UPLOAD_SPOOL_DIR/.incoming)에 받음, 디렉토리는 첫 업로드에서 생성
+FILE_UPLOAD_HANDLERS = [
+    'django.core.files.uploadhandler.MemoryFileUploadHandler',
+    'api.upload_spool.SpoolTemporaryFileUploadHandler',
+]
+
+# 청크 업로드 (대용량 IFC 등): init → 청크 PUT (offset + SHA-256) → complete, 중단된 업로드는 받은 청크부터 이어서 전송
+# 업로드 디렉토리는 파일 저장소와 같은 볼륨에 두어 완료된 파일을 복사 없이 파일 저장소로 이동
+IDS_CHUNKED_UPLOAD_DIR = env('IDS_CHUNKED_UPLOAD_DIR', default=os.path.join(MEDIA_ROOT, 'uploads'))
+IDS_CHUNKED_UPLOAD_MAX_BYTES = env.int('IDS_CHUNKED_UPLOAD_MAX_BYTES', default=2 * 1024 * 1024 * 1024)  # 2GB
+IDS_CHUNKED_UPLOAD_CHUNK_SIZE = env.int('IDS_CHUNKED_UPLOAD_CHUNK_SIZE', default=8 * 1024 * 1024)  # 8MB (기본 청크 크기)
+IDS_CHUNKED_UPLOAD_MAX_CHUNK_SIZE = env.int('IDS_CHUNKED_UPLOAD_MAX_CHUNK_SIZE', default=64 * 1024 * 1024)  # 64MB
+IDS_CHUNKED_UPLOAD_MAX_AGE_SECONDS = env.int('IDS_CHUNKED_UPLOAD_MAX_AGE_SECONDS', default=24 * 60 * 60)  # 갱신 없는 업로드 보관 기간
+
+# 파일 저장소 (SHA-256 기준, 같은 내용의 IFC/IDS/Excel 파일은 한 번만 저장): 클라이언트는 해시로 존재 여부를 확인하고 업로드 생략
+# 태스크가 사용 중인 파일(lease)은 제외하고 전체 크기 상한을 넘으면 오래 사용되지 않은 파일부터 제거 (LRU)
+IDS_BLOB_STORE_DIR = env('IDS_BLOB_STORE_DIR', default=os.path.join(MEDIA_ROOT, 'blobs'))
+IDS_BLOB_STORE_MAX_BYTES = env.int('IDS_BLOB_STORE_MAX_BYTES', default=10 * 1024 * 1024 * 1024)  # 10GB
+IDS_BLOB_LEASE_SECONDS = env.int('IDS_BLOB_LEASE_SECONDS', default=24 * 60 * 60)  # 반환되지 않은 태스크 참조 만료 시간
+
 # Celery 기본 설정 (환경변수로도 주입됨)
 CELERY_BROKER_URL = env('CELERY_BROKER_URL', default=os.getenv('CELERY_BROKER_URL', 'redis://redis:6379/0'))
 CELERY_RESULT_BACKEND = env('CELERY_RESULT_BACKEND', default=os.getenv('CELERY_RESULT_BACKEND', 'redis://redis:6379/0'))
 CELERY_TIMEZONE = TIME_ZONE
 CELERY_TASK_ALWAYS_EAGER = env.bool('CELERY_TASK_ALWAYS_EAGER', default=False)
 
+# IDS-converter(IDS4ALL) 설정 - 워커 프로세스 안에서 직접 import 하여 실행
+IDS_CONVERTER_PATH = env('IDS_CONVERTER_PATH', default=os.path.join(BASE_DIR, 'libs', 'ids-converter'))
+# 서브프로세스 실행 대비 절감 시간 측정 여부 (워커 프로세스 기동 시 백그라운드에서 1회 측정, 변환 결과 timing 에 포함)
+IDS_CONVERTER_MEASURE_SUBPROCESS = env.bool('IDS_CONVERTER_MEASURE_SUBPROCESS', default=False)
+# 워크북 한 개의 변환 시간 상한 (Celery soft_time_limit, 기존 서브프로세스 실행의 timeout 과 동일) - 초과 시 변환 실패
+IDS_CONVERTER_TIME_LIMIT_SECONDS = env.int('IDS_CONVERTER_TIME_LIMIT_SECONDS', default=60)
+# 한 행의 적용 조건(OR 값) 조합 수 상한 - 초과 시 해당 행 번호와 함께 변환 실패
+IDS_CONVERTER_MAX_COMBINATIONS = env.int('IDS_CONVERTER_MAX_COMBINATIONS', default=10000)
+
+# IDS 파일 로더 (태스크별 선택): 'lxml' = 컴파일된 스키마 캐시 + 객체 직접 생성, 'ifctester' = ids.open (xmlschema 디코딩)
+IDS_CONVERSION_CHECK_READER = env('IDS_CONVERSION_CHECK_READER', default='lxml')  # Excel→IDS 변환 후 검증
+IDS_REVIEW_READER = env('IDS_REVIEW_READER', default='lxml')  # IFC-IDS 검토
+
+# IFC-IDS 검토: 압축된 IFC(.ifczip, .ifc.gz)의 압축 해제 크기 상한 (압축을 풀면서 검증, 업로드 크기 제한은 압축된 크기 기준)
+IDS_IFC_MAX_DECOMPRESSED_BYTES = env.int('IDS_IFC_MAX_DECOMPRESSED_BYTES', default=1024 * 1024 * 1024)  # 1GB
+
+# Excel→IDS 배치 변환: 한 요청에서 변환할 수 있는 최대 워크북 수
+IDS_BATCH_MAX_WORKBOOKS = env.int('IDS_BATCH_MAX_WORKBOOKS', default=200)
+# 한 요청의 워크북 전체 크기 (ZIP 은 압축 해제 크기 기준, 파일을 저장하기 전에 검증)
+IDS_BATCH_MAX_BYTES = env.int('IDS_BATCH_MAX_BYTES', default=500 * 1024 * 1024)  # 500MB
+# 배치 변환 기한: 이 시간 안에 결과가 오지 않은 워크북(유실된 태스크)은 상태 조회 시 실패로 기록하고 아카이브 완료
+IDS_BATCH_TIMEOUT_SECONDS = env.int('IDS_BATCH_TIMEOUT_SECONDS', default=60 * 60)  # 1시간
+
+# Excel→IDS 변환 결과 캐시 (워크북 SHA-256 + 변환기 버전 기준, media 볼륨에 저장, LRU 제거)
+IDS_CONVERSION_CACHE_ENABLED = env.bool('IDS_CONVERSION_CACHE_ENABLED', default=True)
+IDS_CONVERSION_CACHE_DIR = env('IDS_CONVERSION_CACHE_DIR', default=os.path.join(MEDIA_ROOT, 'cache', 'excel-to-ids'))
+IDS_CONVERSION_CACHE_MAX_BYTES = env.int('IDS_CONVERSION_CACHE_MAX_BYTES', default=512 * 1024 * 1024)  # 512MB
+
+# Excel→IDS 증분 변환: 이전 버전 워크북의 해시(excel_base_hash)와 함께 업로드된 워크북은 이전 변환의 행/명세 결과를 재사용하고 변경된 행만 다시 처리
+# 상태 파일은 워크북 해시별로 저장하고 SECRET_KEY 로 서명 (서명이 맞지 않는 파일은 사용하지 않음)
+IDS_INCREMENTAL_CONVERSION_ENABLED = env.bool('IDS_INCREMENTAL_CONVERSION_ENABLED', default=True)
+IDS_INCREMENTAL_STATE_DIR = env('IDS_INCREMENTAL_STATE_DIR', default=os.path.join(MEDIA_ROOT, 'cache', 'excel-to-ids-incremental'))
+IDS_INCREMENTAL_STATE_MAX_BYTES = env.int('IDS_INCREMENTAL_STATE_MAX_BYTES', default=256 * 1024 * 1024)  # 256MB
+
 # 로깅 설정
 LOGGING = {
     'version': 1,
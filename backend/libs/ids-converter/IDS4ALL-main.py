@@ -1,9 +1,6 @@
 import argparse
 import os
-from datetime import date
-import pandas as pd
-from ifctester import ids
-from custom_functions import *
+from ids4all import open_excel_source, preview_excel_to_ids, get_metadata, process_excel_data, create_ids_files, load_incremental_state, save_incremental_state, ConversionContext, MAX_COMBINATIONS_PER_ROW
 
 #Default settings
 excel_path_default = "./Excel-files/"
@@ -34,6 +31,37 @@ def parse_arguments():
         default=output_path_default,
         help="Path to the output directory for IDS files.",
     )
+    parser.add_argument(
+        "--max_combinations",
+        type=int,
+        default=MAX_COMBINATIONS_PER_ROW,
+        help="Maximum number of applicability combinations a single row may expand into.",
+    )
+    parser.add_argument(
+        "--validate",
+        action="store_true",
+        help="Validate the written IDS files against the IDS schema.",
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        help="Number of worker processes writing the IDS files of the file separators in parallel (0 = number of CPU cores).",
+    )
+    parser.add_argument(
+        "--state",
+        help="Path of the incremental conversion state. If it contains the state of a previous version of the workbook, only changed rows are processed again.",
+    )
+    parser.add_argument(
+        "--preview",
+        action="store_true",
+        help="Only parse and merge the Excel data and report the specification counts per IDS file and all invalid rows without writing IDS files.",
+    )
+    parser.add_argument(
+        "--stages",
+        action="store_true",
+        help="Print the time of each stage of the conversion and its counters (rows, specifications, DeepDiff calls, merges).",
+    )
 
     args = parser.parse_args()
     
@@ -42,84 +70,35 @@ def parse_arguments():
 
     return args
 
-def get_metadata(excel_path, excel_name, excel_format, sheet_name):
-    """Extract metadata from the Excel file."""
-    full_excel_path = os.path.join(excel_path, excel_name + excel_format)
-    
-    # Load Excel data
-    data = pd.read_excel(full_excel_path, sheet_name='IDS4ALL', usecols=[0, 1], header=None, skiprows=1)
-    
-    # Convert data to a dictionary
-    data_dict = {key: value for key, value in zip(data[0], data[1]) if pd.notna(value)}
-    
-    # Validate required metadata
-    required_metadata = ['Sheet name', 'IFC version']
-    for meta in required_metadata:
-        if meta not in data_dict:
-            raise Exception(f'{meta} is not defined in the Excel')
-    
-    sheet_name = data_dict['Sheet name']
-    ifc_version = data_dict['IFC version'].replace(' ','').replace(',','|')
-    separate_by = data_dict['File separators'].replace(' ','').split(',') if 'File separators' in data_dict else []
-    skipped_rows = data_dict['Skipped rows'] if 'Skipped rows' in data_dict else 0
-    is_entity_based_app = True if 'Entity-based applicability' in data_dict and data_dict['Entity-based applicability'].lower() == 'yes' else False
-    
-    return sheet_name, ifc_version, separate_by, skipped_rows, is_entity_based_app, data_dict
-
-def process_excel_data(excel_path, excel_name, excel_format, sheet_name, separate_by, skipped_rows, ifc_version, is_entity_based_app):
-    full_excel_path = os.path.join(excel_path, excel_name + excel_format)
-    
-    # Convert Excel data to specifications
-    excel_data = excel_to_spec_list(full_excel_path, sheet_name, separate_by, skipped_rows, ifc_version, is_entity_based_app)
-    
-    # Separate specifications by general data
-    separated_excel_data = separate_specs_by_generaldata(excel_data, separate_by)
-    
-    return separated_excel_data
+def print_preview(preview):
+    """Print the result of a preview (see preview_excel_to_ids)."""
+    print(f"Rows: {preview['rows']}")
+    print(f"Applicability combinations: {preview['combinations']} (max. {preview['max_combinations_per_row']} per row)")
+    print(f"Specifications: {preview['specification_count']}")
+    print()
+    for file in preview['files']:
+        print(f"{file['filename']}: {file['specification_count']} specifications")
+    for row_error in preview['row_errors']:
+        print(f"Error in row {row_error['row']}: {row_error['error']}")
+    for incomplete_facet in preview['incomplete_facets']:
+        print(f"Incomplete facet in {incomplete_facet['filename']}, {incomplete_facet['specification']}: {incomplete_facet['facet']}. {incomplete_facet['error']}")
 
-def create_ids_files(separated_excel_data, data_dict, output_path, excel_name, sheet_name):
-    for key in separated_excel_data.keys():
-        sep_data = separated_excel_data[key]
-        
-        # Construct purpose and milestone strings
-        string_milestone = ''
-        string_purpose = ''
-        if len(sep_data['general']['Phase']) != 0: string_milestone += ', '.join(sep_data['general']['Phase'])
-        if len(sep_data['general']['Role']) != 0: string_purpose += 'Role: ' + ', '.join(sep_data['general']['Role']) + '; '
-        if len(sep_data['general']['Usecase']) != 0: string_purpose += 'Usecase: ' + ', '.join(sep_data['general']['Usecase']) + '; '
-        string_purpose = string_purpose[0:len(string_purpose)-2]
-        
-        # Create IDS object
-        my_ids = ids.Ids(
-            title=data_dict['Title'] if 'Title' in data_dict else 'Not Defined',
-            copyright=data_dict['Copyright'] if 'Copyright' in data_dict else None,
-            version=data_dict['Version'] if 'Version' in data_dict else None,
-            description=data_dict['Description'] if 'Description' in data_dict else None,
-            author=data_dict['Author'] if 'Author' in data_dict else None,
-            date=date.today().strftime('%Y-%m-%d'),
-            purpose=string_purpose if string_purpose != '' else None,
-            milestone=string_milestone if string_milestone != '' else None,
-        )
-        
-        # Create IDS specifications
-        create_ids_specifications(my_ids, sep_data['specs'])
-        
-        try:
-            # Prepare output path and filename
-            key = key.replace('/','-')
-            os.makedirs(output_path, exist_ok=True)
-            filename = excel_name + '_' + sheet_name + key + '.ids'
-            output_path_full = os.path.join(output_path, filename)
-            
-            # Save IDS file
-            result = my_ids.to_xml(output_path_full)
-            
-            # Add comment to XML
-            add_comment_to_xml(output_path_full, ' Created with the IDS4ALL Converter developed by Simon Fischer, Harald Urban, Konstantin Höbart, and Christian Schranz of TU Wien Research Unit Digital Building Process (https://www.tuwien.at/en/cee/ibb/zdb). ')
-            print('XML created')
-            print(f'Output file: {output_path_full}')
-        except Exception as error:
-            print('Error: ', error)
+def print_statistics(statistics):
+    """Print the stage times and counters of a conversion (see ConversionContext.statistics)."""
+    total_seconds = sum(statistics['stages'].values())
+    print()
+    print("Stage                          Seconds   Share")
+    for stage, seconds in statistics['stages'].items():
+        print(f"{stage:<30} {seconds:>7.3f} {seconds / total_seconds if total_seconds else 0:>7.1%}")
+    print(f"{'total':<30} {total_seconds:>7.3f}")
+    if 'worker_stages' in statistics:
+        print()
+        print("Worker stage (all workers)     Seconds")
+        for stage, seconds in statistics['worker_stages'].items():
+            print(f"{stage:<30} {seconds:>7.3f}")
+    print()
+    for counter, number in statistics['counters'].items():
+        print(f"{counter}: {number}")
 
 def main():
     args = parse_arguments()
@@ -128,19 +107,41 @@ def main():
     excel_name = args.excel_name
     excel_format = args.excel_format
     output_path = args.output_path
+    max_combinations = args.max_combinations
+    validate = args.validate
+    jobs = args.jobs
+    state_path = args.state
     
     print(f"Excel file path: {os.path.join(excel_path, excel_name + excel_format)}") 
+    if args.preview:
+        preview = preview_excel_to_ids(os.path.join(excel_path, excel_name + excel_format), excel_name, max_combinations)
+        print_preview(preview)
+        if args.stages:
+            print_statistics(preview)
+        return
     print(f"Output path: {output_path}")
     print()
     
-    # Extract metadata
-    sheet_name, ifc_version, separate_by, skipped_rows, is_entity_based_app, data_dict = get_metadata(excel_path, excel_name, excel_format, 'IDS4ALL')
-    
-    # Process Excel data
-    separated_excel_data = process_excel_data(excel_path, excel_name, excel_format, sheet_name, separate_by, skipped_rows, ifc_version, is_entity_based_app)
+    with open_excel_source(os.path.join(excel_path, excel_name + excel_format)) as excel_source:
+        # Extract metadata
+        sheet_name, ifc_version, separate_by, skipped_rows, is_entity_based_app, data_dict = get_metadata(excel_source)
+
+        # Process Excel data (incrementally if a state file is given)
+        incremental_state = load_incremental_state(state_path) if state_path else None
+        diagnostics = {}
+        context = ConversionContext()
+        separated_excel_data = process_excel_data(excel_source, sheet_name, separate_by, skipped_rows, ifc_version, is_entity_based_app, max_combinations, diagnostics, incremental_state, context)
+
+    if incremental_state is not None:
+        save_incremental_state(incremental_state, state_path)
+        print(f"Reprocessed rows: {diagnostics['reprocessed_rows']} of {diagnostics['rows']}")
+        print()
     
     # Create IDS files
-    create_ids_files(separated_excel_data, data_dict, output_path, excel_name, sheet_name)
+    create_ids_files(separated_excel_data, data_dict, output_path, excel_name, sheet_name, validate, jobs, context)
+
+    if args.stages:
+        print_statistics(context.statistics())
 
 if __name__ == "__main__":
     main()
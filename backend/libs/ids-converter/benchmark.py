@@ -0,0 +1,711 @@
+'''Regression benchmark for the IDS4ALL converter.
+
+Generates a synthetic IDS4ALL workbook, runs excel_to_spec_list on it and reports the time spent in
+the converter functions. The resulting specification list can be dumped to JSON (--dump) on one
+commit and compared (--compare) on another to make sure optimizations do not change the output.
+With --specs, add_values_to_general_specs is timed on generated specification lists of the given sizes.
+
+Example:
+    python benchmark.py --rows 3000 --dump before.json
+    python benchmark.py --rows 3000 --compare before.json
+    python benchmark.py --specs 1000,5000,20000
+    python benchmark.py --loading --scale-sample 20
+    python benchmark.py --rows 10000 --memory
+    python benchmark.py --reader 5000
+    python benchmark.py --rows 10000 --incremental 5
+    python benchmark.py --rows 2000 --threads 4
+    python benchmark.py --suite --output suite.json
+    python benchmark.py --suite 100,1000 --facets property,material --or-density 0.3 --and-density 0.1 --baseline suite.json
+
+--memory reports the peak and retained Python heap (tracemalloc) of excel_to_spec_list on a workbook that is
+already streamed, so that reading the workbook does not hide the memory of the specification model.
+--loading compares the wall-clock time and peak RSS of loading the workbook with a workbook session
+against the previous three separate pandas parses (each measured in a fresh interpreter).
+--reader compares ifctester's ids.open with the lxml reader (ids_xml.open_ids) on sample/IDS_SimpleBIM_examples.ids
+with its specifications repeated up to the given count.
+--incremental converts the workbook, changes the given number of rows and compares the time of an incremental
+re-conversion with the state of the first conversion (see incremental.py) with a full conversion of the edited workbook.
+--threads converts generated workbooks with different property descriptions one after another and concurrently in a
+thread pool of the given size. Every concurrent conversion must create the same IDS documents as its sequential one.
+--suite generates workbooks with the entities, properties and values of sample/test.xlsx at each of the given row counts
+(default 100, 1000, 10000 and 50000) and times the full pipeline (convert_excel_to_ids), its stages and the major functions of
+custom_functions.py. --facets, --or-density, --and-density, --separators and --ifc-version-column control the generated data.
+The results are written as JSON (--output), a previous result file can be given as --baseline to print the relative change per row count.
+'''
+import argparse
+import copy
+import functools
+import json
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+import pandas as pd
+from ifctester import ids
+from lxml import etree
+import custom_functions
+import ids_xml
+import ids4all
+from workbook_session import WorkbookSession
+from spec_model import Facet, Spec
+from incremental import IncrementalState
+
+ENTITIES = ['IfcWall', 'IfcSlab', 'IfcBeam', 'IfcColumn', 'IfcDoor', 'IfcWindow', 'IfcRoof', 'IfcStair',
+            'IfcRailing', 'IfcCovering', 'IfcSpace', 'IfcFooting', 'IfcPlate', 'IfcMember', 'IfcRamp']
+PREDEFINED_TYPES = ['', '', '', '.USERDEFINED', '.NOTDEFINED']
+APPLICABILITY_PROPERTIES = [('Pset_Common', 'IsExternal', 'TRUE'), ('Pset_Common', 'IsExternal', 'FALSE'),
+                            ('Pset_Common', 'LoadBearing', 'TRUE'), ('Pset_Common', 'FireRating', 'REI30|REI60'),
+                            ('Pset_Common', 'FireRating', 'REI90')]
+APPLICABILITY_PROPERTIES += [('Pset_Common', 'Reference', 'Type' + str(i)) for i in range(40)]
+REQUIREMENT_DATATYPES = [('IFCLABEL', ['A', 'B', 'C', 'D', '']), ('IFCBOOLEAN', ['TRUE', 'FALSE', '']),
+                         ('IFCLENGTHMEASURE', ['\\>=0,5']), ('IFCLABEL', ['pattern=[A-Z]{2}[0-9]{3}'])]
+IFC_VERSIONS = ['', '', 'IFC4', 'IFC4|IFC4X3_ADD2', 'IFC2X3|IFC4|IFC4X3_ADD2']
+PHASES = ['LP1', 'LP2', 'LP3']
+SAMPLE_WORKBOOK = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', '..', 'sample', 'test.xlsx')
+SAMPLE_IDS = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', '..', 'sample', 'IDS_SimpleBIM_examples.ids')
+LOADED_COLUMNS = ['Phase', 'Role', 'Usecase', 'SpecificationCardinality', 'SpecificationIfcVersion']
+SUITE_ROWS = '100,1000,10000,50000'
+SUITE_FACETS = ['property', 'attribute', 'classification', 'material', 'partof']
+SUITE_FUNCTIONS = ['expand_row', 'merge_spec_contributions', 'structure_ifc_version_group', 'add_values_to_general_specs',
+                   'create_ids_specification', 'append_facets']
+MATERIALS = ['Beton', 'Stahl', 'Holz', 'Ziegel', 'Glas', 'Gipskarton']
+SPATIAL_ENTITIES = ['IFCBUILDINGSTOREY', 'IFCBUILDING', 'IFCSPACE']
+
+def generate_workbook(path, rows, seed=0, separators=False, ifc_version_column=False, property_count=400, descriptions=False):
+    '''Writes a synthetic IDS4ALL workbook with the given number of data rows.
+
+    :param path: Output path of the workbook
+    :type path: str
+    :param rows: Number of data rows
+    :type rows: int
+    :param seed: Seed of the random generator (equal seeds produce equal workbooks)
+    :type seed: int
+    :param separators: Boolean specifying if a Phase column is used as file separator
+    :type separators: boolean
+    :param ifc_version_column: Boolean specifying if the SpecificationIfcVersion column is used
+    :type ifc_version_column: boolean
+    :param property_count: Number of distinct requirement properties
+    :type property_count: int
+    :param descriptions: Boolean specifying if the requirement properties have descriptions (they differ between seeds)
+    :type descriptions: boolean
+    :return: None
+    '''
+    rng = random.Random(seed)
+    data = []
+    used_rows = set()
+    while len(data) < rows:
+        entity = rng.choice(ENTITIES) + rng.choice(PREDEFINED_TYPES)
+        #'OR' values in the applicability are expanded into one specification per value
+        if rng.random() < 0.2:
+            entity += '|' + rng.choice(ENTITIES)
+        applicability = rng.choice(APPLICABILITY_PROPERTIES) if rng.random() < 0.6 else None
+        property_number = rng.randrange(property_count)
+        #Identical rows would merge complex restrictions into an enumeration, which is invalid
+        if (entity, applicability, property_number) in used_rows: continue
+        used_rows.add((entity, applicability, property_number))
+
+        row = {'A.Entity': entity}
+        if applicability:
+            pset, prop, value = applicability
+            row.update({'A.PropertySet': pset, 'A.Property': prop, 'A.PropertyValue': value})
+        datatype, values = REQUIREMENT_DATATYPES[property_number % len(REQUIREMENT_DATATYPES)]
+        row.update({'R.PropertySet': 'Pset_Requirement' + str(property_number % 20),
+                    'R.Property': 'Property' + str(property_number),
+                    'R.PropertyDatatype': datatype,
+                    'R.PropertyValue': rng.choice(values) or None})
+        if separators:
+            row['Phase'] = rng.choice(PHASES)
+        if ifc_version_column:
+            row['SpecificationIfcVersion'] = rng.choice(IFC_VERSIONS) or None
+        if descriptions:
+            row['R.Description.Property'] = 'Description ' + str(seed) + ' of Property' + str(property_number)
+        data.append(row)
+
+    metadata = [['Entry', 'Value'],
+                ['Sheet name', 'Specifications'],
+                ['Skipped rows', 0],
+                ['Title', 'Benchmark workbook'],
+                ['IFC version', 'IFC4,IFC4X3_ADD2']]
+    if separators:
+        metadata.append(['File separators', 'Phase'])
+    with pd.ExcelWriter(path, engine='openpyxl') as writer:
+        pd.DataFrame(metadata).to_excel(writer, sheet_name='IDS4ALL', header=False, index=False)
+        pd.DataFrame(data).to_excel(writer, sheet_name='Specifications', index=False)
+
+def sample_pools(sample_path):
+    '''Collects the entities, applicability properties and requirement properties of a sample workbook.
+
+    :param sample_path: Path of the sample workbook (IDS4ALL format without skipped rows)
+    :type sample_path: str
+    :return: Dictionary with the entities, the (property set, property, values) of the applicability
+        and the (property set, property, datatype, values, uri) of the requirements
+    :rtype: dict
+    '''
+    data = pd.read_excel(sample_path, sheet_name='Specifications')
+    data = data.astype(object).where(data.notna(), None)
+    entities = sorted({entity for column in ['A.Entity', 'R.Entity'] for entity in data[column].dropna()})
+    app_properties = sorted({(row['A.PropertySet'], row['A.Property'], row['A.PropertyValue']) for _, row in data.iterrows()
+                             if row['A.Property'] and row['A.PropertySet'] and row['A.PropertyValue']})
+    req_properties = sorted({(row['R.PropertySet'], row['R.Property'], row['R.PropertyDatatype'], row['R.PropertyValue'], row['R.PropertyURI'])
+                             for _, row in data.iterrows() if row['R.Property'] and row['R.PropertySet'] and row['R.PropertyDatatype']},
+                            key=lambda prop: tuple(str(value) for value in prop))
+    return {'entities': entities, 'app_properties': app_properties, 'req_properties': req_properties}
+
+def generate_sample_workbook(path, rows, seed=0, facets=('property',), or_density=0.2, and_density=0.0, separators=False, ifc_version_column=False):
+    '''Writes a synthetic IDS4ALL workbook with the metadata, entities, properties and values of sample/test.xlsx.
+
+    Every row has an applicability entity and a requirement property. Each facet of the facet mix is added to the
+    applicability and the requirements of a row with a probability of 0.5.
+
+    :param path: Output path of the workbook
+    :type path: str
+    :param rows: Number of data rows
+    :type rows: int
+    :param seed: Seed of the random generator (equal seeds produce equal workbooks)
+    :type seed: int
+    :param facets: Facets besides the entity facet (see SUITE_FACETS)
+    :type facets: list
+    :param or_density: Probability of an additional 'OR' value (|) in the applicability entity and material
+    :type or_density: float
+    :param and_density: Probability of two 'AND' values (\\&) in the applicability and requirement properties
+    :type and_density: float
+    :param separators: Boolean specifying if a Phase column is used as file separator
+    :type separators: boolean
+    :param ifc_version_column: Boolean specifying if the SpecificationIfcVersion column is used
+    :type ifc_version_column: boolean
+    :return: None
+    '''
+    pools = sample_pools(SAMPLE_WORKBOOK)
+    rng = random.Random(seed)
+    data = []
+    used_rows = set()
+    attempts = 0
+    while len(data) < rows:
+        attempts += 1
+        if attempts > 100 * rows:
+            raise SystemExit('The facet mix does not allow ' + str(rows) + ' distinct rows')
+        row = {'A.Entity': rng.choice(pools['entities'])}
+        #'OR' values in the applicability are expanded into one specification per value
+        if rng.random() < or_density:
+            row['A.Entity'] += '|' + rng.choice(pools['entities'])
+
+        #'AND' values require the same number of values in all columns of the facet
+        if 'property' in facets and rng.random() < 0.5:
+            app_properties = rng.sample(pools['app_properties'], 2 if rng.random() < and_density else 1)
+            row.update({'A.PropertySet': '\\&'.join(prop[0] for prop in app_properties),
+                        'A.Property': '\\&'.join(prop[1] for prop in app_properties),
+                        'A.PropertyValue': '\\&'.join(prop[2] for prop in app_properties)})
+        if 'attribute' in facets and rng.random() < 0.5:
+            row.update({'A.Attribute': 'ObjectType', 'A.AttributeValue': 'Type' + str(rng.randrange(20))})
+        if 'classification' in facets and rng.random() < 0.5:
+            row.update({'A.ClassificationSystem': 'Uniclass', 'A.Classification': 'Ss_' + str(rng.randrange(20))})
+        if 'material' in facets and rng.random() < 0.5:
+            row['A.Material'] = rng.choice(MATERIALS)
+            if rng.random() < or_density:
+                row['A.Material'] += '|' + rng.choice(MATERIALS)
+        if 'partof' in facets and rng.random() < 0.5:
+            row.update({'A.PartOfEntity': rng.choice(SPATIAL_ENTITIES), 'A.PartOfRelation': 'IFCRELCONTAINEDINSPATIALSTRUCTURE'})
+
+        if rng.random() < and_density:
+            #Values and URIs are left out, since every 'AND' value requires a value in each column
+            req_properties = rng.sample(pools['req_properties'], 2)
+            row.update({'R.PropertySet': '\\&'.join(prop[0] for prop in req_properties),
+                        'R.Property': '\\&'.join(prop[1] for prop in req_properties),
+                        'R.PropertyDatatype': '\\&'.join(prop[2] for prop in req_properties)})
+        else:
+            pset, prop, datatype, values, uri = rng.choice(pools['req_properties'])
+            row.update({'R.PropertySet': pset, 'R.Property': prop, 'R.PropertyDatatype': datatype, 'R.PropertyValue': values, 'R.PropertyURI': uri})
+        if 'attribute' in facets and rng.random() < 0.5:
+            row['R.Attribute'] = 'Description'
+        if 'classification' in facets and rng.random() < 0.5:
+            row['R.ClassificationSystem'] = 'Uniclass'
+        if 'material' in facets and rng.random() < 0.5:
+            row['R.Material'] = rng.choice(MATERIALS)
+        if 'partof' in facets and rng.random() < 0.5:
+            row['R.PartOfEntity'] = rng.choice(SPATIAL_ENTITIES)
+
+        if separators:
+            row['Phase'] = rng.choice(PHASES)
+        if ifc_version_column:
+            row['SpecificationIfcVersion'] = rng.choice(IFC_VERSIONS) or None
+        #Rows that only differ in their values are merged into one row, which would merge complex restrictions into an enumeration
+        row_key = tuple(sorted((column, value) for column, value in row.items() if column not in ('R.PropertyValue', 'R.AttributeValue')))
+        if row_key in used_rows: continue
+        used_rows.add(row_key)
+        data.append(row)
+
+    metadata = pd.read_excel(SAMPLE_WORKBOOK, sheet_name='IDS4ALL', header=None)
+    metadata.loc[metadata[0] == 'File separators', 1] = 'Phase' if separators else None
+    with pd.ExcelWriter(path, engine='openpyxl') as writer:
+        metadata.to_excel(writer, sheet_name='IDS4ALL', header=False, index=False)
+        pd.DataFrame(data).to_excel(writer, sheet_name='Specifications', index=False)
+
+def edit_workbook(path, edited_path, edits, seed=0):
+    '''Writes a copy of a generated workbook in which the requirement property of the given number of rows is renamed.
+
+    :param path: Path of the generated workbook
+    :type path: str
+    :param edited_path: Output path of the edited workbook
+    :type edited_path: str
+    :param edits: Number of edited rows
+    :type edits: int
+    :param seed: Seed of the random generator
+    :type seed: int
+    :return: None
+    '''
+    rng = random.Random(seed)
+    metadata = pd.read_excel(path, sheet_name='IDS4ALL', header=None)
+    data = pd.read_excel(path, sheet_name='Specifications')
+    for number, row in enumerate(rng.sample(range(len(data)), min(edits, len(data)))):
+        data.loc[row, 'R.Property'] = data.loc[row, 'R.Property'] + 'Edited' + str(number)
+    with pd.ExcelWriter(edited_path, engine='openpyxl') as writer:
+        metadata.to_excel(writer, sheet_name='IDS4ALL', header=False, index=False)
+        data.to_excel(writer, sheet_name='Specifications', index=False)
+
+def generate_specs(count, seed=0):
+    '''Generates a list of distinct specifications as created by excel_to_spec_list (before add_values_to_general_specs).
+
+    :param count: Number of specifications
+    :type count: int
+    :param seed: Seed of the random generator (equal seeds produce equal specifications)
+    :type seed: int
+    :return: List of specifications
+    :rtype: list
+    '''
+    rng = random.Random(seed)
+    specs_list = []
+    used_apps = set()
+    while len(specs_list) < count:
+        entity_facet = {'Entity': [rng.choice(ENTITIES).upper()]}
+        predefined_type = rng.choice(PREDEFINED_TYPES)
+        if predefined_type:
+            entity_facet['PredefinedType'] = [predefined_type[1:]]
+        app = [entity_facet]
+        if rng.random() < 0.8:
+            app.append({'Property': ['Reference'], 'PropertySet': ['Pset_Common'],
+                        'PropertyValue': ['Type' + str(rng.randrange(count // 20 + 1))]})
+        app_key = json.dumps(app, sort_keys=True)
+        if app_key in used_apps: continue
+        used_apps.add(app_key)
+
+        req = []
+        for property_number in rng.sample(range(400), rng.randint(1, 3)):
+            datatype, values = REQUIREMENT_DATATYPES[property_number % len(REQUIREMENT_DATATYPES)]
+            req_dict = {'Property': ['Property' + str(property_number)], 'PropertySet': ['Pset_Requirement' + str(property_number % 20)],
+                        'PropertyDatatype': [datatype]}
+            value = rng.choice(values)
+            if value:
+                req_dict['PropertyValue'] = [value]
+            req.append(req_dict)
+        ifc_version = rng.choice(IFC_VERSIONS) or 'IFC4|IFC4X3_ADD2'
+        specs_list.append(Spec(tuple(Facet(facet) for facet in app), [Facet(req_dict) for req_dict in req], Facet(),
+                               Facet({'SpecificationIfcVersion': ifc_version.split('|')})))
+    return specs_list
+
+def time_add_values(counts, seed=0):
+    '''Times add_values_to_general_specs on generated specification lists of the given sizes.
+
+    :return: Dictionary with seconds per specification count
+    :rtype: dict
+    '''
+    result = {}
+    for count in counts:
+        specs_list = generate_specs(count, seed)
+        started = time.perf_counter()
+        custom_functions.add_values_to_general_specs(specs_list, [])
+        result[count] = round(time.perf_counter() - started, 3)
+    return result
+
+def scale_workbook(source_path, path, factor):
+    '''Writes a copy of an IDS4ALL workbook whose specification rows are repeated factor times.
+
+    :param source_path: Path of the original workbook
+    :type source_path: str
+    :param path: Output path of the scaled workbook
+    :type path: str
+    :param factor: Number of repetitions of the specification rows
+    :type factor: int
+    :return: None
+    '''
+    metadata = pd.read_excel(source_path, sheet_name='IDS4ALL', header=None)
+    entries = dict(zip(metadata[0], metadata[1]))
+    data = pd.read_excel(source_path, sheet_name=entries['Sheet name'], skiprows=int(entries.get('Skipped rows', 0)))
+    #The skipped rows are not copied
+    metadata.loc[metadata[0] == 'Skipped rows', 1] = 0
+    with pd.ExcelWriter(path, engine='openpyxl') as writer:
+        metadata.to_excel(writer, sheet_name='IDS4ALL', header=False, index=False)
+        pd.concat([data] * factor, ignore_index=True).to_excel(writer, sheet_name=entries['Sheet name'], index=False)
+
+def load_workbook(workbook_path, mode):
+    '''Loads the metadata, header and converter columns of a workbook.
+
+    :param mode: 'session' for a workbook session, 'legacy' for three separate pandas parses
+    :type mode: str
+    :return: Number of loaded rows
+    :rtype: int
+    '''
+    if mode == 'session':
+        with WorkbookSession(workbook_path) as workbook:
+            sheet_name, ifc_version, separate_by, skipped_rows, is_entity_based_app, data_dict = ids4all.get_metadata(workbook)
+            all_columns = workbook.columns(sheet_name, skipped_rows)
+            columns = [col for col in all_columns if col[:2] in ('A.', 'R.') or col in LOADED_COLUMNS]
+            return len(workbook.read_columns(sheet_name, skipped_rows, columns))
+
+    data = pd.read_excel(workbook_path, sheet_name='IDS4ALL', usecols=[0, 1], header=None, skiprows=1)
+    data_dict = {key: value for key, value in zip(data[0], data[1]) if pd.notna(value)}
+    sheet_name = data_dict['Sheet name']
+    skipped_rows = data_dict['Skipped rows'] if 'Skipped rows' in data_dict else 0
+    all_columns = pd.read_excel(workbook_path, sheet_name=sheet_name, skiprows=skipped_rows, nrows=0).columns.tolist()
+    columns = [col for col in all_columns if col[:2] in ('A.', 'R.') or col in LOADED_COLUMNS]
+    return len(pd.read_excel(workbook_path, sheet_name=sheet_name, skiprows=skipped_rows, usecols=columns))
+
+def replicate_ids(source_path, path, count):
+    '''Writes a copy of the IDS file whose specifications are repeated until it contains count specifications.'''
+    tree = etree.parse(source_path)
+    specifications = tree.getroot().find(ids_xml.ids_tag('specifications'))
+    originals = list(specifications.iterchildren(ids_xml.ids_tag('specification')))
+    for i in range(len(originals), count):
+        specification = copy.deepcopy(originals[i % len(originals)])
+        specification.set('name', specification.get('name') + ' ' + str(i))
+        specifications.append(specification)
+    tree.write(path, encoding='utf-8', xml_declaration=True)
+
+def measure_reader(ids_path):
+    '''Measures the time of opening the IDS file with ids.open and with the lxml reader (both validating).
+
+    :return: Dictionary with the number of specifications and the seconds per reader
+    :rtype: dict
+    '''
+    started = time.perf_counter()
+    ifctester_ids = ids.open(ids_path, validate=True)
+    ifctester_seconds = time.perf_counter() - started
+    started = time.perf_counter()
+    lxml_ids = ids_xml.open_ids(ids_path, validate=True)
+    lxml_seconds = time.perf_counter() - started
+    if len(lxml_ids.specifications) != len(ifctester_ids.specifications):
+        raise Exception('The readers returned a different number of specifications')
+    return {'specifications': len(lxml_ids.specifications), 'ids_mb': round(os.path.getsize(ids_path) / 1024 / 1024, 2),
+            'ids_open_seconds': round(ifctester_seconds, 3), 'open_ids_seconds': round(lxml_seconds, 3)}
+
+def peak_rss_mb():
+    '''Returns the peak resident set size of the current process in MB.
+    Uses VmHWM on Linux, since ru_maxrss is inherited from the parent process across fork and exec.
+    '''
+    try:
+        with open('/proc/self/status', 'r') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def measure_loading(workbook_path):
+    '''Measures wall-clock time and peak RSS of load_workbook for both modes, each in a fresh interpreter.
+
+    :return: Dictionary with rows, seconds, peak RSS and RSS increase (MB) per mode
+    :rtype: dict
+    '''
+    result = {}
+    for mode in ['legacy', 'session']:
+        output = subprocess.run([sys.executable, os.path.abspath(__file__), '--load-mode', mode, '--workbook', workbook_path],
+                                capture_output=True, text=True, check=True).stdout
+        result[mode] = json.loads(output)
+    return result
+
+def instrument(names):
+    '''Wraps the given functions of custom_functions to count their calls and accumulate their run time.
+
+    :return: Dictionary with calls and seconds per function name
+    :rtype: dict
+    '''
+    stats = {}
+    for name in names:
+        original = getattr(custom_functions, name)
+        stats[name] = {'calls': 0, 'seconds': 0.0}
+
+        def wrapper(*args, _original=original, _stats=stats[name], **kwargs):
+            started = time.perf_counter()
+            try:
+                return _original(*args, **kwargs)
+            finally:
+                _stats['calls'] += 1
+                _stats['seconds'] += time.perf_counter() - started
+
+        setattr(custom_functions, name, functools.wraps(original)(wrapper))
+    return stats
+
+def run(workbook_path):
+    '''Runs excel_to_spec_list on the workbook and returns the specifications and timings.'''
+    stats = instrument(['expand_row', 'merge_spec_contributions', 'structure_specs_list_by_Ifc_versions',
+                        'structure_specifications_by_Ifc_versions', 'add_values_to_general_specs'])
+    started = time.perf_counter()
+    with ids4all.open_excel_source(workbook_path) as excel_source:
+        sheet_name, ifc_version, separate_by, skipped_rows, is_entity_based_app, data_dict = ids4all.get_metadata(excel_source)
+        specs_list = custom_functions.excel_to_spec_list(excel_source, sheet_name, separate_by, skipped_rows, ifc_version, is_entity_based_app)
+    total = time.perf_counter() - started
+    return specs_list, {'total_seconds': round(total, 3), 'specifications': len(specs_list),
+                        'functions': {name: {'calls': value['calls'], 'seconds': round(value['seconds'], 3)} for name, value in stats.items()}}
+
+def measure_incremental(workbook_path, edited_path):
+    '''Compares an incremental conversion of the edited workbook with the state of the first conversion
+    with a full conversion of the edited workbook. Both must create the same specifications.
+
+    :return: Dictionary with the seconds of both conversions and the number of reprocessed rows
+    :rtype: dict
+    '''
+    def convert(path, incremental_state=None):
+        diagnostics = {}
+        started = time.perf_counter()
+        with ids4all.open_excel_source(path) as excel_source:
+            sheet_name, ifc_version, separate_by, skipped_rows, is_entity_based_app, data_dict = ids4all.get_metadata(excel_source)
+            specs_list = custom_functions.excel_to_spec_list(excel_source, sheet_name, separate_by, skipped_rows, ifc_version, is_entity_based_app,
+                                                             diagnostics=diagnostics, incremental_state=incremental_state)
+        return [spec.asdict() for spec in specs_list], time.perf_counter() - started, diagnostics
+
+    incremental_state = IncrementalState(ids4all.CONVERTER_VERSION)
+    convert(workbook_path, incremental_state)
+    full_specs, full_seconds, diagnostics = convert(edited_path)
+    incremental_specs, incremental_seconds, incremental_diagnostics = convert(edited_path, incremental_state)
+    if incremental_specs != full_specs:
+        raise SystemExit('Incremental conversion differs from the full conversion')
+    return {'rows': diagnostics['rows'], 'reprocessed_rows': incremental_diagnostics['reprocessed_rows'],
+            'reprocessed_specs': incremental_diagnostics['reprocessed_specs'], 'reprocessed_groups': incremental_diagnostics['reprocessed_groups'],
+            'full_seconds': round(full_seconds, 3), 'incremental_seconds': round(incremental_seconds, 3)}
+
+def measure_threads(workbook_paths, threads):
+    '''Converts the workbooks with convert_excel_to_ids one after another and concurrently in a thread pool.
+    Each concurrent conversion must create the same IDS documents as its sequential conversion, so the conversions
+    must not share any state, like the property descriptions of their conversion contexts.
+
+    :return: Dictionary with the seconds and workbooks per second of both runs
+    :rtype: dict
+    '''
+    def convert(workbook_path):
+        documents = ids4all.convert_excel_to_ids(workbook_path, os.path.splitext(os.path.basename(workbook_path))[0], validate=True)
+        return [(document['filename'], document['content']) for document in documents]
+
+    started = time.perf_counter()
+    sequential = [convert(workbook_path) for workbook_path in workbook_paths]
+    sequential_seconds = time.perf_counter() - started
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        concurrent = list(executor.map(convert, workbook_paths))
+    concurrent_seconds = time.perf_counter() - started
+    if concurrent != sequential:
+        raise SystemExit('Concurrent conversions differ from the sequential conversions')
+    return {'workbooks': len(workbook_paths), 'threads': threads,
+            'sequential_seconds': round(sequential_seconds, 3), 'concurrent_seconds': round(concurrent_seconds, 3),
+            'sequential_workbooks_per_second': round(len(workbook_paths) / sequential_seconds, 2),
+            'concurrent_workbooks_per_second': round(len(workbook_paths) / concurrent_seconds, 2)}
+
+def measure_memory(workbook_path):
+    '''Measures the Python heap of excel_to_spec_list with tracemalloc. The sheet is streamed before tracing starts.
+
+    :return: Dictionary with the number of specifications, the peak and the retained heap (MB)
+    :rtype: dict
+    '''
+    with ids4all.open_excel_source(workbook_path) as excel_source:
+        sheet_name, ifc_version, separate_by, skipped_rows, is_entity_based_app, data_dict = ids4all.get_metadata(excel_source)
+        excel_source.sheet_data(sheet_name)
+        tracemalloc.start()
+        specs_list = custom_functions.excel_to_spec_list(excel_source, sheet_name, separate_by, skipped_rows, ifc_version, is_entity_based_app)
+        retained, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return {'specifications': len(specs_list), 'peak_mb': round(peak / 1024 / 1024, 1), 'retained_mb': round(retained / 1024 / 1024, 1)}
+
+def benchmark_environment():
+    '''Returns the converter version, commit and machine of a benchmark, so that results of different commits can be compared.'''
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=os.path.dirname(os.path.abspath(__file__)),
+                                capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {'converter_version': ids4all.CONVERTER_VERSION, 'commit': commit, 'python': platform.python_version(),
+            'pandas': pd.__version__, 'platform': platform.platform(), 'cpu_count': os.cpu_count()}
+
+def measure_pipeline(workbook_path, stats, repeat=1):
+    '''Runs the full pipeline (convert_excel_to_ids) on the workbook and returns the fastest of the given number of runs
+    with its stage times, counters and the calls and seconds of the instrumented functions (see instrument).
+
+    :return: Dictionary with the result of the fastest run
+    :rtype: dict
+    '''
+    fastest = None
+    for _ in range(repeat):
+        for value in stats.values():
+            value['calls'] = 0
+            value['seconds'] = 0.0
+        diagnostics = {}
+        started = time.perf_counter()
+        documents = ids4all.convert_excel_to_ids(workbook_path, 'benchmark', diagnostics=diagnostics)
+        seconds = time.perf_counter() - started
+        if fastest is None or seconds < fastest['total_seconds']:
+            fastest = {'total_seconds': round(seconds, 3), 'merged_rows': diagnostics['rows'], 'combinations': diagnostics['combinations'],
+                       'specifications': sum(document['specification_count'] for document in documents), 'ids_files': len(documents),
+                       'ids_mb': round(sum(len(document['content']) for document in documents) / 1024 / 1024, 2),
+                       'stages': diagnostics['stages'], 'counters': diagnostics['counters'],
+                       'functions': {name: {'calls': value['calls'], 'seconds': round(value['seconds'], 3)} for name, value in stats.items()}}
+    return fastest
+
+def run_suite(sizes, temp_dir, seed=0, facets=('property',), or_density=0.2, and_density=0.0, separators=False, ifc_version_column=False, repeat=1):
+    '''Generates a workbook for each row count (see generate_sample_workbook) and measures the full pipeline on it (see measure_pipeline).
+
+    :return: Dictionary with the environment, the generator settings and the result per row count
+    :rtype: dict
+    '''
+    settings = {'seed': seed, 'facets': list(facets), 'or_density': or_density, 'and_density': and_density,
+                'separators': separators, 'ifc_version_column': ifc_version_column, 'repeat': repeat}
+    stats = instrument(SUITE_FUNCTIONS)
+    results = []
+    for rows in sizes:
+        workbook_path = os.path.join(temp_dir, 'suite' + str(rows) + '.xlsx')
+        generate_sample_workbook(workbook_path, rows, seed, facets, or_density, and_density, separators, ifc_version_column)
+        result = {'rows': rows, 'workbook_mb': round(os.path.getsize(workbook_path) / 1024 / 1024, 2)}
+        result.update(measure_pipeline(workbook_path, stats, repeat))
+        results.append(result)
+        print(f"{rows} rows: {result['total_seconds']}s", file=sys.stderr)
+    return {'environment': benchmark_environment(), 'settings': settings, 'results': results}
+
+def compare_suite(suite, baseline):
+    '''Returns the relative change of the total and stage times per row count compared with a previous suite result.
+    Positive values are slower than the baseline.
+
+    :return: Dictionary with the relative changes per row count
+    :rtype: dict
+    '''
+    def change(seconds, baseline_seconds):
+        return round(seconds / baseline_seconds - 1, 3) if baseline_seconds else None
+
+    baseline_results = {result['rows']: result for result in baseline['results']}
+    comparison = {}
+    for result in suite['results']:
+        baseline_result = baseline_results.get(result['rows'])
+        if baseline_result is None: continue
+        comparison[result['rows']] = {
+            'total': change(result['total_seconds'], baseline_result['total_seconds']),
+            'stages': {stage: change(seconds, baseline_result['stages'].get(stage, 0)) for stage, seconds in result['stages'].items()},
+            'same_output': result['specifications'] == baseline_result['specifications'] and result['counters'] == baseline_result['counters'],
+        }
+    return {'baseline_commit': baseline['environment'].get('commit'), 'changes': comparison}
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the IDS4ALL converter on a generated workbook.')
+    parser.add_argument('--rows', type=int, default=3000, help='Number of generated data rows.')
+    parser.add_argument('--seed', type=int, default=0, help='Seed of the workbook generator.')
+    parser.add_argument('--separators', action='store_true', help='Use a Phase column as file separator.')
+    parser.add_argument('--ifc-version-column', action='store_true', help='Use the SpecificationIfcVersion column.')
+    parser.add_argument('--dump', help='Write the resulting specification list to this JSON file.')
+    parser.add_argument('--compare', help='Compare the resulting specification list with this JSON file.')
+    parser.add_argument('--specs', help='Comma separated specification counts for timing add_values_to_general_specs only.')
+    parser.add_argument('--loading', action='store_true', help='Measure time and peak RSS of loading the workbook only.')
+    parser.add_argument('--memory', action='store_true', help='Measure the peak and retained heap of excel_to_spec_list.')
+    parser.add_argument('--reader', type=int, help='Compare ids.open with the lxml reader on the sample IDS file repeated to this many specifications.')
+    parser.add_argument('--threads', type=int, help='Convert twice this many generated workbooks sequentially and in a thread pool of this size.')
+    parser.add_argument('--incremental', type=int, help='Compare an incremental with a full re-conversion after editing this many rows.')
+    parser.add_argument('--workbook', help='Use this workbook instead of a generated one.')
+    parser.add_argument('--scale-sample', type=int, help='Use sample/test.xlsx with its rows repeated this many times.')
+    parser.add_argument('--suite', nargs='?', const=SUITE_ROWS, help='Time the full pipeline on workbooks generated from sample/test.xlsx with these comma separated row counts (default ' + SUITE_ROWS + ').')
+    parser.add_argument('--facets', default='property', help='Comma separated facets of the suite workbooks besides the entity: ' + ', '.join(SUITE_FACETS) + '.')
+    parser.add_argument('--or-density', type=float, default=0.2, help='Probability of an additional OR value in the applicability of the suite workbooks.')
+    parser.add_argument('--and-density', type=float, default=0.0, help='Probability of AND values in the properties of the suite workbooks.')
+    parser.add_argument('--repeat', type=int, default=1, help='Number of runs per suite workbook, the fastest run is reported.')
+    parser.add_argument('--output', help='Write the suite result to this JSON file.')
+    parser.add_argument('--baseline', help='Compare the suite result with this JSON file of a previous suite run.')
+    parser.add_argument('--load-mode', choices=['legacy', 'session'], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.load_mode:
+        rss_before = peak_rss_mb()
+        started = time.perf_counter()
+        rows = load_workbook(args.workbook, args.load_mode)
+        seconds = time.perf_counter() - started
+        rss_peak = peak_rss_mb()
+        print(json.dumps({'rows': rows, 'seconds': round(seconds, 3), 'peak_rss_mb': round(rss_peak, 1),
+                          'rss_increase_mb': round(rss_peak - rss_before, 1)}))
+        return
+
+    if args.specs:
+        counts = [int(count) for count in args.specs.split(',')]
+        print(json.dumps({'add_values_to_general_specs': time_add_values(counts, args.seed)}, indent=2))
+        return
+
+    if args.suite:
+        facets = [facet for facet in args.facets.split(',') if facet]
+        unknown_facets = [facet for facet in facets if facet not in SUITE_FACETS]
+        if unknown_facets:
+            raise SystemExit('Unknown facets: ' + ', '.join(unknown_facets))
+        with tempfile.TemporaryDirectory() as temp_dir:
+            suite = run_suite([int(rows) for rows in args.suite.split(',')], temp_dir, args.seed, facets, args.or_density, args.and_density,
+                              args.separators, args.ifc_version_column, args.repeat)
+        if args.baseline:
+            with open(args.baseline, 'r', encoding='utf-8') as f:
+                suite['comparison'] = compare_suite(suite, json.load(f))
+        if args.output:
+            with open(args.output, 'w', encoding='utf-8') as f:
+                json.dump(suite, f, indent=2)
+        print(json.dumps(suite, indent=2))
+        return
+
+    if args.reader:
+        with tempfile.TemporaryDirectory() as temp_dir:
+            ids_path = os.path.join(temp_dir, 'benchmark.ids')
+            replicate_ids(SAMPLE_IDS, ids_path, args.reader)
+            print(json.dumps(measure_reader(ids_path), indent=2))
+        return
+
+    if args.threads:
+        with tempfile.TemporaryDirectory() as temp_dir:
+            workbook_paths = []
+            for number in range(2 * args.threads):
+                workbook_paths.append(os.path.join(temp_dir, 'benchmark' + str(number) + '.xlsx'))
+                generate_workbook(workbook_paths[-1], args.rows, args.seed + number, args.separators, args.ifc_version_column, descriptions=True)
+            print(json.dumps(measure_threads(workbook_paths, args.threads), indent=2))
+        return
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        workbook_path = args.workbook
+        if args.scale_sample:
+            workbook_path = os.path.join(temp_dir, 'sample.xlsx')
+            scale_workbook(SAMPLE_WORKBOOK, workbook_path, args.scale_sample)
+        elif not workbook_path:
+            workbook_path = os.path.join(temp_dir, 'benchmark.xlsx')
+            generate_workbook(workbook_path, args.rows, args.seed, args.separators, args.ifc_version_column)
+        if args.loading:
+            result = measure_loading(workbook_path)
+            result['workbook_mb'] = round(os.path.getsize(workbook_path) / 1024 / 1024, 2)
+            print(json.dumps(result, indent=2))
+            return
+        if args.memory:
+            print(json.dumps(measure_memory(workbook_path), indent=2))
+            return
+        if args.incremental:
+            edited_path = os.path.join(temp_dir, 'edited.xlsx')
+            edit_workbook(workbook_path, edited_path, args.incremental, args.seed)
+            print(json.dumps(measure_incremental(workbook_path, edited_path), indent=2))
+            return
+        specs_list, result = run(workbook_path)
+
+    result['rows'] = args.rows if not args.workbook and not args.scale_sample else result['specifications']
+    print(json.dumps(result, indent=2))
+
+    # Round trip through JSON so that dumped and freshly computed specifications compare alike
+    specs_json = json.loads(json.dumps([spec.asdict() for spec in specs_list], default=sorted))
+    if args.dump:
+        with open(args.dump, 'w', encoding='utf-8') as f:
+            json.dump(specs_json, f)
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            reference = json.load(f)
+        if reference != specs_json:
+            raise SystemExit('Specification list differs from ' + args.compare)
+        print('Specification list is identical to ' + args.compare)
+
+if __name__ == '__main__':
+    main()
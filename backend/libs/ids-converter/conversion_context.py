@@ -0,0 +1,80 @@
+'''Per-conversion state of the IDS4ALL converter.
+
+Data that is collected while the excel data is read and used again when the IDS specifications are created
+is stored in a ConversionContext that is passed through the pipeline. Previously it was kept in module-level
+dictionaries of custom_functions, which were shared by all conversions of a process and only correct as long as
+every conversion ran in its own process. With one context per conversion, several conversions can run
+concurrently in the threads of one process.
+
+The context also measures the time of each stage of the conversion and counts its work (rows, specifications,
+DeepDiff calls, merged requirements), so that slow conversions can be attributed to a stage.
+'''
+import time
+
+class ConversionContext:
+    '''State of one conversion.'''
+
+    def __init__(self, property_descriptions=None):
+        '''
+        :param property_descriptions: Descriptions of the requirement properties by property name (used as instructions of the property facets)
+        :type property_descriptions: dict
+        '''
+        self.property_descriptions = dict(property_descriptions) if property_descriptions else {}
+        self.stage_seconds = {}
+        self.worker_stage_seconds = {}
+        self.counters = {}
+        self.current_stage = None
+
+    def __repr__(self):
+        return 'ConversionContext(property_descriptions=' + repr(self.property_descriptions) + ')'
+
+    def start_stage(self, name):
+        '''Ends the current stage and starts the next stage of the conversion.
+        Stages follow each other, so the times of all stages add up to the time of the conversion.
+
+        :param name: Name of the stage, the times of stages with the same name are added up
+        :type name: str
+        '''
+        self.end_stage()
+        self.current_stage = (name, time.perf_counter())
+
+    def end_stage(self):
+        '''Ends the current stage (if any) and adds its time to the stage times.'''
+        if self.current_stage is not None:
+            name, started = self.current_stage
+            self.stage_seconds[name] = self.stage_seconds.get(name, 0.0) + time.perf_counter() - started
+            self.current_stage = None
+
+    def count(self, name, number=1):
+        '''Adds a number to a counter of the conversion.
+
+        :param name: Name of the counter
+        :type name: str
+        :param number: Number added to the counter
+        :type number: int
+        '''
+        self.counters[name] = self.counters.get(name, 0) + number
+
+    def add_worker_statistics(self, statistics):
+        '''Adds the stage times and counters of a part of the conversion that ran in a worker process with its own context.
+        Workers run in parallel to the current stage, so their stage times are added up separately (see statistics).
+
+        :param statistics: Stage times and counters of the worker (see statistics)
+        :type statistics: dict
+        '''
+        for name, seconds in statistics['stages'].items():
+            self.worker_stage_seconds[name] = self.worker_stage_seconds.get(name, 0.0) + seconds
+        for name, number in statistics['counters'].items():
+            self.count(name, number)
+
+    def statistics(self):
+        '''Returns the stage times in seconds and the counters of the conversion.
+
+        :return: Dictionary with the stage times ('stages') in the order the stages were first started and the counters ('counters').
+            If parts of the conversion ran in worker processes, the stage times of all workers are added up in 'worker_stages'
+        :rtype: dict
+        '''
+        statistics = {'stages': {name: round(seconds, 4) for name, seconds in self.stage_seconds.items()}, 'counters': dict(self.counters)}
+        if self.worker_stage_seconds:
+            statistics['worker_stages'] = {name: round(seconds, 4) for name, seconds in self.worker_stage_seconds.items()}
+        return statistics
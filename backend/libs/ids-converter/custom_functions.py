@@ -1,10 +1,14 @@
 import pandas as pd
-from xml.etree import ElementTree as ET
 from deepdiff import DeepDiff
-from deepmerge import Merger
-import copy
 from ifctester import ids
 import itertools
+import functools
+import bisect
+from collections.abc import Mapping
+from workbook_session import open_workbook_session
+from spec_model import Facet, Spec
+from incremental import content_key
+from conversion_context import ConversionContext
 
 STRING_ENTITY = 'Entity'
 STRING_PREDEFINEDTYPE = 'PredefinedType'
@@ -30,16 +34,19 @@ STRING_SPECIFICATIONIFCVERSION = 'SpecificationIfcVersion'
 STRING_REQUIREMENTCARDINALITY = 'Cardinality'
 KEYWORD_NONE = '_none_'
 KEYWORD_MISSING = '_MISSING_'
-
-entity_description_dict = {}
-property_description_dict = {}
-
-def excel_to_spec_list(EXCEL_PATH, sheet_name, separate_by, skipped_rows, ifc_versions, is_entity_based_app):
+KEYWORD_ROW = '_row_'
+MAX_COMBINATIONS_PER_ROW = 10000
+IFC_VERSION_BITS = {'IFC2X3': 1, 'IFC4': 2, 'IFC4X3_ADD2': 4}
+#Share of differing facets above which DeepDiff (ignore_order=True) does not pair two facet lists (see add_values_to_general_specs).
+#Must match CUTOFF_INTERSECTION_FOR_PAIRS_DEFAULT of the pinned deepdiff==8.3.0 (requirements.txt), check it when deepdiff is upgraded.
+DEEPDIFF_CUTOFF_INTERSECTION_FOR_PAIRS = 0.7
+
+def excel_to_spec_list(EXCEL_PATH, sheet_name, separate_by, skipped_rows, ifc_versions, is_entity_based_app, max_combinations=MAX_COMBINATIONS_PER_ROW, diagnostics=None, incremental_state=None, context=None, row_errors=None, merge_only=False):
     '''Parses excel data from a given file path and sheet name into a list of specifications.
-    Each specification is represented as dictionary with a given applicability, requirements, specification data, and general data
+    Each specification is represented as Spec with a given applicability, requirements, specification data, and general data (see spec_model.py)
 
-    :param EXCEL_PATH: Path to an excel file 
-    :type EXCEL_PATH: str
+    :param EXCEL_PATH: Path to an excel file or workbook session (see workbook_session.py)
+    :type EXCEL_PATH: str or WorkbookSession
     :param sheet_name: Name of the relevant sheet 
     :type sheet_name: str
     :param separate_by: List of general data for which specifications must be seperated
@@ -50,11 +57,34 @@ def excel_to_spec_list(EXCEL_PATH, sheet_name, separate_by, skipped_rows, ifc_ve
     :type ifc_versions: str
     :param is_entity_based_app: Boolean specifying if the applicability should be generated only entity-based (with predefiend types) 
     :type is_entity_based_app: boolean       
+    :param max_combinations: Maximum number of applicability combinations ('OR' values) one row may expand into (None for no limit)
+    :type max_combinations: int
+    :param diagnostics: Dictionary in which the number of applicability combinations is reported (see count_combinations), optional
+    :type diagnostics: dict
+    :param incremental_state: State of the previous conversion of the workbook, only changed rows are processed again (see incremental.py), optional
+    :type incremental_state: IncrementalState
+    :param context: Context of the conversion in which the property descriptions are collected for create_ids_specification, optional
+    :type context: ConversionContext
+    :param row_errors: List in which the errors of invalid rows are collected ({'row': excel row, 'error': message}) instead of raising them.
+        Invalid rows are skipped, optional
+    :type row_errors: list
+    :param merge_only: Boolean specifying if only the rows are parsed and merged. The requirements of specific specifications are not
+        added to more general specifications, which does not change the number of specifications (used to preview a conversion)
+    :type merge_only: boolean
     :return: List of specifications with applicability, requirements, specification data and general data
     :rtype: list
     '''
+    if context is None:
+        context = ConversionContext()
+    #Work reused from the previous conversion (see incremental.py) is not counted, so the counters start at zero
+    for counter in ('rows', 'specs', 'merges', 'deepdiff_calls'):
+        context.count(counter, 0)
+
     ###Import data
-    all_columns = pd.read_excel(EXCEL_PATH, sheet_name=sheet_name, skiprows=skipped_rows, nrows=0).columns.tolist()
+    context.start_stage('read_excel')
+    #The header and the relevant columns are served from a single parse of the sheet
+    workbook = open_workbook_session(EXCEL_PATH)
+    all_columns = workbook.columns(sheet_name, skipped_rows)
     dup = {x[:-2] for x in all_columns if x[-2:] == '.1'}
     if dup:
         raise Exception('Column names must be unique. The following column names occur multiple times: ' + ', '.join(map(str,dup)))
@@ -107,12 +137,13 @@ def excel_to_spec_list(EXCEL_PATH, sheet_name, separate_by, skipped_rows, ifc_ve
     relevant_columns.extend(cols_req_partOf)
     relevant_columns.extend(cols_general)
     relevant_columns.extend(cols_specification)
-    relevant_columns = list(set(relevant_columns))
+    #Remove duplicates but keep the order, so that the rows are normalized equally in every process (see incremental.py)
+    relevant_columns = list(dict.fromkeys(relevant_columns))
     
     ##Import the relevant columns and merge rows with the same applicability into one row
     if relevant_columns:
         #Import all relevant columns
-        df = pd.read_excel(EXCEL_PATH, sheet_name=sheet_name, skiprows=skipped_rows, usecols=relevant_columns)
+        df = workbook.read_columns(sheet_name, skipped_rows, relevant_columns)
 
         #Fill empty requirement cardinality with default value
         if prefix+STRING_REQUIREMENTCARDINALITY in df.columns:
@@ -130,8 +161,11 @@ def excel_to_spec_list(EXCEL_PATH, sheet_name, separate_by, skipped_rows, ifc_ve
 
         #Fill NaN values with a placeholder
         df_filled = df.fillna(KEYWORD_MISSING)
+        #Excel row number of each row (header and skipped rows included) for error messages and diagnostics
+        df_filled[KEYWORD_ROW] = df_filled.index + int(skipped_rows) + 2
 
         #Step 1: Merge rows of the columns STRING_PROPERTYVALUE & STRING_ATTRIBUTEVALUE if the values in the other columns are identical
+        context.start_stage('groupby')
         relevant_columns_copy = relevant_columns.copy()
         merge_columns_1 = [prefix+STRING_PROPERTYVALUE,
                         prefix+STRING_ATTRIBUTEVALUE]
@@ -141,9 +175,7 @@ def excel_to_spec_list(EXCEL_PATH, sheet_name, separate_by, skipped_rows, ifc_ve
                 relevant_columns_copy.remove(item)
                 removed_items.append(item)
 
-        df_step1 = df_filled.groupby(relevant_columns_copy, dropna=False, sort=False).agg({
-            col: lambda x: '|'.join(map(str, x.dropna())) for col in removed_items
-            }).reset_index()
+        df_step1 = merge_rows(df_filled, relevant_columns_copy, removed_items, True)
 
         #Step 2: Merge all requirement parameters and general parameters not in seperate_by,
         #keeping values of STRING_PROPERTYVALUE & STRING_ATTRIBUTEVALUE as sub-lists
@@ -155,15 +187,14 @@ def excel_to_spec_list(EXCEL_PATH, sheet_name, separate_by, skipped_rows, ifc_ve
         merge_columns_2.extend(cols_req_classification)
         merge_columns_2.extend(cols_req_partOf)
         merge_columns_2.extend([item for item in cols_general if item not in separate_by])
-        merge_columns_2 = list(set(merge_columns_2))
+        merge_columns_2 = list(dict.fromkeys(merge_columns_2))
         for item in merge_columns_2:
             if item in relevant_columns_copy:
                 relevant_columns_copy.remove(item)
                 removed_items.append(item)
         
-        df_final = df_step1.groupby(relevant_columns_copy, as_index=False, sort=False).agg({
-            col: lambda x: list(x) for col in removed_items  # Ensure sublists for dynamic value columns
-            })
+        #Ensure sublists for dynamic value columns
+        df_final = merge_rows(df_step1, relevant_columns_copy, removed_items, False)
 
         #Create individual dataframes for each facet and store them structured in applicability, requirements, general, and specification
         if cols_app_entity:
@@ -196,139 +227,309 @@ def excel_to_spec_list(EXCEL_PATH, sheet_name, separate_by, skipped_rows, ifc_ve
             specification_data.append(df_final[cols_specification])
 
     ###Transform each dataframe row into a dictionary
-    specs_list = []
+    context.start_stage('row_dicts')
+    #The facet dataframes are converted column-wise into dictionaries for all rows at once
+    generaldata_dicts = dataframe_to_dicts(generaldata[0]) if generaldata else None
+    specification_data_dicts = dataframe_to_dicts(specification_data[0]) if specification_data else None
+    applicability_dict_lists = [dataframe_to_dict_lists(applicability_facet_df) for applicability_facet_df in applicability_data]
+    requirements_dict_lists = [dataframe_to_dict_lists(requirement_facet_df) for requirement_facet_df in requirements_data]
+
+    excel_rows = df_final[KEYWORD_ROW].tolist()
+    #Number of applicability combinations of each row that expands into more than one combination
+    combination_counts = {}
+
+    #Results of unchanged rows, specifications and groups are reused from the previous conversion of the workbook
+    if incremental_state is not None:
+        incremental_state.start((tuple(df_final.columns), tuple(separate_by), is_entity_based_app, max_combinations))
+
+    ###Expand each row into the applicability combinations and requirements of its specifications
+    context.start_stage('expand_rows')
+    row_expansions = []
+    row_keys = []
     for i in range(df_final.index.size):
-        #General data
-        generaldata_dict = {}
-        if generaldata:
-            row_generaldata = generaldata[0].iloc[i]
-            generaldata_dict = pandas_row_to_dict(row_generaldata)
-
-        #Specification data
-        specification_data_dict = {}
-        if specification_data:
-            row_specification_data = specification_data[0].iloc[i]
-            specification_data_dict = pandas_row_to_dict(row_specification_data)
-            if STRING_SPECIFICATIONCARDINALITY in specification_data_dict:
-                if specification_data_dict[STRING_SPECIFICATIONCARDINALITY][0].lower() not in ['required', 'prohibited']:
-                    specification_data_dict.pop(STRING_SPECIFICATIONCARDINALITY)
-            if STRING_SPECIFICATIONIFCVERSION in specification_data_dict:
-                for ifc_version in specification_data_dict[STRING_SPECIFICATIONIFCVERSION]:
-                    if ifc_version.upper() not in ['IFC2X3','IFC4','IFC4X3_ADD2']:
-                        raise Exception('Invalid IFC version used: ' + ifc_version)
-       
-        #Applicability data
-        app_list = []
-        for applicability_facet_df in applicability_data:
-            row_app = applicability_facet_df.iloc[i]
-            dict_list_app = pandas_row_to_dict_list(row_app)
-            for dict_item in dict_list_app:
-                    app_dict = split_OR_AND_values(dict_item, is_entity_based_app)
-                    #Rearrange 'AND' values of the applicability into individual facet dictionaries
-                    app_list.extend(split_AND_values_to_individual_facet_dicts(app_dict))
-
-        #Generate possible combinations for all or_values in the applicability and create individual specifications for each.
-        #This is necessary for assigning generally applicable values to more specific specifications.
-        #Only if specification cardinality is not "required", because in this case the logic would be lost when seperated
-        if STRING_SPECIFICATIONCARDINALITY in specification_data_dict and specification_data_dict[STRING_SPECIFICATIONCARDINALITY][0].lower() == 'required':
-            app_lists = [app_list]
-        else:
-            app_lists = generate_combinations(app_list)
-        for app_list in app_lists:
-            for app_dict in app_list:
-                #Separate Entity.PredefinedType into two entries
-                separate_dict_value(app_dict, STRING_ENTITY, STRING_PREDEFINEDTYPE,'.')
-                separate_dict_value(app_dict, STRING_PARTOFENTITY, STRING_PARTOFPREDEFINEDTYPE,'.')
-
-            #Check if a specification with this general data and applicability already exists
-            req_list = []
-            diff, diff_generaldata, diff_specification_data, req_list = compare_previous_generaldata_and_applicability(specs_list, generaldata_dict, specification_data_dict, app_list, separate_by)
-                    
-            #Requirements data
-            for requirement_facet_df in requirements_data:
-                row_req = requirement_facet_df.iloc[i]
-                dict_list_req = pandas_row_to_dict_list(row_req)
-                for dict_item in dict_list_req:
-                    req_dict = split_OR_AND_values(dict_item, is_entity_based_app)
-                    #check if dict only includes the cardinality (invalid); if so, take empty dict.
-                    #Can occur since requirement cardinality column is applied to several facets from which some might be empty in current row
-                    if len(req_dict.keys()) == 1 and STRING_REQUIREMENTCARDINALITY in req_dict:
-                        req_dict = {}
-                    #Rearrange 'AND' values of the requirements into individual facet dictionaries
-                    req_dict_list_arranged = split_AND_values_to_individual_facet_dicts(req_dict)
-                    
-                    for req_dict_arranged in req_dict_list_arranged:
-                        #Check whether complex restrictions are included in 'OR' values (this is not possible in IDS)
-                        for key in req_dict_arranged:
-                            if len(req_dict_arranged[key]) > 1:
-                                j = 0
-                                while j < len(req_dict_arranged[key]):
-                                    value = req_dict_arranged[key][j]
-                                    if is_complex_restriction(value):
-                                        raise Exception('Complex restrictions (pattern=; \\<=; \\<; \\>=; \\>; length=; length<=; length>=) cannot be part of an enumeration (list of "or"-values)')
-                                    else: j += 1
-                        
-                        #Extract descriptions for properties
-                        #Necessary to add property description to each occurance in the IDS even if it is only one in the Excel
-                        #Not necessary for entity descriptions
-                        if STRING_DESCRIPTION in req_dict_arranged:
-                            if STRING_PROPERTY in req_dict_arranged:
-                                property_description_dict[req_dict_arranged[STRING_PROPERTY][0]] = req_dict_arranged[STRING_DESCRIPTION][0]
-                        
-                        #Separate Entity.PredefinedType into two entries
-                        separate_dict_value(req_dict_arranged, STRING_ENTITY, STRING_PREDEFINEDTYPE,'.')
-                        separate_dict_value(req_dict_arranged, STRING_PARTOFENTITY, STRING_PARTOFPREDEFINEDTYPE,'.')
-                        
-                        #If the same requirement (except for the values) already exists, merge the values.
-                        #Otherwise, add new requirement
-                        diff_req = True
-                        for j in range(len(req_list)):
-                            diff_req = compare_and_merge_requirement_dicts(req_list[j], req_dict_arranged, [STRING_ATTRIBUTEVALUE,STRING_PROPERTYVALUE], False)
-                            if not diff_req: break
-                        if diff_req: req_list.append(req_dict_arranged)
-
-            #if it is a new spec (with different applicability, generaldata, or specificationdata), create a new specification
-            if diff or diff_generaldata or diff_specification_data:
-                if app_list or req_list or generaldata_dict:
-                    spec_dict = {}
-                    spec_dict['app'] = app_list
-                    spec_dict['req'] = req_list
-                    spec_dict['general'] = copy.deepcopy(generaldata_dict)
-                    spec_dict['spec'] = copy.deepcopy(specification_data_dict)
-                    specs_list.append(spec_dict)
+        generaldata_dict = generaldata_dicts[i] if generaldata else {}
+        specification_data_dict = specification_data_dicts[i] if specification_data else {}
+        app_dict_lists = [applicability_facet_dict_lists[i] for applicability_facet_dict_lists in applicability_dict_lists]
+        req_dict_lists = [requirement_facet_dict_lists[i] for requirement_facet_dict_lists in requirements_dict_lists]
+        compute = functools.partial(expand_row, generaldata_dict, specification_data_dict, app_dict_lists, req_dict_lists, is_entity_based_app, max_combinations, excel_rows[i])
+        try:
+            if incremental_state is not None:
+                row_key = content_key((generaldata_dict, specification_data_dict, app_dict_lists, req_dict_lists))
+                row_expansion = incremental_state.memo('rows', row_key, compute)
+            else:
+                row_expansion = compute()
+        except Exception as error:
+            if row_errors is None: raise
+            row_errors.append({'row': excel_rows[i], 'error': str(error)})
+            continue
+        if incremental_state is not None:
+            row_keys.append(row_key)
+        row_expansions.append(row_expansion)
+
+        combination_count = row_expansion[5]
+        if combination_count is not None and combination_count > 1:
+            combination_counts[excel_rows[i]] = combination_count
+
+        #Extract descriptions for properties
+        #Necessary to add property description to each occurance in the IDS even if it is only one in the Excel
+        #Not necessary for entity descriptions
+        for property_name, description in row_expansion[4]:
+            context.property_descriptions[property_name] = description
+
+    #Merge the specifications of all rows with the same general data and applicability
+    context.count('rows', len(excel_rows))
+    context.start_stage('merge_specs')
+    specs_list = merge_row_expansions(row_expansions, separate_by, row_keys, incremental_state, context)
+
+    if diagnostics is not None:
+        diagnostics['rows'] = len(excel_rows)
+        diagnostics['combinations'] = len(excel_rows) - len(combination_counts) + sum(combination_counts.values())
+        diagnostics['max_combinations_per_row'] = max(combination_counts.values(), default=1)
+        diagnostics['expanded_rows'] = combination_counts
+        if incremental_state is not None:
+            diagnostics['reprocessed_rows'] = incremental_state.reprocessed['rows']
 
     #organise the specifications according to the ifc versions
     #if one specification refers to a subset of ifc versions of another specification with the same applicability and general data,
     #the subset of ifc versions is extracted from the more general specification and the requirements are included into the specific specification.
     #this allows to merge specifications with the same applicability, general data, and ifc versions
     if spec_ifc_version_col_used:
-        for i in range(len(specs_list)):
-            specI = specs_list[i]
-            specI_Ifc_versions = specI['spec'][STRING_SPECIFICATIONIFCVERSION]
-            if not specI_Ifc_versions: continue
-            for j in range(i+1,len(specs_list)):
-                specI_Ifc_versions = specI['spec'][STRING_SPECIFICATIONIFCVERSION]
-                if not specI_Ifc_versions: break
-                specJ = specs_list[j]
-                specJ_Ifc_versions = specJ['spec'][STRING_SPECIFICATIONIFCVERSION]
-                if not specJ_Ifc_versions: continue
-                #if all ifc versions of specI are in specJ, specI_Ifc_versions is a subset of specJ_Ifc_versions
-                #Then all requirements of specJ also apply to specI.
-                if (all(elem in specJ_Ifc_versions for elem in specI_Ifc_versions)):
-                    structure_specifications_by_Ifc_versions(specI, specJ, specI_Ifc_versions, specJ_Ifc_versions, separate_by)
-                #if all ifc versions of specJ are in specI, specJ_Ifc_versions is a subset of specI_Ifc_versions
-                #Then all requirements of specI also apply to specJ.
-                elif (all(elem in specI_Ifc_versions for elem in specJ_Ifc_versions)):
-                    structure_specifications_by_Ifc_versions(specJ, specI, specJ_Ifc_versions, specI_Ifc_versions, separate_by)
-                
+        context.start_stage('ifc_versions')
+        structure_specs_list_by_Ifc_versions(specs_list, separate_by, incremental_state, context)
+
         #remove specifications with empty ifc versions (might be created during the re-structuring)
-        specs_list = [spec for spec in specs_list if spec['spec'][STRING_SPECIFICATIONIFCVERSION]]
+        specs_list = [spec for spec in specs_list if spec.spec[STRING_SPECIFICATIONIFCVERSION]]
+
+    #A preview only needs the merged specifications. The results of the previous conversion in the incremental state are kept unchanged
+    context.count('specs', len(specs_list))
+    if merge_only:
+        context.end_stage()
+        return specs_list
 
     #add requirements of specific specifications to more general specifications
-    add_values_to_general_specs(specs_list,separate_by)
+    context.start_stage('add_values_to_general_specs')
+    if incremental_state is not None:
+        add_values_to_general_spec_groups(specs_list, separate_by, incremental_state, context)
+        incremental_state.finish()
+        if diagnostics is not None:
+            diagnostics['reprocessed_specs'] = incremental_state.reprocessed['specs']
+            diagnostics['reprocessed_groups'] = incremental_state.reprocessed['ifc_version_groups'] + incremental_state.reprocessed['groups']
+    else:
+        add_values_to_general_specs(specs_list,separate_by,context)
+    context.end_stage()
 
     return specs_list
 
+def expand_row(generaldata_dict, specification_data_dict, app_dict_lists, req_dict_lists, is_entity_based_app, max_combinations, excel_row):
+    '''Expands one merged row of the excel data into the applicability combinations and requirements of its specifications.
+    The result only depends on the values of the row, so it can be reused for unchanged rows (see incremental.py) and must not be altered.
+
+    :param generaldata_dict: General data of the row (key = [value, value, value])
+    :type generaldata_dict: dict
+    :param specification_data_dict: Specification data of the row (key = [value, value, value])
+    :type specification_data_dict: dict
+    :param app_dict_lists: List of the individual facet dictionaries of the row for each applicability facet
+    :type app_dict_lists: list
+    :param req_dict_lists: List of the individual facet dictionaries of the row for each requirement facet
+    :type req_dict_lists: list
+    :param is_entity_based_app: Boolean specifying if the applicability should be generated only entity-based (with predefiend types)
+    :type is_entity_based_app: boolean
+    :param max_combinations: Maximum number of applicability combinations ('OR' values) one row may expand into (None for no limit)
+    :type max_combinations: int
+    :param excel_row: Excel row number of the row for error messages
+    :type excel_row: int
+    :return: Tuple of the general data facet, the specification data facet, the tuple of applicability combinations (tuples of facets),
+        the tuple of requirement facets, the tuple of (property, description) pairs and the number of combinations (None if not counted)
+    :rtype: tuple
+    '''
+    #General data
+    generaldata_facet = Facet(generaldata_dict)
+
+    #Specification data
+    specification_data_dict = dict(specification_data_dict)
+    if STRING_SPECIFICATIONCARDINALITY in specification_data_dict:
+        if specification_data_dict[STRING_SPECIFICATIONCARDINALITY][0].lower() not in ['required', 'prohibited']:
+            specification_data_dict.pop(STRING_SPECIFICATIONCARDINALITY)
+    if STRING_SPECIFICATIONIFCVERSION in specification_data_dict:
+        for ifc_version in specification_data_dict[STRING_SPECIFICATIONIFCVERSION]:
+            if ifc_version.upper() not in ['IFC2X3','IFC4','IFC4X3_ADD2']:
+                raise Exception('Invalid IFC version used: ' + ifc_version)
+    specification_data_facet = Facet(specification_data_dict)
+
+    #Applicability data
+    app_list = []
+    for dict_list_app in app_dict_lists:
+        for dict_item in dict_list_app:
+                app_dict = split_OR_AND_values(dict_item, is_entity_based_app)
+                #Rearrange 'AND' values of the applicability into individual facet dictionaries
+                app_list.extend(split_AND_values_to_individual_facet_dicts(app_dict))
+
+    #Generate possible combinations for all or_values in the applicability and create individual specifications for each.
+    #This is necessary for assigning generally applicable values to more specific specifications.
+    #Only if specification cardinality is not "required", because in this case the logic would be lost when seperated
+    combination_count = None
+    if STRING_SPECIFICATIONCARDINALITY in specification_data_dict and specification_data_dict[STRING_SPECIFICATIONCARDINALITY][0].lower() == 'required':
+        app_lists = [app_list]
+    else:
+        #Check the number of combinations before generating them one by one, so that large rows fail fast
+        combination_count = count_combinations(app_list)
+        if max_combinations is not None and combination_count > max_combinations:
+            raise Exception('Row ' + str(excel_row) + ': The applicability expands into ' + str(combination_count) + ' combinations of "OR" values (separated by |), which exceeds the limit of ' + str(max_combinations) + ' combinations per row. Split the "OR" values into several rows or use the specification cardinality "required".')
+        app_lists = generate_combinations(app_list)
+    combinations = []
+    requirements = None
+    for app_list in app_lists:
+        for app_dict in app_list:
+            #Separate Entity.PredefinedType into two entries
+            separate_dict_value(app_dict, STRING_ENTITY, STRING_PREDEFINEDTYPE,'.')
+            separate_dict_value(app_dict, STRING_PARTOFENTITY, STRING_PARTOFPREDEFINEDTYPE,'.')
+        combinations.append(tuple(Facet(app_dict) for app_dict in app_list))
+
+        #The requirements are equal for all combinations of the row
+        if requirements is None:
+            requirements, property_descriptions = expand_row_requirements(req_dict_lists, is_entity_based_app)
+
+    return generaldata_facet, specification_data_facet, tuple(combinations), requirements, property_descriptions, combination_count
+
+def expand_row_requirements(req_dict_lists, is_entity_based_app):
+    '''Creates the requirement facets of one merged row of the excel data (see expand_row).
+
+    :param req_dict_lists: List of the individual facet dictionaries of the row for each requirement facet
+    :type req_dict_lists: list
+    :param is_entity_based_app: Boolean specifying if the applicability should be generated only entity-based (with predefiend types)
+    :type is_entity_based_app: boolean
+    :return: Tuple of the requirement facets and tuple of (property, description) pairs
+    :rtype: tuple
+    '''
+    requirements = []
+    property_descriptions = []
+    for dict_list_req in req_dict_lists:
+        for dict_item in dict_list_req:
+            req_dict = split_OR_AND_values(dict_item, is_entity_based_app)
+            #check if dict only includes the cardinality (invalid); if so, take empty dict.
+            #Can occur since requirement cardinality column is applied to several facets from which some might be empty in current row
+            if len(req_dict.keys()) == 1 and STRING_REQUIREMENTCARDINALITY in req_dict:
+                req_dict = {}
+            #Rearrange 'AND' values of the requirements into individual facet dictionaries
+            req_dict_list_arranged = split_AND_values_to_individual_facet_dicts(req_dict)
+
+            for req_dict_arranged in req_dict_list_arranged:
+                #Check whether complex restrictions are included in 'OR' values (this is not possible in IDS)
+                for key in req_dict_arranged:
+                    if len(req_dict_arranged[key]) > 1:
+                        j = 0
+                        while j < len(req_dict_arranged[key]):
+                            value = req_dict_arranged[key][j]
+                            if is_complex_restriction(value):
+                                raise Exception('Complex restrictions (pattern=; \\<=; \\<; \\>=; \\>; length=; length<=; length>=) cannot be part of an enumeration (list of "or"-values)')
+                            else: j += 1
+
+                #Extract descriptions for properties
+                if STRING_DESCRIPTION in req_dict_arranged:
+                    if STRING_PROPERTY in req_dict_arranged:
+                        property_descriptions.append((req_dict_arranged[STRING_PROPERTY][0], req_dict_arranged[STRING_DESCRIPTION][0]))
+
+                #Separate Entity.PredefinedType into two entries
+                separate_dict_value(req_dict_arranged, STRING_ENTITY, STRING_PREDEFINEDTYPE,'.')
+                separate_dict_value(req_dict_arranged, STRING_PARTOFENTITY, STRING_PARTOFPREDEFINEDTYPE,'.')
+                requirements.append(Facet(req_dict_arranged))
+    return tuple(requirements), tuple(property_descriptions)
+
+def merge_row_expansions(row_expansions, separate_by, row_keys=None, incremental_state=None, context=None):
+    '''Creates the specifications of all rows (see expand_row) and merges specifications with the same merge key (see spec_merge_key).
+    Specifications with different merge keys do not affect each other, so each specification is merged from the contributions
+    of its merge key in the order of the rows and their combinations. The specifications are returned in the order they are created.
+    With an incremental state, only specifications with added, removed or changed contributions are merged again.
+
+    :param row_expansions: Expansions of all rows (see expand_row)
+    :type row_expansions: list
+    :param separate_by: List of general data for which specifications must be seperated
+    :type separate_by: list
+    :param row_keys: Content keys of all rows, required with an incremental state
+    :type row_keys: list
+    :param incremental_state: State of the previous conversion of the workbook, optional
+    :type incremental_state: IncrementalState
+    :param context: Context of the conversion in which the merged requirements are counted, optional
+    :type context: ConversionContext
+    :return: List of specifications
+    :rtype: list
+    '''
+    #(row position, combination number) of all contributions by merge key
+    contributions = {}
+    for position, row_expansion in enumerate(row_expansions):
+        generaldata_facet, specification_data_facet, combinations = row_expansion[:3]
+        for number, app_facets in enumerate(combinations):
+            merge_key = spec_merge_key(generaldata_facet, specification_data_facet, app_facets, separate_by)
+            contributions.setdefault(merge_key, []).append((position, number))
+
+    created_specs = []
+    for merge_contributions in contributions.values():
+        compute = functools.partial(merge_spec_contributions, row_expansions, merge_contributions, context)
+        if incremental_state is not None:
+            spec_key = content_key([(row_keys[position], number) for position, number in merge_contributions])
+            merged_spec = incremental_state.memo('specs', spec_key, compute)
+        else:
+            merged_spec = compute()
+        if merged_spec is not None:
+            created, app_facets, req_facets, generaldata_facet, specification_data_facet = merged_spec
+            #The merged specification is shared with the incremental state, so its requirements are copied before they are altered
+            created_specs.append((merge_contributions[created], Spec(app_facets, list(req_facets), generaldata_facet, specification_data_facet)))
+
+    created_specs.sort(key=lambda created_spec: created_spec[0])
+    return [spec for _, spec in created_specs]
+
+def merge_spec_contributions(row_expansions, merge_contributions, context=None):
+    '''Merges the contributions of the rows with the same merge key into one specification.
+    Like creating the specifications row by row, a specification is created by the first contribution with applicability,
+    requirements or general data. The general data and requirements of the following contributions are merged into it.
+
+    :param row_expansions: Expansions of all rows (see expand_row)
+    :type row_expansions: list
+    :param merge_contributions: List of (row position, combination number) of the contributions
+    :type merge_contributions: list
+    :param context: Context of the conversion in which the merged requirements are counted, optional
+    :type context: ConversionContext
+    :return: Tuple of the number of the creating contribution, the applicability, the requirements, the general data and the specification data,
+        or None if no specification is created
+    :rtype: tuple
+    '''
+    spec = None
+    created = None
+    merges = 0
+    for contribution_number, (position, number) in enumerate(merge_contributions):
+        generaldata_facet, specification_data_facet, combinations, requirements = row_expansions[position][:4]
+        app_facets = combinations[number]
+        #Check if a specification with this general data and applicability already exists
+        if spec is None:
+            req_list = []
+        else:
+            spec.general = spec.general.merge(generaldata_facet)
+            req_list = spec.req
+
+        #If the same requirement (except for the values) already exists, merge the values.
+        #Otherwise, add new requirement
+        for req_facet in requirements:
+            diff_req = True
+            for j in range(len(req_list)):
+                merged_req_facet = merge_requirement_facets(req_list[j], req_facet, [STRING_ATTRIBUTEVALUE,STRING_PROPERTYVALUE], False)
+                if merged_req_facet is not None:
+                    req_list[j] = merged_req_facet
+                    merges += 1
+                    diff_req = False
+                    break
+            if diff_req: req_list.append(req_facet)
+
+        #if it is a new spec, create a new specification
+        #Facets are immutable, so the general data and specification data of the row can be shared by all its specifications
+        if spec is None and (app_facets or req_list or generaldata_facet):
+            spec = Spec(app_facets, req_list, generaldata_facet, specification_data_facet)
+            created = contribution_number
+
+    if context is not None: context.count('merges', merges)
+    if spec is None:
+        return None
+    return created, spec.app, tuple(spec.req), spec.general, spec.spec
+
 def load_columns(EXCEL_PATH, sheet_name, skipped_rows, columns_to_import, all_columns, dataframe_list):
     '''Loads the columns of columns_to_import that are present in the excel sheet and parses them into a pandas dataframe.
     The available columns in the excel sheet are given by the all_columns list 
@@ -352,18 +553,130 @@ def load_columns(EXCEL_PATH, sheet_name, skipped_rows, columns_to_import, all_co
     if available_columns:
         dataframe_list.append(pd.read_excel(EXCEL_PATH, sheet_name=sheet_name, skiprows=skipped_rows, usecols=available_columns))
 
+def merge_rows(df, group_columns, merged_columns, join_values):
+    '''Merges the rows of a pandas dataframe with equal values in the group columns into one row.
+    The rows are grouped by a dictionary in one pass, which is equal to (but faster than) grouping with pandas and aggregating with Python functions:
+    df.groupby(group_columns, sort=False).agg({column: function for column in merged_columns, KEYWORD_ROW: 'first'})
+    The merged rows are in the order of their first rows and KEYWORD_ROW keeps the value of the first row. Like pandas, which factorizes
+    each group column separately, a group column contains the first value of the column that is equal to the value of the first row
+    (equal values can differ in their type, e.g. 1 and True).
+
+    :param df: Pandas dataframe without missing values in the group columns
+    :type df: Pandas dataframe
+    :param group_columns: Columns whose values must be equal in merged rows
+    :type group_columns: list
+    :param merged_columns: Columns whose values are merged
+    :type merged_columns: list
+    :param join_values: Boolean specifying if the merged values are joined with '|' omitting missing values (like '|'.join(map(str, x.dropna())))
+        or collected in lists (like list(x))
+    :type join_values: boolean
+    :return: Pandas dataframe with the group columns, the merged columns and KEYWORD_ROW
+    :rtype: Pandas dataframe
+    '''
+    #Each value is coded by the position of the first equal value of its column
+    codes = []
+    for column in group_columns:
+        value_positions = {}
+        codes.append([value_positions.setdefault(value, position) for position, value in enumerate(df[column].tolist())])
+
+    groups = {}
+    for position, key in enumerate(zip(*codes)):
+        group = groups.get(key)
+        if group is None:
+            groups[key] = [position]
+        else:
+            group.append(position)
+    group_positions = list(groups.values())
+    first_positions = [positions[0] for positions in group_positions]
+
+    merged_data = {}
+    for column, column_codes in zip(group_columns, codes):
+        values = df[column].to_numpy().take([column_codes[position] for position in first_positions])
+        #Like pandas, object columns that only contain numbers or only booleans become numeric columns
+        if values.dtype == object and len(values):
+            inferred_type = pd.api.types.infer_dtype(values, skipna=False)
+            if inferred_type == 'integer':
+                values = values.astype('int64')
+            elif inferred_type in ('floating', 'mixed-integer-float'):
+                values = values.astype('float64')
+            elif inferred_type == 'boolean':
+                values = values.astype('bool')
+        merged_data[column] = values
+    for column in merged_columns:
+        #Like iterating over a pandas series, tolist returns python values for numpy values
+        values = df[column].tolist()
+        if join_values:
+            merged_data[column] = ['|'.join([str(values[position]) for position in positions if isinstance(values[position], str) or not pd.isna(values[position])])
+                                   for positions in group_positions]
+        else:
+            merged_data[column] = [[values[position] for position in positions] for positions in group_positions]
+    merged_data[KEYWORD_ROW] = df[KEYWORD_ROW].to_numpy().take(first_positions)
+    return pd.DataFrame(merged_data)
+
+def dataframe_to_row_values(df):
+    '''Extracts the values of all rows of a pandas dataframe without per-row pandas indexing.
+    The values have the same types as the values of df.iloc[i]: numpy scalars for numeric columns,
+    and values of the common numeric type if all columns are numeric.
+
+    :param df: Pandas dataframe
+    :type df: Pandas dataframe
+    :return: List of column names and list of row value tuples
+    :rtype: tuple
+    '''
+    array = df.to_numpy()
+    if array.dtype == object:
+        rows = list(zip(*[df[column].to_numpy() for column in df.columns]))
+    else:
+        rows = [tuple(row) for row in array]
+    return df.columns.tolist(), rows
+
+def dataframe_to_dicts(df):
+    '''Applies row_values_to_dict to all rows of a pandas dataframe.
+
+    :param df: Pandas dataframe
+    :type df: Pandas dataframe
+    :return: List with one dictionary for each row (key = [value, value, value])
+    :rtype: list
+    '''
+    column_names, rows = dataframe_to_row_values(df)
+    return [row_values_to_dict(column_names, row_values) for row_values in rows]
+
+def dataframe_to_dict_lists(df):
+    '''Applies row_values_to_dict_list to all rows of a pandas dataframe.
+
+    :param df: Pandas dataframe
+    :type df: Pandas dataframe
+    :return: List with the list of individual facet dictionaries for each row
+    :rtype: list
+    '''
+    column_names, rows = dataframe_to_row_values(df)
+    return [row_values_to_dict_list(column_names, row_values) for row_values in rows]
+
 def pandas_row_to_dict(current_row):
     '''Stores values of the current row of a pandas dataframe into a dictionary using the column names as keys.
-    Uses '\\&' and '|' as delimiter but does not differentiate in their meaning. Stores the values in a list and assigns it to a key in the dictionary.
-    (key = [value, value, value])
+    See row_values_to_dict (used by excel_to_spec_list for all rows at once).
 
     :param current_row: Pandas row
     :type current_row: Pandas row
     :return: Dictionary using the column names as keys and the row values as values (key = [value, value, value])
     :rtype: dict
     '''
+    return row_values_to_dict(current_row.index, [column_data for column_name, column_data in current_row.items()])
+
+def row_values_to_dict(column_names, row_values):
+    '''Stores values of a row into a dictionary using the column names as keys.
+    Uses '\\&' and '|' as delimiter but does not differentiate in their meaning. Stores the values in a list and assigns it to a key in the dictionary.
+    (key = [value, value, value])
+
+    :param column_names: Column names of the row
+    :type column_names: list
+    :param row_values: Values of the row in the order of the column names
+    :type row_values: list
+    :return: Dictionary using the column names as keys and the row values as values (key = [value, value, value])
+    :rtype: dict
+    '''
     new_dict = {}
-    for column_name, column_data in current_row.items():
+    for column_name, column_data in zip(column_names, row_values):
         #Cut characters after the first '.'. If duplicate column names exist, pandas numbers them with name.1, name.2 ...
         column_name = column_name.split('.')[0]
         if isinstance(column_data,list):
@@ -389,15 +702,28 @@ def pandas_row_to_dict(current_row):
 
 def pandas_row_to_dict_list(current_row):
     '''Creates individual dictionaries for each facet in the current row of the given pandas dataframe using the column names as keys.
-    Then removes dictionaries if they are subsets of another dictionary.
+    See row_values_to_dict_list (used by excel_to_spec_list for all rows at once).
 
     :param current_row: Pandas row
     :type current_row: Pandas row
     :return: List of individual dictionaries for each facet
     :rtype: list
     '''
-    list_columns = current_row.index  # Get all column names
-    list_values = [current_row[col] if isinstance(current_row[col], list) else [current_row[col]] for col in list_columns]  # Ensure lists
+    return row_values_to_dict_list(current_row.index, [current_row[col] for col in current_row.index])
+
+def row_values_to_dict_list(column_names, row_values):
+    '''Creates individual dictionaries for each facet in a row using the column names as keys.
+    Then removes dictionaries if they are subsets of another dictionary.
+
+    :param column_names: Column names of the row
+    :type column_names: list
+    :param row_values: Values of the row in the order of the column names
+    :type row_values: list
+    :return: List of individual dictionaries for each facet
+    :rtype: list
+    '''
+    list_columns = column_names
+    list_values = [value if isinstance(value, list) else [value] for value in row_values]  # Ensure lists
 
     num_items = max(len(values) for values in list_values)  # Determine max length of lists
 
@@ -412,9 +738,11 @@ def pandas_row_to_dict_list(current_row):
     ]
 
     #Remove dictionaries from the list if they are subsets of another dictionary.
+    #A dictionary can only be a proper subset of a dictionary with more keys.
     filtered_list = []
+    max_len = max(len(d) for d in dict_list)
     for d1 in dict_list:
-        if not any(d1.items() <= d2.items() and d1 != d2 for d2 in dict_list):
+        if len(d1) == max_len or not any(len(d2) > len(d1) and d1.items() <= d2.items() for d2 in dict_list):
             filtered_list.append(d1)
     
     return filtered_list
@@ -537,6 +865,21 @@ def separate_dict_value(current_dict, combined_key, second_key, delimiter):
         current_dict[combined_key] = or_values_first_key
         if or_values_second_key: current_dict[second_key] = or_values_second_key
 
+def count_combinations(data):
+    '''Counts the combinations generate_combinations creates for the given data without generating them.
+
+    :param data: List of dictionaries, where each key maps to a list of values.
+    :type data: list
+    :return: Number of combinations
+    :rtype: int
+    '''
+    count = 1
+    for item in data:
+        for key, values in item.items():
+            if values is not None and len(values) > 1:
+                count *= len(values)
+    return count
+
 def generate_combinations(data):
     '''Generate all possible combinations of dictionaries with list values.
     This function takes a list of dictionaries, where each dictionary may 
@@ -545,11 +888,12 @@ def generate_combinations(data):
     in its list, a separate dictionary is created for each value. The function 
     ensures that the structure of the input dictionaries is preserved, and 
     each resulting combination includes one value per list.
+    The combinations are generated one at a time, use count_combinations to check their number beforehand.
 
     :param data: List of dictionaries, where each key maps to a list of values.
     :type current_dict: list
-    :return: List of lists, where each inner list represents a unique combination of dictionaries, preserving the input structure but with one value per list.
-    :rtype: list
+    :return: Generator of lists, where each inner list represents a unique combination of dictionaries, preserving the input structure but with one value per list.
+    :rtype: generator
     '''
     # Collect all possible values for each dictionary in `data`
     options = []
@@ -567,183 +911,437 @@ def generate_combinations(data):
         options.append([dict(sum((list(d.items()) for d in combo), [])) for combo in itertools.product(*item_variants)])
     
     # Cartesian product of all item combinations
-    combined_variants = [list(variant) for variant in itertools.product(*options)]
-    return combined_variants
+    for variant in itertools.product(*options):
+        yield list(variant)
+
+def spec_merge_key(generaldata, specification_data, app, separate_by):
+    '''Creates a hashable key of all data that must be equal for two specifications to be merged:
+    the specification cardinality and ifc versions, the general data specified by separate_by and the applicability.
+    Keys that do not exist in a facet are represented by KEYWORD_MISSING.
+
+    :param generaldata: Facet containing the 'AND' values for each generaldata key
+    :type generaldata: Facet
+    :param specification_data: Facet containing the 'AND' values for each specificationdata key
+    :type specification_data: Facet
+    :param app: Tuple containing the facets of the applicability
+    :type app: tuple
+    :param separate_by: List of general data for which specifications must be seperated
+    :type separate_by: list
+    :return: Hashable merge key
+    :rtype: tuple
+    '''
+    specification_key = tuple(specification_data.get(key, KEYWORD_MISSING) for key in [STRING_SPECIFICATIONCARDINALITY,STRING_SPECIFICATIONIFCVERSION])
+    generaldata_key = tuple(generaldata.get(key, KEYWORD_MISSING) for key in separate_by)
+    return (specification_key, generaldata_key, app)
 
-def compare_previous_generaldata_and_applicability(specs_list, generaldata_dict, specification_data_dict, app_list, separate_by):
-    '''Checks if a specification with the same applicability and general data already exists.
-    For the general data check only the general data speficied by separate_by is relevant.
-    Other general data can be merged anyways.
-    If a specification with the same applicability and general data already exists, the requirements of the new and previous are merged.
+def ifc_version_group_key(spec, separate_by):
+    '''Creates a hashable key of all data that must be equal for two specifications to be structured by their ifc versions:
+    the applicability, the general data specified by separate_by and the specification cardinality.
+    Keys that do not exist in a facet are represented by KEYWORD_MISSING.
 
-    :param specs_list: List of all previous specifications
-    :type specs_list: list
-    :param generaldata_dict: Dictionary containing lists of 'AND' values for each generaldata key
-    :type generaldata_dict: dict
-    :param specification_data_dict: Dictionary containing lists of 'AND' values for each specificationdata key
-    :type specification_data_dict: dict
-    :param app_list: List containing dictionaries for each facet in the applicability
-    :type app_list: list
+    :param spec: Specification
+    :type spec: Spec
     :param separate_by: List of general data for which specifications must be seperated
-    :type separate_by: list    
-    :return: Boolean 'diff' specifying whether the applicability is different
-    :rtype: bool
-    :return: Boolean 'diff_generaldata' specifying whether the generaldata is different
-    :rtype: list        
-    :return: List containing the requriements
-    :rtype: list
+    :type separate_by: list
+    :return: Hashable group key
+    :rtype: tuple
     '''
-    req_list = []
-    diff = True
-    diff_generaldata = True
-    diff_specification_data = True
-    for j in range(len(specs_list)-1,-1,-1):
-        prev_spec = specs_list[j]
-        #check specification data
-        diff_specification_data = DeepDiff(specification_data_dict, prev_spec['spec'], include_paths=[STRING_SPECIFICATIONCARDINALITY,STRING_SPECIFICATIONIFCVERSION])
-        if not diff_specification_data:
-            #check the general data specified by seperate_by, if it is not empty.
-            if separate_by:
-                diff_generaldata = DeepDiff(generaldata_dict, prev_spec['general'], include_paths=separate_by)
-            else: diff_generaldata = False
-            if not diff_generaldata:
-                #check the applicability
-                diff = app_list != prev_spec['app']
-                if not diff:
-                    diff = DeepDiff(app_list, prev_spec['app'])
-                if not diff:
-                    #merge the requirements
-                    req_list = prev_spec['req']
-                    prev_spec['general'] = merger.merge(prev_spec['general'], generaldata_dict)
-                    break
-    return diff, diff_generaldata, diff_specification_data, req_list
+    specification_key = spec.spec.get(STRING_SPECIFICATIONCARDINALITY, KEYWORD_MISSING)
+    generaldata_key = tuple(spec.general.get(key, KEYWORD_MISSING) for key in separate_by)
+    return (spec.app, generaldata_key, specification_key)
+
+def ifc_version_mask(ifc_versions, version_bits):
+    '''Converts a list of ifc versions into a bitmask, so that subset checks of ifc versions are single integer operations.
+    Unknown ifc version strings are assigned to new bits in version_bits.
+
+    :param ifc_versions: Tuple of ifc versions
+    :type ifc_versions: tuple
+    :param version_bits: Dictionary containing the bit of each ifc version (is altered for unknown ifc versions)
+    :type version_bits: dict
+    :return: Bitmask of the ifc versions
+    :rtype: int
+    '''
+    mask = 0
+    for ifc_version in ifc_versions:
+        if ifc_version not in version_bits:
+            version_bits[ifc_version] = 1 << len(version_bits)
+        mask |= version_bits[ifc_version]
+    return mask
+
+def structure_specs_list_by_Ifc_versions(specs_list, separate_by, incremental_state=None, context=None):
+    '''Structures all specifications of the list by their ifc versions (see structure_specifications_by_Ifc_versions).
+    Only specifications with equal applicability, general data and specification cardinality can be structured,
+    so the specifications are grouped by ifc_version_group_key and the pairs of each group are processed in the order of the specification list.
+    Specifications with empty ifc versions remain in the list.
+    With an incremental state, groups whose specifications are unchanged since the previous conversion of the workbook reuse its result.
 
-def structure_specifications_by_Ifc_versions(spec1, spec2, spec1_Ifc_versions, spec2_Ifc_versions, separate_by):
-    '''Includes all requirements of spec2 in spec1 and deletes the ifc versions of spec1 from spec2,
-    if the two specifications have equal applicability, general data and specification cardinality.
+    :param specs_list: List of all specifications
+    :type specs_list: list
+    :param separate_by: List of general data for which specifications must be seperated
+    :type separate_by: list
+    :param incremental_state: State of the previous conversion of the workbook, optional
+    :type incremental_state: IncrementalState
+    :param context: Context of the conversion in which the merged requirements are counted, optional
+    :type context: ConversionContext
+    '''
+    groups = {}
+    for spec in specs_list:
+        groups.setdefault(ifc_version_group_key(spec, separate_by), []).append(spec)
+
+    version_bits = dict(IFC_VERSION_BITS)
+    for group in groups.values():
+        if len(group) < 2: continue
+        if incremental_state is None:
+            structure_ifc_version_group(group, version_bits, context)
+            continue
+        group_key = content_key([(spec.req, spec.general, spec.spec) for spec in group])
+        structured_group = incremental_state.memo('ifc_version_groups', group_key, functools.partial(structure_ifc_version_group, group, version_bits, context))
+        for spec, (req_facets, generaldata_facet, specification_data_facet) in zip(group, structured_group):
+            spec.req = list(req_facets)
+            spec.general = generaldata_facet
+            spec.spec = specification_data_facet
+
+def structure_ifc_version_group(group, version_bits, context=None):
+    '''Structures the specifications of one group of structure_specs_list_by_Ifc_versions by their ifc versions.
+
+    :param group: Specifications with equal ifc_version_group_key
+    :type group: list
+    :param version_bits: Dictionary containing the bit of each ifc version (see ifc_version_mask)
+    :type version_bits: dict
+    :param context: Context of the conversion in which the merged requirements are counted, optional
+    :type context: ConversionContext
+    :return: Tuple of the requirements, general data and specification data of each specification
+    :rtype: tuple
+    '''
+    masks = [ifc_version_mask(spec.spec[STRING_SPECIFICATIONIFCVERSION], version_bits) for spec in group]
+    merges = 0
+    for i in range(len(group)):
+        if not masks[i]: continue
+        for j in range(i+1,len(group)):
+            if not masks[i]: break
+            if not masks[j]: continue
+            #if all ifc versions of specI are in specJ, specI_Ifc_versions is a subset of specJ_Ifc_versions
+            #Then all requirements of specJ also apply to specI.
+            if masks[i] & masks[j] == masks[i]:
+                merges += structure_specifications_by_Ifc_versions(group[i], group[j], group[i].spec[STRING_SPECIFICATIONIFCVERSION], group[j].spec[STRING_SPECIFICATIONIFCVERSION])
+                masks[j] &= ~masks[i]
+            #if all ifc versions of specJ are in specI, specJ_Ifc_versions is a subset of specI_Ifc_versions
+            #Then all requirements of specI also apply to specJ.
+            elif masks[i] & masks[j] == masks[j]:
+                merges += structure_specifications_by_Ifc_versions(group[j], group[i], group[j].spec[STRING_SPECIFICATIONIFCVERSION], group[i].spec[STRING_SPECIFICATIONIFCVERSION])
+                masks[i] &= ~masks[j]
+    if context is not None: context.count('merges', merges)
+    return tuple((tuple(spec.req), spec.general, spec.spec) for spec in group)
+
+def structure_specifications_by_Ifc_versions(spec1, spec2, spec1_Ifc_versions, spec2_Ifc_versions):
+    '''Includes all requirements of spec2 in spec1 and deletes the ifc versions of spec1 from spec2.
+    The two specifications must have equal applicability, general data and specification cardinality (see ifc_version_group_key).
     If all ifc versions of spec1 are in spec2, spec1_Ifc_versions is a subset of spec2_Ifc_versions. Then all requirements of spec2 also apply to spec1.
     After the requirements are included in spec1, the ifc versions of spec1 are removed spec2.
     By this, the two specifications with overlapping ifc-versions are seperated to have one specification for each unique ifc version combination
 
     :param spec1: Specification with more specific ifc version definition
-    :type spec1: dict
+    :type spec1: Spec
     :param spec2: Specification with more general ifc version definition
-    :type spec2: dict
-    :param spec1_Ifc_versions: List of all ifc versions spec1 applies to
-    :type spec1_Ifc_versions: list
-    :param spec2_Ifc_versions: List of all ifc versions spec2 applies to
-    :type spec2_Ifc_versions: list
-    :param separate_by: List of general data for which specifications must be seperated
-    :type separate_by: list 
+    :type spec2: Spec
+    :param spec1_Ifc_versions: Tuple of all ifc versions spec1 applies to
+    :type spec1_Ifc_versions: tuple
+    :param spec2_Ifc_versions: Tuple of all ifc versions spec2 applies to
+    :type spec2_Ifc_versions: tuple
+    :return: Number of requirements of spec2 merged into requirements of spec1
+    :rtype: int
     '''
-    #check specification data
-    diff_specification_data = DeepDiff(spec1['spec'], spec2['spec'], include_paths=[STRING_SPECIFICATIONCARDINALITY])
-    if not diff_specification_data:
-        #check the general data specified by seperate_by, if it is not empty.
-        if separate_by:
-            diff_generaldata = DeepDiff(spec1['general'], spec2['general'], include_paths=separate_by)
-        else: diff_generaldata = False
-        if not diff_generaldata:
-            #check the applicability
-            diff = spec1['app'] != spec2['app']
-            if not diff:
-                diff = DeepDiff(spec1['app'], spec2['app'])
-            if not diff:
-                spec1['general'] = merger.merge(spec1['general'], spec2['general'])
-                for req_dict2 in spec2['req']:
-                    found = False
-                    for req_dict1 in spec1['req']:
-                        found = not compare_and_merge_requirement_dicts(req_dict1, req_dict2, [STRING_ENTITY,STRING_PREDEFINEDTYPE,STRING_ATTRIBUTEVALUE,STRING_PROPERTYVALUE], False, True)
-                        if found == True: break
-                        
-                    if not found:
-                        # Shallow copy to avoid mutating original item2 later
-                        spec1['req'].append({k: v[:] if isinstance(v, list) else v for k, v in req_dict2.items()})
-                #Since all requirements of spec2 are included in spec1, spec2 does not need to apply to the ifc versions of spec1 anymore
-                spec2['spec'][STRING_SPECIFICATIONIFCVERSION] = list(set(spec2_Ifc_versions) - set(spec1_Ifc_versions))
-
-def add_values_to_general_specs(specs_list, separate_by):
+    spec1.general = spec1.general.merge(spec2.general)
+    merges = 0
+    for req_facet2 in spec2.req:
+        found = False
+        for j in range(len(spec1.req)):
+            merged_req_facet = merge_requirement_facets(spec1.req[j], req_facet2, [STRING_ENTITY,STRING_PREDEFINEDTYPE,STRING_ATTRIBUTEVALUE,STRING_PROPERTYVALUE], False, True)
+            if merged_req_facet is not None:
+                spec1.req[j] = merged_req_facet
+                merges += 1
+                found = True
+                break
+            
+        #Facets are immutable, so spec1 can share the requirement with spec2
+        if not found:
+            spec1.req.append(req_facet2)
+    #Since all requirements of spec2 are included in spec1, spec2 does not need to apply to the ifc versions of spec1 anymore
+    #The remaining ifc versions keep their order, so that the result is equal in every process (see incremental.py)
+    spec2.spec = spec2.spec.replace(STRING_SPECIFICATIONIFCVERSION, tuple(ifc_version for ifc_version in spec2_Ifc_versions if ifc_version not in spec1_Ifc_versions))
+    return merges
+
+def add_values_to_general_specs(specs_list, separate_by, context=None):
     '''Checks for all specification if a specification with a more general applicability exists.
     If so, the requirements of the more specific specification are added to the more general specification.
+    Only specifications in the same bucket (see subsumption_index) are compared. Pairs are still processed in the
+    order of the specification list, since merging alters the requirements of the compared specifications.
 
     :param specs_list: List of all specifications
     :type specs_list: list
     :param separate_by: List of general data for which specifications must be seperated
     :type separate_by: list 
+    :param context: Context of the conversion in which the DeepDiff calls and merged requirements are counted, optional
+    :type context: ConversionContext
     '''
+    deepdiff_calls = 0
+    merges = 0
+    app_signatures = [app_signature(spec.app) for spec in specs_list]
+    app_values = [signature[1] for signature in app_signatures]
+    index = subsumption_index(specs_list, separate_by)
     for i in range(len(specs_list)):
-        for j in range(i+1,len(specs_list)):
+        facetsI, valuesI, app_setsI = app_signatures[i]
+        for j in subsumption_candidates(index, i):
+            #applicabilities can only contain each other if the values of one are a subset of the values of the other one
+            if not (valuesI <= app_values[j] or app_values[j] <= valuesI): continue
             specI = specs_list[i]
             specJ = specs_list[j]
-            
-            #check if specification meta data of both specs is equal
-            diff_specification_data = False
-            specdataI = specI['spec']
-            specdataJ = specJ['spec']
-            diff_specification_data = DeepDiff(specdataI, specdataJ, ignore_order=True, include_paths=[STRING_SPECIFICATIONCARDINALITY,STRING_SPECIFICATIONIFCVERSION])
-
-            #check if general data of both specs is equal
-            if not diff_specification_data:
-                diff_generaldata = False
-                if separate_by:
-                    generaldataI = specI['general']
-                    generaldataJ = specJ['general']
-                    diff_generaldata = DeepDiff(generaldataI, generaldataJ, ignore_order=True, include_paths=separate_by)
-                
-                #check if spec i has a more general applicability than j.
-                if not diff_generaldata:
-                    appI = specI['app']
-                    appJ = specJ['app']
-                    if len(appJ) > 0 and len(appI) > 0:
-                        if STRING_ENTITY in appI[0] and STRING_ENTITY in appJ[0]:
-                            if appI[0][STRING_ENTITY] != appJ[0][STRING_ENTITY]: continue
-                        if STRING_PREDEFINEDTYPE in appI[0] and STRING_PREDEFINEDTYPE in appJ[0]:
-                            if appI[0][STRING_PREDEFINEDTYPE] != appJ[0][STRING_PREDEFINEDTYPE]: continue
-                    if len(appJ) > 1 and len(appI) > 1:
-                        if STRING_ATTRIBUTEVALUE in appI[1] and STRING_ATTRIBUTEVALUE in appJ[1]:
-                            if appI[1][STRING_ATTRIBUTEVALUE] != appJ[1][STRING_ATTRIBUTEVALUE]: continue
-
-                    diff_app = DeepDiff(appI, appJ, ignore_order=True)
-                    removed_dict_items_appJ = diff_app.get('dictionary_item_removed',[])
-                    removed_iterable_items_appJ = diff_app.get('iterable_item_removed',[])
-                    added_dict_items_appJ = diff_app.get('dictionary_item_added',[])
-                    added_iterable_items_appJ = diff_app.get('iterable_item_added',[])
-                    values_changed_appJ = diff_app.get('values_changed',[])
-
-                    #if general data is equal and app more general in appI, compare/merge the requirements of appJ in appI
-                    if not removed_dict_items_appJ and not removed_iterable_items_appJ and not values_changed_appJ:
-                        #compare the requirements
-                        reqI = specI['req']
-                        reqJ = specJ['req']
-                        for k in range(len(reqI)):
-                            for l in range(len(reqJ)):
-                                diff_req = compare_and_merge_requirement_dicts(reqI[k], reqJ[l], [STRING_ATTRIBUTEVALUE,STRING_PROPERTYVALUE], True)
-                    
-                    #if general data is equal and app more general in appJ, compare/merge the requirements of appI in appJ
-                    if not added_dict_items_appJ and not added_iterable_items_appJ and not values_changed_appJ:
-                        #compare the requirements
-                        reqI = specI['req']
-                        reqJ = specJ['req']
-                        for k in range(len(reqI)):
-                            for l in range(len(reqJ)):
-                                diff_req = compare_and_merge_requirement_dicts(reqJ[l], reqI[k], [STRING_ATTRIBUTEVALUE,STRING_PROPERTYVALUE], True)                    
-
-def compare_and_merge_requirement_dicts(req_dict1, req_dict2, not_compared_keys, merge_only_values, reverse=False):
+
+            #check if spec i has a more general applicability than j.
+            appI = specI.app
+            appJ = specJ.app
+            if len(appJ) > 0 and len(appI) > 0:
+                if STRING_ENTITY in appI[0] and STRING_ENTITY in appJ[0]:
+                    if appI[0][STRING_ENTITY] != appJ[0][STRING_ENTITY]: continue
+                if STRING_PREDEFINEDTYPE in appI[0] and STRING_PREDEFINEDTYPE in appJ[0]:
+                    if appI[0][STRING_PREDEFINEDTYPE] != appJ[0][STRING_PREDEFINEDTYPE]: continue
+            if len(appJ) > 1 and len(appI) > 1:
+                if STRING_ATTRIBUTEVALUE in appI[1] and STRING_ATTRIBUTEVALUE in appJ[1]:
+                    if appI[1][STRING_ATTRIBUTEVALUE] != appJ[1][STRING_ATTRIBUTEVALUE]: continue
+
+            #structural containment is a necessary condition for a more general applicability
+            facetsJ, valuesJ, app_setsJ = app_signatures[j]
+            is_appI_general = valuesI <= valuesJ and is_app_subset(app_setsI, app_setsJ)
+            is_appJ_general = valuesJ <= valuesI and is_app_subset(app_setsJ, app_setsI)
+            if not is_appI_general and not is_appJ_general: continue
+
+            #if one applicability consists of facets of the other one, DeepDiff matches them and only reports added items.
+            #If too many facets differ, DeepDiff does not pair them and reports them as removed and added items.
+            #Otherwise DeepDiff confirms the containment, as its pairing of facets rejects some contained applicabilities.
+            if facetsI <= facetsJ or facetsJ <= facetsI:
+                is_appI_general = facetsI <= facetsJ
+                is_appJ_general = facetsJ <= facetsI
+            elif len(facetsI ^ facetsJ) / (len(facetsI) + len(facetsJ) + 1) > DEEPDIFF_CUTOFF_INTERSECTION_FOR_PAIRS:
+                continue
+            else:
+                diff_app = DeepDiff(appI, appJ, ignore_order=True)
+                deepdiff_calls += 1
+                values_changed_appJ = diff_app.get('values_changed',[])
+                is_appI_general = is_appI_general and not diff_app.get('dictionary_item_removed',[]) and not diff_app.get('iterable_item_removed',[]) and not values_changed_appJ
+                is_appJ_general = is_appJ_general and not diff_app.get('dictionary_item_added',[]) and not diff_app.get('iterable_item_added',[]) and not values_changed_appJ
+
+            #if general data is equal and app more general in appI, compare/merge the requirements of appJ in appI
+            if is_appI_general:
+                #compare the requirements
+                reqI = specI.req
+                reqJ = specJ.req
+                for k in range(len(reqI)):
+                    for l in range(len(reqJ)):
+                        merged_req_facet = merge_requirement_facets(reqI[k], reqJ[l], [STRING_ATTRIBUTEVALUE,STRING_PROPERTYVALUE], True)
+                        if merged_req_facet is not None:
+                            reqI[k] = merged_req_facet
+                            merges += 1
+
+            #if general data is equal and app more general in appJ, compare/merge the requirements of appI in appJ
+            if is_appJ_general:
+                #compare the requirements
+                reqI = specI.req
+                reqJ = specJ.req
+                for k in range(len(reqI)):
+                    for l in range(len(reqJ)):
+                        merged_req_facet = merge_requirement_facets(reqJ[l], reqI[k], [STRING_ATTRIBUTEVALUE,STRING_PROPERTYVALUE], True)
+                        if merged_req_facet is not None:
+                            reqJ[l] = merged_req_facet
+                            merges += 1
+
+    if context is not None:
+        context.count('deepdiff_calls', deepdiff_calls)
+        context.count('merges', merges)
+
+def add_values_to_general_spec_groups(specs_list, separate_by, incremental_state, context=None):
+    '''Adds the requirements of specific specifications to more general specifications like add_values_to_general_specs,
+    but group by group (see subsumption_groups). Groups whose specifications are unchanged since the previous conversion
+    of the workbook reuse the requirements of the previous conversion.
+
+    :param specs_list: List of all specifications
+    :type specs_list: list
+    :param separate_by: List of general data for which specifications must be seperated
+    :type separate_by: list
+    :param incremental_state: State of the previous conversion of the workbook
+    :type incremental_state: IncrementalState
+    :param context: Context of the conversion in which the DeepDiff calls and merged requirements are counted, optional
+    :type context: ConversionContext
+    '''
+    for positions in subsumption_groups(specs_list, separate_by):
+        group = [specs_list[position] for position in positions]
+        group_key = content_key([(spec.app, spec.req, spec.general, spec.spec) for spec in group])
+        group_requirements = incremental_state.memo('groups', group_key, functools.partial(add_values_to_general_specs_group, group, separate_by, context))
+        for spec, req_facets in zip(group, group_requirements):
+            spec.req = list(req_facets)
+
+def add_values_to_general_specs_group(group, separate_by, context=None):
+    '''Applies add_values_to_general_specs to one group of specifications.
+
+    :param group: Specifications of one group (see subsumption_groups)
+    :type group: list
+    :param separate_by: List of general data for which specifications must be seperated
+    :type separate_by: list
+    :param context: Context of the conversion, optional
+    :type context: ConversionContext
+    :return: Tuple of the requirements of each specification
+    :rtype: tuple
+    '''
+    add_values_to_general_specs(group, separate_by, context)
+    return tuple(tuple(spec.req) for spec in group)
+
+def subsumption_groups(specs_list, separate_by):
+    '''Divides the specifications into groups that are processed independently by add_values_to_general_specs.
+    Specifications are only compared with the candidates of their bucket (see subsumption_candidates). If a bucket contains
+    specifications without an Entity, the whole bucket is one group. Otherwise each Entity of the bucket is one group.
+
+    :param specs_list: List of all specifications
+    :type specs_list: list
+    :param separate_by: List of general data for which specifications must be seperated
+    :type separate_by: list
+    :return: List of the sorted positions of the specifications of each group
+    :rtype: list
+    '''
+    index = subsumption_index(specs_list, separate_by)
+    groups = {}
+    for position, (bucket, entity_key) in enumerate(zip(index['buckets'], index['entities'])):
+        group_key = (id(bucket), None if bucket['wildcard'] else entity_key[0])
+        groups.setdefault(group_key, []).append(position)
+    return list(groups.values())
+
+def unordered_value(value):
+    '''Converts nested tuples, lists, facets and dictionaries into hashable values that ignore the order and repetition of list items,
+    like a DeepDiff comparison with ignore_order=True.
+
+    :param value: Value to be converted
+    :type value: tuple, list, Facet, dict, str, int, float or bool
+    :return: Hashable representation of the value
+    :rtype: frozenset, str, int, float or bool
+    '''
+    if isinstance(value, Mapping):
+        return frozenset((key, unordered_value(item)) for key, item in value.items())
+    if isinstance(value, (tuple, list)):
+        return frozenset(unordered_value(item) for item in value)
+    return value
+
+def app_signature(app_list):
+    '''Converts an applicability into hashable sets for fast subset checks:
+    the set of its facets, the set of all (key, value) pairs of its facets and a list with a dictionary of value sets for each facet.
+
+    :param app_list: Tuple containing the facets of the applicability
+    :type app_list: tuple
+    :return: Tuple of the facet set, the (key, value) set and the list of facet dictionaries with value sets
+    :rtype: tuple
+    '''
+    app_sets = [{key: unordered_value(values) if isinstance(values, tuple) else frozenset([unordered_value(values)])
+                 for key, values in facet.items()} for facet in app_list]
+    facets = frozenset(frozenset(facet.items()) for facet in app_sets)
+    values = frozenset((key, value) for facet in app_sets for key, value_set in facet.items() for value in value_set)
+    return facets, values, app_sets
+
+def is_app_subset(app_sets1, app_sets2):
+    '''Checks whether applicability 1 is more general than (or equal to) applicability 2.
+    This is the case if every facet of applicability 1 is contained in a facet of applicability 2:
+    all keys of the facet exist in the other facet and all values are contained in the values of the other facet.
+
+    :param app_sets1: Facet dictionaries of applicability 1 created by app_signature
+    :type app_sets1: list
+    :param app_sets2: Facet dictionaries of applicability 2 created by app_signature
+    :type app_sets2: list
+    :return: Boolean specifying whether applicability 1 is a subset of applicability 2
+    :rtype: boolean
+    '''
+    for facet1 in app_sets1:
+        if not any(facet1.keys() <= facet2.keys() and all(values <= facet2[key] for key, values in facet1.items())
+                   for facet2 in app_sets2):
+            return False
+    return True
+
+def subsumption_index(specs_list, separate_by):
+    '''Groups the positions of the specifications into buckets of specifications that can be merged by add_values_to_general_specs.
+    Specifications are bucketed by their specification cardinality and ifc versions and by the general data specified by separate_by.
+    Inside each bucket, specifications are grouped by the Entity and PredefinedType of their first applicability facet.
+    Specifications without an Entity are compatible with all specifications of their bucket.
+
+    :param specs_list: List of all specifications
+    :type specs_list: list
+    :param separate_by: List of general data for which specifications must be seperated
+    :type separate_by: list
+    :return: Dictionary with the bucket of each specification ('buckets') and the entity key of each specification ('entities')
+    :rtype: dict
+    '''
+    buckets = {}
+    spec_buckets = []
+    spec_entities = []
+    for position, spec in enumerate(specs_list):
+        specification_key = tuple(unordered_value(spec.spec[key]) if key in spec.spec else KEYWORD_MISSING
+                                  for key in [STRING_SPECIFICATIONCARDINALITY,STRING_SPECIFICATIONIFCVERSION])
+        generaldata_key = tuple(unordered_value(spec.general[key]) if key in spec.general else KEYWORD_MISSING
+                                for key in separate_by)
+        bucket = buckets.setdefault((specification_key, generaldata_key), {'all': [], 'wildcard': [], 'entities': {}})
+        bucket['all'].append(position)
+
+        app = spec.app
+        entity_key = None
+        if len(app) > 0 and STRING_ENTITY in app[0]:
+            entity_key = (app[0][STRING_ENTITY], app[0].get(STRING_PREDEFINEDTYPE, KEYWORD_MISSING))
+            entity_bucket = bucket['entities'].setdefault(entity_key[0], {'all': [], 'predefined_types': {}})
+            entity_bucket['all'].append(position)
+            entity_bucket['predefined_types'].setdefault(entity_key[1], []).append(position)
+        else:
+            bucket['wildcard'].append(position)
+        spec_buckets.append(bucket)
+        spec_entities.append(entity_key)
+    return {'buckets': spec_buckets, 'entities': spec_entities}
+
+def subsumption_candidates(index, position):
+    '''Returns the positions after the given position whose specifications are compatible with the specification at the given position.
+
+    :param index: Index created by subsumption_index
+    :type index: dict
+    :param position: Position of the specification in the specification list
+    :type position: int
+    :return: Sorted list of candidate positions
+    :rtype: list
+    '''
+    bucket = index['buckets'][position]
+    entity_key = index['entities'][position]
+    if entity_key is None:
+        position_lists = [bucket['all']]
+    else:
+        entity_bucket = bucket['entities'][entity_key[0]]
+        position_lists = [bucket['wildcard']]
+        if entity_key[1] == KEYWORD_MISSING:
+            position_lists.append(entity_bucket['all'])
+        else:
+            position_lists.append(entity_bucket['predefined_types'][entity_key[1]])
+            position_lists.append(entity_bucket['predefined_types'].get(KEYWORD_MISSING, []))
+    candidates = []
+    for positions in position_lists:
+        candidates.extend(positions[bisect.bisect_right(positions, position):])
+    candidates.sort()
+    return candidates
+
+def merge_requirement_facets(req_dict1, req_dict2, not_compared_keys, merge_only_values, reverse=False):
     '''Checks whether the req_dict1 is a subset of req_dict2.
     This means, the old requirement must be a subset of the new requirement. The keys of req_dict1 must exist in req_dict2 and the values must be equal.
     An exception are lists for property values or attribute values. These are not compared. Here the values can be different because they are merged together, unless one contains a complex restriction. Complex restrictions cannot be merged and thus always indicate a difference.
-    If req_dict1 is a subset of req_dict2, the information of req_dict2 is merged into req_dict1.
+    If req_dict1 is a subset of req_dict2, the information of req_dict2 is merged into a new facet, which replaces req_dict1 at the caller.
     
-    :param req_dict1: dictionary 1 (is altered if dictionaries are subsets)
-    :type req_dict1: dict
-    :param req_dict2: dictionary 2 (is not altered)
-    :type req_dict2: dict
-    :param merge_only_values: Boolean defining that dicts should only be merged if all keys except Description exist in both dicts
+    :param req_dict1: facet 1
+    :type req_dict1: Facet
+    :param req_dict2: facet 2
+    :type req_dict2: Facet
+    :param merge_only_values: Boolean defining that facets should only be merged if all keys except Description exist in both facets
     :type merge_only_values: boolean
     :param reverse: Boolean defining if the subset logic should be reversed. If true, req_dict2 must be a subset of req_dict1, but still req_dict2 is merged into req_dict1
     :type reverse: boolean
-    :return: boolean specifying whether the dicts were different or not
-    :rtype: boolean
+    :return: merged facet, or None if the facets were different
+    :rtype: Facet
     '''
     diff = False
     #boolean specifying whether the same type of facet is compared (e.g. property facet with property facet)
@@ -781,9 +1379,8 @@ def compare_and_merge_requirement_dicts(req_dict1, req_dict2, not_compared_keys,
             elif req_dict1[key] != req_dict2[key]: diff = True
         else: diff = True
     if not diff and same_facet:
-        req_dict1 = merger.merge(req_dict1, req_dict2)
-        return False
-    return True
+        return req_dict1.merge(req_dict2)
+    return None
 
 def is_complex_restriction(value):
     '''Checks whether the value is a complex restriction (starts with the key character of a complex restriction)
@@ -797,65 +1394,135 @@ def is_complex_restriction(value):
         return True
     return False
 
-def create_ids_specifications(ids_file, spec_list):
+def create_ids_specifications(ids_file, spec_list, context=None):
     '''Creates a new IDS specification for each entry in the spec_list and appends it to the ids_file.
     
     :param ids_file: the used ids_file
     :type ids_file: object ids
-    :param spec_list: list containing all specifications as dictionaries
+    :param spec_list: list containing all specifications (see spec_model.py)
     :type spec_list: list
-    :param ifc_version: list containing the ifc versions used for all specifications
-    :type ifc_version: list
+    :param context: Context of the conversion that created the specifications (see excel_to_spec_list)
+    :type context: ConversionContext
     :return: None
     '''
-    i = 1
-    for spec_data in spec_list:
-        app_data = spec_data['app']
-        string_instructions = ''
-        if 'Phase' in spec_data['general']: string_instructions += 'Phase: ' + ', '.join(spec_data['general']['Phase']) + '; '
-        if 'Role' in spec_data['general']: string_instructions += 'Role: ' + ', '.join(spec_data['general']['Role']) + '; '
-        if 'Usecase' in spec_data['general']: string_instructions += 'Usecase: ' + ', '.join(spec_data['general']['Usecase']) + '; '
-        string_instructions = string_instructions[0:len(string_instructions)-2]
-        #Define specification name
-        if STRING_SPECIFICATIONNAME in spec_data['spec']: spec_title = spec_data['spec'][STRING_SPECIFICATIONNAME][0]
-        else:
-            spec_title = 'Specification ' + str(i)
-            if len(app_data) > 0:
-                if STRING_ENTITY in app_data[0]:
-                    spec_title += ':'
-                    for j in range(len(app_data[0][STRING_ENTITY])):
-                        spec_title += ' ' + app_data[0][STRING_ENTITY][j]
-                        if STRING_PREDEFINEDTYPE in app_data[0]:
-                            spec_title += '.' + app_data[0][STRING_PREDEFINEDTYPE][j]
-        #Define specification cardinality
-        spec_minOccurs=0
-        spec_maxOccurs="unbounded"
-        if STRING_SPECIFICATIONCARDINALITY in spec_data['spec']:
-            if spec_data['spec'][STRING_SPECIFICATIONCARDINALITY][0].lower() == 'required':
-                spec_minOccurs = 1
-            if spec_data['spec'][STRING_SPECIFICATIONCARDINALITY][0].lower() == 'prohibited':
-                spec_maxOccurs = 0
-        #Define specification IFC version
-        ifc_version = spec_data['spec'][STRING_SPECIFICATIONIFCVERSION]
-        #Create specification
-        ids_spec = ids.Specification(name=spec_title, ifcVersion=ifc_version, minOccurs=spec_minOccurs, maxOccurs=spec_maxOccurs, instructions=string_instructions if string_instructions != '' else None)
-        #Append applicability and requirements
-        append_facets(ids_spec.applicability, app_data)
-        append_facets(ids_spec.requirements, spec_data['req'])
-        #Append specification to ids file
-        ids_file.specifications.append(ids_spec)
-        i += 1
-
-def append_facets(facets, input_data):
+    ids_file.specifications.extend(iter_ids_specifications(spec_list, context))
+
+def iter_ids_specifications(spec_list, context=None):
+    '''Creates the IDS specifications of the spec_list one by one (see create_ids_specification).
+    Used to stream the specifications into an IDS file without keeping all of them in memory.
+
+    :param spec_list: list containing all specifications (see spec_model.py)
+    :type spec_list: list
+    :param context: Context of the conversion that created the specifications (see excel_to_spec_list)
+    :type context: ConversionContext
+    :return: Generator of IDS specifications
+    :rtype: generator
+    '''
+    for i, spec_data in enumerate(spec_list, start=1):
+        if context is None:
+            yield create_ids_specification(spec_data, i)
+            continue
+        #The specifications are created while the IDS file is written, so the stages alternate
+        context.start_stage('create_specifications')
+        ids_spec = create_ids_specification(spec_data, i, context)
+        context.start_stage('write_xml')
+        yield ids_spec
+
+def create_ids_specification(spec_data, number, context=None):
+    '''Creates a new IDS specification including its applicability and requirements facets.
+
+    :param spec_data: specification (see spec_model.py)
+    :type spec_data: Spec
+    :param number: number of the specification in the IDS file (used for the default specification name)
+    :type number: int
+    :param context: Context of the conversion that created the specification, its property descriptions are used as instructions
+    :type context: ConversionContext
+    :return: IDS specification
+    :rtype: ids.Specification
+    '''
+    app_data = spec_data.app
+    string_instructions = ''
+    if 'Phase' in spec_data.general: string_instructions += 'Phase: ' + ', '.join(spec_data.general['Phase']) + '; '
+    if 'Role' in spec_data.general: string_instructions += 'Role: ' + ', '.join(spec_data.general['Role']) + '; '
+    if 'Usecase' in spec_data.general: string_instructions += 'Usecase: ' + ', '.join(spec_data.general['Usecase']) + '; '
+    string_instructions = string_instructions[0:len(string_instructions)-2]
+    #Define specification name
+    spec_title = specification_title(spec_data, number)
+    #Define specification cardinality
+    spec_minOccurs=0
+    spec_maxOccurs="unbounded"
+    if STRING_SPECIFICATIONCARDINALITY in spec_data.spec:
+        if spec_data.spec[STRING_SPECIFICATIONCARDINALITY][0].lower() == 'required':
+            spec_minOccurs = 1
+        if spec_data.spec[STRING_SPECIFICATIONCARDINALITY][0].lower() == 'prohibited':
+            spec_maxOccurs = 0
+    #Define specification IFC version
+    ifc_version = list(spec_data.spec[STRING_SPECIFICATIONIFCVERSION])
+    #Create specification
+    ids_spec = ids.Specification(name=spec_title, ifcVersion=ifc_version, minOccurs=spec_minOccurs, maxOccurs=spec_maxOccurs, instructions=string_instructions if string_instructions != '' else None)
+    #Append applicability and requirements
+    append_facets(ids_spec.applicability, app_data, context)
+    append_facets(ids_spec.requirements, spec_data.req, context)
+    return ids_spec
+
+def specification_title(spec_data, number):
+    '''Returns the name of the IDS specification: the specification name of the excel data
+    or a default name with the number of the specification and the entities of its applicability.
+
+    :param spec_data: specification (see spec_model.py)
+    :type spec_data: Spec
+    :param number: number of the specification in the IDS file
+    :type number: int
+    :return: Name of the specification
+    :rtype: str
+    '''
+    app_data = spec_data.app
+    if STRING_SPECIFICATIONNAME in spec_data.spec: return spec_data.spec[STRING_SPECIFICATIONNAME][0]
+    spec_title = 'Specification ' + str(number)
+    if len(app_data) > 0:
+        if STRING_ENTITY in app_data[0]:
+            spec_title += ':'
+            for j in range(len(app_data[0][STRING_ENTITY])):
+                spec_title += ' ' + app_data[0][STRING_ENTITY][j]
+                if STRING_PREDEFINEDTYPE in app_data[0]:
+                    spec_title += '.' + app_data[0][STRING_PREDEFINEDTYPE][j]
+    return spec_title
+
+def incomplete_facet_reason(input_dict):
+    '''Checks if the facet contains the parameters required by its IDS facet type.
+
+    :param input_dict: Facet dictionary (key = value or key = [value, value, value])
+    :type input_dict: dict or Facet
+    :return: Reason why the facet is incomplete or None if it is complete
+    :rtype: str
+    '''
+    if STRING_ENTITY in input_dict or STRING_PREDEFINEDTYPE in input_dict:
+        if STRING_ENTITY not in input_dict: return 'The Entity facet requires the Entity parameter.'
+    elif STRING_PROPERTYSET in input_dict or STRING_PROPERTY in input_dict or STRING_PROPERTYDATATYPE in input_dict or STRING_PROPERTYVALUE in input_dict:
+        if STRING_PROPERTYSET not in input_dict or STRING_PROPERTY not in input_dict: return 'The Property facet requires the PropertySet and Property parameters.'
+    elif STRING_MATERIAL in input_dict:
+        return None
+    elif STRING_ATTRIBUTE in input_dict or STRING_ATTRIBUTEVALUE in input_dict:
+        if STRING_ATTRIBUTE not in input_dict: return 'The Attribute facet requires the Attribute parameter.'
+    elif STRING_CLASSIFICATION in input_dict or STRING_CLASSIFICATIONSYSTEM in input_dict or STRING_CLASSIFICATIONURI in input_dict:
+        if STRING_CLASSIFICATIONSYSTEM not in input_dict: return 'The Classification facet requires the Classifiaction system parameter.'
+    elif STRING_PARTOFENTITY in input_dict or STRING_PARTOFPREDEFINEDTYPE in input_dict or STRING_PARTOFRELATION in input_dict:
+        if STRING_PARTOFENTITY not in input_dict: return 'The PartOf facet requires the Entity parameter.'
+    return None
+
+def append_facets(facets, input_data, context=None):
     '''Creates a new IDS facet for each entry in the input_data list and and stores it in a list (facets).
     It also converts enumerations, patterns, bounds, and lengths into ids resctrictions.
 
     :param facets: list to store the facets 
     :type facets: list
-    :param input_data: list containing all facet data as dictionaries
+    :param input_data: list or tuple containing all facets (see spec_model.py)
     :type input_data: list
+    :param context: Context of the conversion, its property descriptions are used as instructions of the property facets
+    :type context: ConversionContext
     :return: None
     '''
+    property_descriptions = context.property_descriptions if context is not None else {}
 
     #prepare the input data for using the ifcopenshell functions
     new_input_data = []
@@ -863,7 +1530,7 @@ def append_facets(facets, input_data):
         new_input_dict = {}
         for key in input_dict.keys():
             or_values = input_dict[key]
-            if isinstance(or_values, list):
+            if isinstance(or_values, (list, tuple)):
                 or_values = list(dict.fromkeys(or_values))
                 restriction_base = 'string'
                 #Determine the restriction base for complex restrictions depending on the datatype
@@ -912,28 +1579,24 @@ def append_facets(facets, input_data):
     #Create an ids facet for each prepared input dictionary
     for input_dict in new_input_data:
         facet = None
-        incomplete_facet = None
+        incomplete_facet = incomplete_facet_reason(input_dict)
+        if incomplete_facet != None:
+            raise Exception('Incomplete IDS facet: ' + str(input_dict) + '. ' + incomplete_facet)
         #Entity facet
         if STRING_ENTITY in input_dict or STRING_PREDEFINEDTYPE in input_dict:
-            if STRING_ENTITY not in input_dict: incomplete_facet = 'The Entity facet requires the Entity parameter.'
-            else:
-                key = str(input_dict[STRING_ENTITY])
-                if STRING_PREDEFINEDTYPE in input_dict: key += '.' + str(input_dict[STRING_PREDEFINEDTYPE])
-                facet = ids.Entity(name=input_dict[STRING_ENTITY] if STRING_ENTITY in input_dict else None,
-                                predefinedType=input_dict[STRING_PREDEFINEDTYPE] if STRING_PREDEFINEDTYPE in input_dict else None,
-                                instructions=input_dict[STRING_DESCRIPTION] if STRING_DESCRIPTION in input_dict else None)
+            facet = ids.Entity(name=input_dict[STRING_ENTITY] if STRING_ENTITY in input_dict else None,
+                            predefinedType=input_dict[STRING_PREDEFINEDTYPE] if STRING_PREDEFINEDTYPE in input_dict else None,
+                            instructions=input_dict[STRING_DESCRIPTION] if STRING_DESCRIPTION in input_dict else None)
         #Property facet
         elif STRING_PROPERTYSET in input_dict or STRING_PROPERTY in input_dict or STRING_PROPERTYDATATYPE in input_dict or STRING_PROPERTYVALUE in input_dict:
-            if STRING_PROPERTYSET not in input_dict or STRING_PROPERTY not in input_dict: incomplete_facet = 'The Property facet requires the PropertySet and Property parameters.'
-            else:
-                key = str(input_dict[STRING_PROPERTY])
-                facet = ids.Property(propertySet=input_dict[STRING_PROPERTYSET] if STRING_PROPERTYSET in input_dict else None,
-                                    baseName=input_dict[STRING_PROPERTY] if STRING_PROPERTY in input_dict else None,
-                                    dataType=input_dict[STRING_PROPERTYDATATYPE].replace(' ','') if STRING_PROPERTYDATATYPE in input_dict else None,
-                                    value=input_dict[STRING_PROPERTYVALUE] if STRING_PROPERTYVALUE in input_dict else None,
-                                    uri=input_dict[STRING_PROPERTYURI] if STRING_PROPERTYURI in input_dict else None,
-                                    cardinality=input_dict[STRING_REQUIREMENTCARDINALITY] if STRING_REQUIREMENTCARDINALITY in input_dict else None,
-                                    instructions=property_description_dict[key] if key in property_description_dict else None)
+            key = str(input_dict[STRING_PROPERTY])
+            facet = ids.Property(propertySet=input_dict[STRING_PROPERTYSET] if STRING_PROPERTYSET in input_dict else None,
+                                baseName=input_dict[STRING_PROPERTY] if STRING_PROPERTY in input_dict else None,
+                                dataType=input_dict[STRING_PROPERTYDATATYPE].replace(' ','') if STRING_PROPERTYDATATYPE in input_dict else None,
+                                value=input_dict[STRING_PROPERTYVALUE] if STRING_PROPERTYVALUE in input_dict else None,
+                                uri=input_dict[STRING_PROPERTYURI] if STRING_PROPERTYURI in input_dict else None,
+                                cardinality=input_dict[STRING_REQUIREMENTCARDINALITY] if STRING_REQUIREMENTCARDINALITY in input_dict else None,
+                                instructions=property_descriptions[key] if key in property_descriptions else None)
         #Material facet
         elif STRING_MATERIAL in input_dict:
             facet = ids.Material(value=input_dict[STRING_MATERIAL] if STRING_MATERIAL in input_dict else None,
@@ -941,30 +1604,22 @@ def append_facets(facets, input_data):
                                 cardinality=input_dict[STRING_REQUIREMENTCARDINALITY] if STRING_REQUIREMENTCARDINALITY in input_dict else None)
         #Attribute facet
         elif STRING_ATTRIBUTE in input_dict or STRING_ATTRIBUTEVALUE in input_dict:
-            if STRING_ATTRIBUTE not in input_dict: incomplete_facet = 'The Attribute facet requires the Attribute parameter.'
-            else:
-                facet = ids.Attribute(name=input_dict[STRING_ATTRIBUTE] if STRING_ATTRIBUTE in input_dict else None,
-                                    value=input_dict[STRING_ATTRIBUTEVALUE] if STRING_ATTRIBUTEVALUE in input_dict else None,
-                                    cardinality=input_dict[STRING_REQUIREMENTCARDINALITY] if STRING_REQUIREMENTCARDINALITY in input_dict else None)
+            facet = ids.Attribute(name=input_dict[STRING_ATTRIBUTE] if STRING_ATTRIBUTE in input_dict else None,
+                                value=input_dict[STRING_ATTRIBUTEVALUE] if STRING_ATTRIBUTEVALUE in input_dict else None,
+                                cardinality=input_dict[STRING_REQUIREMENTCARDINALITY] if STRING_REQUIREMENTCARDINALITY in input_dict else None)
         #Classification facet
         elif STRING_CLASSIFICATION in input_dict or STRING_CLASSIFICATIONSYSTEM in input_dict or STRING_CLASSIFICATIONURI in input_dict:
-            if STRING_CLASSIFICATIONSYSTEM not in input_dict: incomplete_facet = 'The Classification facet requires the Classifiaction system parameter.'
-            else:
-                facet = ids.Classification(value=input_dict[STRING_CLASSIFICATION] if STRING_CLASSIFICATION in input_dict else None,
-                                        system=input_dict[STRING_CLASSIFICATIONSYSTEM] if STRING_CLASSIFICATIONSYSTEM in input_dict else None,
-                                        uri=input_dict[STRING_CLASSIFICATIONURI] if STRING_CLASSIFICATIONURI in input_dict else None,
-                                        cardinality=input_dict[STRING_REQUIREMENTCARDINALITY] if STRING_REQUIREMENTCARDINALITY in input_dict else None)
+            facet = ids.Classification(value=input_dict[STRING_CLASSIFICATION] if STRING_CLASSIFICATION in input_dict else None,
+                                    system=input_dict[STRING_CLASSIFICATIONSYSTEM] if STRING_CLASSIFICATIONSYSTEM in input_dict else None,
+                                    uri=input_dict[STRING_CLASSIFICATIONURI] if STRING_CLASSIFICATIONURI in input_dict else None,
+                                    cardinality=input_dict[STRING_REQUIREMENTCARDINALITY] if STRING_REQUIREMENTCARDINALITY in input_dict else None)
         #PartOf facet
         elif STRING_PARTOFENTITY in input_dict or STRING_PARTOFPREDEFINEDTYPE in input_dict or STRING_PARTOFRELATION in input_dict:
-            if STRING_PARTOFENTITY not in input_dict: incomplete_facet = 'The PartOf facet requires the Entity parameter.'
-            else:
-                facet = ids.PartOf(name=input_dict[STRING_PARTOFENTITY] if STRING_PARTOFENTITY in input_dict else None,
-                                        predefinedType=input_dict[STRING_PARTOFPREDEFINEDTYPE] if STRING_PARTOFPREDEFINEDTYPE in input_dict else None,
-                                        relation=input_dict[STRING_PARTOFRELATION] if STRING_PARTOFRELATION in input_dict else None,
-                                        cardinality=input_dict[STRING_REQUIREMENTCARDINALITY] if STRING_REQUIREMENTCARDINALITY in input_dict else None)
-        if incomplete_facet != None:
-            raise Exception('Incomplete IDS facet: ' + str(input_dict) + '. ' + incomplete_facet)
-        
+            facet = ids.PartOf(name=input_dict[STRING_PARTOFENTITY] if STRING_PARTOFENTITY in input_dict else None,
+                                    predefinedType=input_dict[STRING_PARTOFPREDEFINEDTYPE] if STRING_PARTOFPREDEFINEDTYPE in input_dict else None,
+                                    relation=input_dict[STRING_PARTOFRELATION] if STRING_PARTOFRELATION in input_dict else None,
+                                    cardinality=input_dict[STRING_REQUIREMENTCARDINALITY] if STRING_REQUIREMENTCARDINALITY in input_dict else None)
+
         if facet != None:
             facets.append(facet)
 
@@ -984,12 +1639,12 @@ def separate_specs_by_generaldata(input_data, separate_by_list):
         #Initialize list of separation strings
         separation_strings = ['']
         #Create all possible combinations of general data separators in the current spec
-        for key in spec['general'].keys():
+        for key in spec.general.keys():
             if key in separate_by_list:
                 separation_strings_new = []
                 for sep_string in separation_strings:
                     #for each separator in the general data of the current spec
-                    for value in spec['general'][key]:
+                    for value in spec.general[key]:
                         #append the separator to each prevoius sep_string
                         sep_string_new = sep_string + '_' + key + str(value)
                         separation_strings_new.append(sep_string_new)
@@ -999,53 +1654,21 @@ def separate_specs_by_generaldata(input_data, separate_by_list):
         for sep_string in separation_strings:
             if sep_string in separated_data.keys():
                 separated_data[sep_string]['specs'].append(spec)
-                if 'Phase' in spec['general']: separated_data[sep_string]['general']['Phase'].update(spec['general']['Phase'])
-                if 'Role' in spec['general']: separated_data[sep_string]['general']['Role'].update(spec['general']['Role'])
-                if 'Usecase' in spec['general']: separated_data[sep_string]['general']['Usecase'].update(spec['general']['Usecase'])
+                if 'Phase' in spec.general: separated_data[sep_string]['general']['Phase'].update(spec.general['Phase'])
+                if 'Role' in spec.general: separated_data[sep_string]['general']['Role'].update(spec.general['Role'])
+                if 'Usecase' in spec.general: separated_data[sep_string]['general']['Usecase'].update(spec.general['Usecase'])
             else:
                 separated_data[sep_string] = {}
                 separated_data[sep_string]['specs'] = [spec]
                 separated_data[sep_string]['general'] = {}
-                if 'Phase' in spec['general']: separated_data[sep_string]['general']['Phase'] = set(spec['general']['Phase'])
+                if 'Phase' in spec.general: separated_data[sep_string]['general']['Phase'] = set(spec.general['Phase'])
                 else: separated_data[sep_string]['general']['Phase'] = set()
-                if 'Role' in spec['general']: separated_data[sep_string]['general']['Role'] = set(spec['general']['Role'])
+                if 'Role' in spec.general: separated_data[sep_string]['general']['Role'] = set(spec.general['Role'])
                 else: separated_data[sep_string]['general']['Role'] = set()
-                if 'Usecase' in spec['general']: separated_data[sep_string]['general']['Usecase'] = set(spec['general']['Usecase'])
+                if 'Usecase' in spec.general: separated_data[sep_string]['general']['Usecase'] = set(spec.general['Usecase'])
                 else: separated_data[sep_string]['general']['Usecase'] = set()
     return separated_data
 
-def add_comment_to_xml(file_path, comment_text):
-    # Parse the XML file
-    tree = ET.parse(file_path)
-    root = tree.getroot()
-    
-    # Create the comment element
-    comment = ET.Comment(comment_text)
-    
-    # Add the comment as the first child of the root
-    root.insert(0, comment)
-    
-    # Write the modified XML with manual formatting
-    with open(file_path, "wb") as f:
-        # Add the XML declaration manually
-        f.write(b'<?xml version="1.0" encoding="utf-8"?>\n')
-        
-        # Add the root element with the comment and newline
-        f.write(ET.tostring(root, encoding="utf-8", method="xml").replace(b'-->', b'-->\n\t'))
-
-merger = Merger(
-    # Define custom merge strategies for different data types
-    
-    # First argument: List of merge strategies for specific types
-    [(dict, 'merge'), (list, 'append_unique'), (set, 'union')],
-    
-    # Second argument: Fallback strategy for any other types (if they differ, replace)
-    ['override'],
-    
-    # Third argument: List of strategies to apply to certain types in order of priority
-    ['override']
-)
-
 datatype_base_dict = {
     'IFCABSORBEDDOSEMEASURE': 'double',
     'IFCACCELERATIONMEASURE': 'double',
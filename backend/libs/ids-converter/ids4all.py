@@ -0,0 +1,337 @@
+'''Importable IDS4ALL conversion pipeline.
+
+Exposes the get_metadata -> process_excel_data -> create_ids_files pipeline so that it can be
+called directly from an already running interpreter (e.g. a Celery worker) instead of spawning
+IDS4ALL-main.py for every workbook. Workbooks can be given as a path, as raw bytes or as a
+file-like object; they are opened once (see workbook_session.py) and the generated IDS documents
+are returned in memory.
+'''
+import functools
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+import pandas as pd
+from ifctester import ids
+from custom_functions import *
+from conversion_context import ConversionContext
+from workbook_session import open_workbook_session
+from ids_xml import write_ids, ids_to_bytes
+from incremental import load_state, save_state
+
+CONVERTER_VERSION = '1.1.0'
+ATTRIBUTION_COMMENT = ' Created with the IDS4ALL Converter developed by Simon Fischer, Harald Urban, Konstantin Höbart, and Christian Schranz of TU Wien Research Unit Digital Building Process (https://www.tuwien.at/en/cee/ibb/zdb). '
+
+def open_excel_source(excel_source):
+    '''Opens the given workbook source once for all reads of the conversion.
+
+    :param excel_source: Path to an excel file, raw workbook bytes or a file-like object
+    :type excel_source: str or bytes or file-like object
+    :return: Workbook session
+    :rtype: WorkbookSession
+    '''
+    return open_workbook_session(excel_source)
+
+def get_metadata(excel_source):
+    '''Extracts the metadata of the IDS4ALL sheet.
+
+    :param excel_source: Workbook session or path to an excel file
+    :type excel_source: WorkbookSession or str
+    :return: sheet name, ifc version, separators, skipped rows, entity-based applicability flag and all metadata as dict
+    :rtype: tuple
+    '''
+    # Load Excel data
+    data = open_workbook_session(excel_source).read_metadata()
+
+    # Convert data to a dictionary
+    data_dict = {key: value for key, value in zip(data[0], data[1]) if pd.notna(value)}
+
+    # Validate required metadata
+    required_metadata = ['Sheet name', 'IFC version']
+    for meta in required_metadata:
+        if meta not in data_dict:
+            raise Exception(f'{meta} is not defined in the Excel')
+
+    sheet_name = data_dict['Sheet name']
+    ifc_version = data_dict['IFC version'].replace(' ','').replace(',','|')
+    separate_by = data_dict['File separators'].replace(' ','').split(',') if 'File separators' in data_dict else []
+    skipped_rows = data_dict['Skipped rows'] if 'Skipped rows' in data_dict else 0
+    is_entity_based_app = True if 'Entity-based applicability' in data_dict and data_dict['Entity-based applicability'].lower() == 'yes' else False
+
+    return sheet_name, ifc_version, separate_by, skipped_rows, is_entity_based_app, data_dict
+
+def process_excel_data(excel_source, sheet_name, separate_by, skipped_rows, ifc_version, is_entity_based_app, max_combinations=MAX_COMBINATIONS_PER_ROW, diagnostics=None, incremental_state=None, context=None):
+    '''Converts the excel data into specifications and separates them by the general data given in separate_by.
+
+    :param max_combinations: Maximum number of applicability combinations a single row may expand into
+    :type max_combinations: int
+    :param diagnostics: Optional dictionary that is filled with the row and combination counts of the conversion
+    :type diagnostics: dict
+    :param incremental_state: Optional state of the previous conversion of the workbook (see load_incremental_state)
+    :type incremental_state: IncrementalState
+    :param context: Context of the conversion that is passed on to create_ids_files (collects the property descriptions)
+    :type context: ConversionContext
+    :return: Dictionary with specification lists per separator
+    :rtype: dict
+    '''
+    # Convert Excel data to specifications
+    excel_data = excel_to_spec_list(excel_source, sheet_name, separate_by, skipped_rows, ifc_version, is_entity_based_app, max_combinations, diagnostics, incremental_state, context)
+
+    # Separate specifications by general data
+    separated_excel_data = separate_specs_by_generaldata(excel_data, separate_by)
+
+    return separated_excel_data
+
+def load_incremental_state(path, key=None):
+    '''Loads the state of the previous conversion of a workbook for an incremental conversion.
+    Returns an empty state if the file does not exist, was created by another converter version or its signature does not match the key.
+
+    :param path: Path of the state file, None for an empty state (the first conversion of a workbook)
+    :type path: str
+    :param key: Secret key the state file was signed with (see save_incremental_state), optional
+    :type key: bytes
+    :return: Incremental state
+    :rtype: IncrementalState
+    '''
+    return load_state(path, CONVERTER_VERSION, key)
+
+def save_incremental_state(incremental_state, path, key=None):
+    '''Saves the state of a finished conversion, so that the next version of the workbook is converted incrementally.
+
+    :param incremental_state: Incremental state used by the conversion
+    :type incremental_state: IncrementalState
+    :param path: Path of the state file
+    :type path: str
+    :param key: Secret key the state file is signed with, required if the file is shared with other users, optional
+    :type key: bytes
+    :return: None
+    '''
+    save_state(incremental_state, path, key)
+
+def create_ids_info(sep_data, data_dict):
+    '''Creates an ifctester IDS object with the info block of one separator, but without specifications.
+
+    :param sep_data: Specifications and general data of one separator
+    :type sep_data: dict
+    :param data_dict: Metadata of the IDS4ALL sheet
+    :type data_dict: dict
+    :return: IDS object
+    :rtype: ids.Ids
+    '''
+    # Construct purpose and milestone strings
+    string_milestone = ''
+    string_purpose = ''
+    if len(sep_data['general']['Phase']) != 0: string_milestone += ', '.join(sep_data['general']['Phase'])
+    if len(sep_data['general']['Role']) != 0: string_purpose += 'Role: ' + ', '.join(sep_data['general']['Role']) + '; '
+    if len(sep_data['general']['Usecase']) != 0: string_purpose += 'Usecase: ' + ', '.join(sep_data['general']['Usecase']) + '; '
+    string_purpose = string_purpose[0:len(string_purpose)-2]
+
+    # Create IDS object
+    return ids.Ids(
+        title=data_dict['Title'] if 'Title' in data_dict else 'Not Defined',
+        copyright=data_dict['Copyright'] if 'Copyright' in data_dict else None,
+        version=data_dict['Version'] if 'Version' in data_dict else None,
+        description=data_dict['Description'] if 'Description' in data_dict else None,
+        author=data_dict['Author'] if 'Author' in data_dict else None,
+        date=date.today().strftime('%Y-%m-%d'),
+        purpose=string_purpose if string_purpose != '' else None,
+        milestone=string_milestone if string_milestone != '' else None,
+    )
+
+def ids_filename(excel_name, sheet_name, key):
+    '''Returns the file name of the IDS file generated for the given separator key.'''
+    key = key.replace('/','-')
+    return excel_name + '_' + sheet_name + key + '.ids'
+
+def convert_excel_to_ids(excel_source, excel_name, max_combinations=MAX_COMBINATIONS_PER_ROW, diagnostics=None, validate=False, incremental_state=None):
+    '''Runs the full IDS4ALL pipeline in the current process.
+    Each call uses its own conversion context, so several conversions can run concurrently in the threads of one process.
+
+    :param excel_source: Path to an excel file, raw workbook bytes or a file-like object
+    :type excel_source: str or bytes or file-like object
+    :param excel_name: Name of the excel file without extension (used as prefix of the IDS file names)
+    :type excel_name: str
+    :param max_combinations: Maximum number of applicability combinations a single row may expand into
+    :type max_combinations: int
+    :param diagnostics: Optional dictionary that is filled with the row and combination counts, the stage times and the counters of the conversion
+        (see ConversionContext.statistics)
+    :type diagnostics: dict
+    :param validate: Boolean specifying if the IDS documents are validated against the IDS schema while writing
+    :type validate: boolean
+    :param incremental_state: Optional state of the previous conversion of the workbook, only changed rows are processed again.
+        The state is updated for the next conversion and the number of reprocessed rows is reported in diagnostics
+    :type incremental_state: IncrementalState
+    :return: List of generated IDS documents as dictionaries (filename, content, specification_count)
+    :rtype: list
+    '''
+    # Property descriptions are collected per conversion
+    context = ConversionContext()
+
+    with open_excel_source(excel_source) as workbook:
+        sheet_name, ifc_version, separate_by, skipped_rows, is_entity_based_app, data_dict = get_metadata(workbook)
+        separated_excel_data = process_excel_data(workbook, sheet_name, separate_by, skipped_rows, ifc_version, is_entity_based_app, max_combinations, diagnostics, incremental_state, context)
+
+    documents = []
+    for key, sep_data in separated_excel_data.items():
+        # Specifications are created one by one while the document is written
+        context.start_stage('write_xml')
+        content, specification_count = ids_to_bytes(create_ids_info(sep_data, data_dict), iter_ids_specifications(sep_data['specs'], context), ATTRIBUTION_COMMENT, validate)
+        context.end_stage()
+        context.count('ids_files')
+        documents.append({
+            'filename': ids_filename(excel_name, sheet_name, key),
+            'content': content,
+            'specification_count': specification_count,
+        })
+    if diagnostics is not None:
+        diagnostics.update(context.statistics())
+    return documents
+
+def preview_excel_to_ids(excel_source, excel_name, max_combinations=MAX_COMBINATIONS_PER_ROW):
+    '''Previews the conversion of a workbook without creating IDS documents.
+    Only the rows are parsed and merged (see excel_to_spec_list), so the preview is much faster than a conversion.
+    Invalid rows and incomplete facets are collected instead of aborting at the first error.
+
+    :param excel_source: Path to an excel file, raw workbook bytes or a file-like object
+    :type excel_source: str or bytes or file-like object
+    :param excel_name: Name of the excel file without extension (used as prefix of the IDS file names)
+    :type excel_name: str
+    :param max_combinations: Maximum number of applicability combinations a single row may expand into
+    :type max_combinations: int
+    :return: Dictionary with the row and combination counts (see excel_to_spec_list), the specification count of each IDS file,
+        the row errors, the incomplete facets and the stage times and counters (see ConversionContext.statistics)
+    :rtype: dict
+    '''
+    preview = {}
+    row_errors = []
+    context = ConversionContext()
+    with open_excel_source(excel_source) as workbook:
+        sheet_name, ifc_version, separate_by, skipped_rows, is_entity_based_app, data_dict = get_metadata(workbook)
+        specs_list = excel_to_spec_list(workbook, sheet_name, separate_by, skipped_rows, ifc_version, is_entity_based_app, max_combinations, preview, context=context, row_errors=row_errors, merge_only=True)
+    separated_excel_data = separate_specs_by_generaldata(specs_list, separate_by)
+
+    files = []
+    incomplete_facets = []
+    # Facets are shared by many specifications, so each facet is checked once
+    reasons = {}
+    for key, sep_data in separated_excel_data.items():
+        filename = ids_filename(excel_name, sheet_name, key)
+        files.append({
+            'filename': filename,
+            'separator': key,
+            'specification_count': len(sep_data['specs']),
+        })
+        # The default specification names are numbered per IDS file
+        for number, spec in enumerate(sep_data['specs'], start=1):
+            for facet_type, facets in (('applicability', spec.app), ('requirements', spec.req)):
+                for facet in facets:
+                    if facet not in reasons:
+                        reasons[facet] = incomplete_facet_reason(facet)
+                    if reasons[facet] is not None:
+                        incomplete_facets.append({
+                            'filename': filename,
+                            'specification': specification_title(spec, number),
+                            'facet_type': facet_type,
+                            'facet': facet.asdict(),
+                            'error': reasons[facet],
+                        })
+
+    preview['specification_count'] = len(specs_list)
+    preview['files'] = files
+    preview['row_errors'] = row_errors
+    preview['incomplete_facets'] = incomplete_facets
+    preview.update(context.statistics())
+    return preview
+
+def write_ids_file(output_path_full, sep_data, data_dict, validate=False, context=None):
+    '''Writes the IDS file of one separator, the specifications are created one by one while the file is written.
+
+    :param output_path_full: Path of the IDS file
+    :type output_path_full: str
+    :param sep_data: Specifications and general data of one separator
+    :type sep_data: dict
+    :param data_dict: Metadata of the IDS4ALL sheet
+    :type data_dict: dict
+    :param validate: Boolean specifying if the IDS file is validated against the IDS schema
+    :type validate: boolean
+    :param context: Context of the conversion (see process_excel_data)
+    :type context: ConversionContext
+    :return: Number of written specifications
+    :rtype: int
+    '''
+    return write_ids(output_path_full, create_ids_info(sep_data, data_dict), iter_ids_specifications(sep_data['specs'], context), ATTRIBUTION_COMMENT, validate)
+
+def write_ids_file_in_worker(output_path_full, sep_data, data_dict, validate, property_descriptions):
+    '''Writes the IDS file of one separator in a worker process (see write_ids_file) with a context of its own.
+
+    :param property_descriptions: Property descriptions of the conversion (see ConversionContext)
+    :type property_descriptions: dict
+    :return: Number of written specifications and the stage times and counters of the worker (see ConversionContext.statistics)
+    :rtype: tuple
+    '''
+    context = ConversionContext(property_descriptions)
+    specification_count = write_ids_file(output_path_full, sep_data, data_dict, validate, context)
+    context.end_stage()
+    return specification_count, context.statistics()
+
+def report_ids_file(output_path_full, write):
+    '''Calls write and prints the created IDS file or the error.
+
+    :return: Result of write, None if the IDS file could not be created
+    '''
+    try:
+        result = write()
+        print('XML created')
+        print(f'Output file: {output_path_full}')
+        return result
+    except Exception as error:
+        print('Error: ', error)
+        return None
+
+def create_ids_files(separated_excel_data, data_dict, output_path, excel_name, sheet_name, validate=False, jobs=1, context=None):
+    '''Creates one IDS file per separator in the output directory.
+
+    With more than one job, the IDS files of the separators are built and written in parallel by a pool of worker processes.
+    The files are the same as with a single job.
+
+    :param separated_excel_data: Specifications and general data per separator (see process_excel_data)
+    :type separated_excel_data: dict
+    :param data_dict: Metadata of the IDS4ALL sheet
+    :type data_dict: dict
+    :param output_path: Output directory
+    :type output_path: str
+    :param excel_name: Name of the excel file without extension (used as prefix of the IDS file names)
+    :type excel_name: str
+    :param sheet_name: Name of the IDS4ALL sheet
+    :type sheet_name: str
+    :param validate: Boolean specifying if the IDS files are validated against the IDS schema
+    :type validate: boolean
+    :param jobs: Number of worker processes (0 = number of CPU cores, 1 = no worker processes)
+    :type jobs: int
+    :param context: Context of the conversion (see process_excel_data), its property descriptions are sent to the worker processes with the specifications.
+        The time of writing the IDS files is added to its stage times, with worker processes as one stage ('write_ids_files').
+        Only written IDS files are counted, the stage times and counters of the workers are added as worker statistics (see ConversionContext.add_worker_statistics)
+    :type context: ConversionContext
+    :return: None
+    '''
+    os.makedirs(output_path, exist_ok=True)
+    output_files = [(os.path.join(output_path, ids_filename(excel_name, sheet_name, key)), sep_data) for key, sep_data in separated_excel_data.items()]
+    written_files = 0
+    if jobs == 0: jobs = os.cpu_count() or 1
+    if jobs > 1 and len(output_files) > 1:
+        if context is not None: context.start_stage('write_ids_files')
+        property_descriptions = context.property_descriptions if context is not None else {}
+        with ProcessPoolExecutor(max_workers=min(jobs, len(output_files))) as executor:
+            results = [executor.submit(write_ids_file_in_worker, output_path_full, sep_data, data_dict, validate, property_descriptions) for output_path_full, sep_data in output_files]
+            for (output_path_full, _), result in zip(output_files, results):
+                worker_result = report_ids_file(output_path_full, result.result)
+                if worker_result is None: continue
+                written_files += 1
+                if context is not None: context.add_worker_statistics(worker_result[1])
+    else:
+        for output_path_full, sep_data in output_files:
+            if context is not None: context.start_stage('write_xml')
+            if report_ids_file(output_path_full, functools.partial(write_ids_file, output_path_full, sep_data, data_dict, validate, context)) is not None:
+                written_files += 1
+    if context is not None:
+        context.end_stage()
+        context.count('ids_files', written_files)
@@ -0,0 +1,384 @@
+'''lxml-based IDS writer and reader for the IDS4ALL converter.
+
+Streams IDS documents with lxml's incremental xmlfile API: the header, the IDS4ALL attribution comment and
+the info block are written first, then each specification is serialized as soon as it is created. Previously
+the whole ids.Ids object was encoded through xmlschema (Ids.to_xml), written to disk and parsed again with
+ElementTree to insert the attribution comment.
+
+The documents are structured like ifctester's Ids.asdict, with elements and attributes in the order of the
+IDS schema. The info and specification subtrees are built without namespace: xmlfile writes them into the
+ids element, where they inherit its default IDS namespace, instead of redeclaring it on every specification. Validation against the IDS schema is optional and uses a compiled schema that is cached per thread.
+'''
+import io
+import os
+import threading
+import xmlschema
+from ifctester import ids, facet
+from lxml import etree
+
+IDS_NAMESPACE = 'http://standards.buildingsmart.org/IDS'
+XS_NAMESPACE = 'http://www.w3.org/2001/XMLSchema'
+XSI_NAMESPACE = 'http://www.w3.org/2001/XMLSchema-instance'
+SCHEMA_LOCATION = 'http://standards.buildingsmart.org/IDS http://standards.buildingsmart.org/IDS/1.0/ids.xsd'
+IDS_XSD_PATH = os.path.join(os.path.dirname(ids.__file__), 'ids.xsd')
+XMLSCHEMA_SCHEMAS_PATH = os.path.join(os.path.dirname(xmlschema.__file__), 'schemas')
+#Local copies of the schemas imported by ids.xsd (and XMLSchema.xsd)
+LOCAL_SCHEMAS = {
+    'http://www.w3.org/2001/XMLSchema.xsd': os.path.join(XMLSCHEMA_SCHEMAS_PATH, 'XSD_1.0', 'XMLSchema.xsd'),
+    'http://www.w3.org/2001/xml.xsd': os.path.join(XMLSCHEMA_SCHEMAS_PATH, 'XML', 'xml_minimal.xsd'),
+}
+INDENT = '    '
+
+INFO_ELEMENTS = ['title', 'copyright', 'version', 'description', 'author', 'date', 'purpose', 'milestone']
+#Facet types in the order required by the IDS schema
+FACET_ELEMENTS = ['entity', 'partOf', 'classification', 'attribute', 'property', 'material']
+#Child elements and attributes of each facet type in the order of the IDS schema
+FACET_PARAMETERS = {
+    'Entity': (['name', 'predefinedType'], ['instructions']),
+    'PartOf': (['name', 'predefinedType'], ['relation', 'cardinality', 'instructions']),
+    'Classification': (['value', 'system'], ['uri', 'cardinality', 'instructions']),
+    'Attribute': (['name', 'value'], ['cardinality', 'instructions']),
+    'Property': (['propertySet', 'baseName', 'value'], ['dataType', 'uri', 'cardinality', 'instructions']),
+    'Material': (['value'], ['uri', 'cardinality', 'instructions']),
+}
+#Attributes that only exist on requirement facets (see ifctester's Facet.asdict)
+REQUIREMENT_ONLY_ATTRIBUTES = ['uri', 'cardinality', 'instructions']
+#Restriction constraints whose values are integers in the XML Schema schema (decoded as int by ids.open)
+INTEGER_CONSTRAINTS = ['length', 'minLength', 'maxLength', 'totalDigits', 'fractionDigits']
+
+def write_ids(output, my_ids, specifications=None, comment=None, validate=False):
+    '''Writes an IDS document in a single pass.
+
+    :param output: Path of the IDS file or binary file-like object
+    :type output: str or file-like object
+    :param my_ids: IDS object providing the info block (and the specifications if none are given)
+    :type my_ids: ids.Ids
+    :param specifications: Iterable of IDS specifications, e.g. a generator that creates them one by one (default: my_ids.specifications)
+    :type specifications: iterable
+    :param comment: Comment inserted as first child of the ids element, optional
+    :type comment: str
+    :param validate: Boolean specifying if the written document is validated against the IDS schema
+    :type validate: boolean
+    :return: Number of written specifications
+    :rtype: int
+    '''
+    if specifications is None:
+        specifications = my_ids.specifications
+    count = 0
+    with etree.xmlfile(output, encoding='utf-8', close=False) as xf:
+        xf.write_declaration()
+        with xf.element(ids_tag('ids'), {'{%s}schemaLocation' % XSI_NAMESPACE: SCHEMA_LOCATION},
+                        nsmap={None: IDS_NAMESPACE, 'xs': XS_NAMESPACE, 'xsi': XSI_NAMESPACE}):
+            if comment is not None:
+                xf.write('\n' + INDENT, etree.Comment(comment))
+            xf.write('\n' + INDENT, indented(info_element(my_ids.info), 1))
+            xf.write('\n' + INDENT)
+            with xf.element(ids_tag('specifications')):
+                for specification in specifications:
+                    xf.write('\n' + INDENT * 2, indented(specification_element(specification), 2))
+                    count += 1
+                xf.write('\n' + INDENT)
+            xf.write('\n')
+    if validate:
+        validate_ids(output)
+    return count
+
+def validate_ids(source):
+    '''Validates an IDS document against the compiled IDS schema (see get_ids_schema).
+
+    :param source: Path of the IDS file, binary file-like object or IDS content
+    :type source: str or file-like object or bytes
+    :return: None
+    '''
+    if isinstance(source, (bytes, bytearray)):
+        document = etree.fromstring(bytes(source))
+    elif hasattr(source, 'getvalue'):
+        document = etree.fromstring(source.getvalue())
+    else:
+        document = etree.parse(source)
+    schema = get_ids_schema()
+    if not schema.validate(document):
+        raise Exception('The IDS document does not match the IDS schema: ' + str(schema.error_log.last_error))
+
+#Compiled IDS schema of each thread (see get_ids_schema)
+thread_schemas = threading.local()
+
+def get_ids_schema():
+    '''Returns the compiled IDS schema of the current thread, it is compiled once per thread.
+    A compiled schema keeps the error log of its last validation, so threads that validate concurrently need their own schema.
+
+    :return: Compiled IDS schema
+    :rtype: etree.XMLSchema
+    '''
+    schema = getattr(thread_schemas, 'schema', None)
+    if schema is None:
+        schema = thread_schemas.schema = compile_ids_schema()
+    return schema
+
+def compile_ids_schema():
+    '''Compiles the IDS schema of ifctester.
+
+    The XML Schema schema that ids.xsd imports for xs:restriction and xs:occurs is loaded from the local copy of
+    xmlschema (see LocalSchemaResolver), so restriction contents are validated like by ids.open without network access.
+    The XMLSchema-instance import is removed, libxml2 declares that namespace itself.
+
+    :return: Compiled IDS schema
+    :rtype: etree.XMLSchema
+    '''
+    parser = etree.XMLParser(no_network=True)
+    parser.resolvers.add(LocalSchemaResolver())
+    xsd = etree.parse(IDS_XSD_PATH, parser)
+    root = xsd.getroot()
+    for schema_import in root.findall(xs_tag('import')):
+        if schema_import.get('namespace') == XSI_NAMESPACE:
+            root.remove(schema_import)
+    return etree.XMLSchema(xsd)
+
+class LocalSchemaResolver(etree.Resolver):
+    '''Resolves the W3C schemas imported by ids.xsd to the copies shipped with xmlschema.'''
+
+    def resolve(self, url, pubid, context):
+        if url in LOCAL_SCHEMAS:
+            return self.resolve_filename(LOCAL_SCHEMAS[url], context)
+        return None
+
+def ids_tag(name):
+    return '{%s}%s' % (IDS_NAMESPACE, name)
+
+def xs_element(parent, name, attributes):
+    '''Creates an element of the XML Schema namespace that declares the xs prefix itself.'''
+    return etree.SubElement(parent, xs_tag(name), attributes, nsmap={'xs': XS_NAMESPACE})
+
+def xs_tag(name):
+    return '{%s}%s' % (XS_NAMESPACE, name)
+
+def indented(element, level):
+    '''Indents the element like the previous xmlschema output for the given nesting level.'''
+    etree.indent(element, space=INDENT, level=level)
+    return element
+
+def info_element(info):
+    '''Creates the info element from the info dictionary of an IDS object.'''
+    element = etree.Element('info')
+    for name in INFO_ELEMENTS:
+        if name in info:
+            etree.SubElement(element, name).text = str(info[name])
+    return element
+
+def specification_element(specification):
+    '''Creates the specification element of an IDS specification (see ifctester's Specification.asdict).
+
+    :param specification: IDS specification
+    :type specification: ids.Specification
+    :return: Specification element
+    :rtype: etree.Element
+    '''
+    ifc_version = specification.ifcVersion
+    attributes = {'name': specification.name,
+                  'ifcVersion': ' '.join(ifc_version) if isinstance(ifc_version, (list, tuple)) else str(ifc_version)}
+    for name in ['identifier', 'description', 'instructions']:
+        value = getattr(specification, name)
+        if value is not None:
+            attributes[name] = str(value)
+    element = etree.Element('specification', attributes)
+
+    applicability = etree.SubElement(element, 'applicability')
+    #Like Specification.asdict, the occurrence is only written for a non-empty applicability
+    if specification.applicability:
+        for name in ['minOccurs', 'maxOccurs']:
+            value = getattr(specification, name)
+            if value is not None:
+                applicability.set(name, str(value))
+    append_facet_elements(applicability, specification.applicability, 'applicability')
+    append_facet_elements(etree.SubElement(element, 'requirements'), specification.requirements, 'requirements')
+    return element
+
+def append_facet_elements(clause_element, facets, clause_type):
+    '''Appends the elements of the facets to the applicability or requirements element, grouped by facet type.'''
+    facets_by_type = {}
+    for facet in facets:
+        facet_type = type(facet).__name__
+        facets_by_type.setdefault(facet_type[0].lower() + facet_type[1:], []).append(facet)
+    for facet_type in FACET_ELEMENTS:
+        for facet in facets_by_type.get(facet_type, []):
+            clause_element.append(facet_element(facet, facet_type, clause_type))
+
+def facet_element(facet, facet_type, clause_type):
+    '''Creates the element of an IDS facet (see ifctester's Facet.asdict).
+
+    :param facet: IDS facet
+    :type facet: ifctester facet
+    :param facet_type: Element name of the facet
+    :type facet_type: str
+    :param clause_type: 'applicability' or 'requirements'
+    :type clause_type: str
+    :return: Facet element
+    :rtype: etree.Element
+    '''
+    child_names, attribute_names = FACET_PARAMETERS[type(facet).__name__]
+    element = etree.Element(facet_type)
+    for name in attribute_names:
+        if clause_type == 'applicability' and name in REQUIREMENT_ONLY_ATTRIBUTES: continue
+        value = getattr(facet, name)
+        if value is not None:
+            element.set(name, value.upper() if name == 'dataType' else str(value))
+    #The entity of a PartOf facet is nested in an entity element
+    parent = element
+    if facet_type == 'partOf' and (facet.name is not None or facet.predefinedType is not None):
+        parent = etree.SubElement(element, 'entity')
+    for name in child_names:
+        value = getattr(facet, name)
+        if value is not None:
+            append_ids_value(etree.SubElement(parent, name), value)
+    return element
+
+def append_ids_value(element, value):
+    '''Appends a simple value or restriction to a facet parameter element (see ifctester's Facet.to_ids_value).'''
+    if isinstance(value, (int, float, str)):
+        etree.SubElement(element, 'simpleValue').text = str(value)
+    elif isinstance(value, ids.Restriction):
+        append_restriction(element, value.base, [value])
+    elif isinstance(value, list):
+        append_restriction(element, value[0].base, value)
+    else:
+        raise Exception(str(value) + " was not able to be converted into 'Parameter_dict'")
+
+def append_restriction(element, base, restrictions):
+    '''Appends an xs:restriction element with the options of the given restrictions.'''
+    restriction_element = xs_element(element, 'restriction', {'base': 'xs:' + base})
+    for restriction in restrictions:
+        for constraint, values in restriction.options.items():
+            for value in values if isinstance(values, list) else [values]:
+                etree.SubElement(restriction_element, xs_tag(constraint), value=str(value))
+
+def ids_to_bytes(my_ids, specifications=None, comment=None, validate=False):
+    '''Writes an IDS document into memory (see write_ids).
+
+    :return: Content of the IDS file and number of written specifications
+    :rtype: tuple
+    '''
+    buffer = io.BytesIO()
+    count = write_ids(buffer, my_ids, specifications, comment, validate)
+    return buffer.getvalue(), count
+
+def open_ids(source, validate=True):
+    '''Opens an IDS document like ifctester's ids.open, but parses it with lxml and creates the specifications directly.
+
+    :param source: Path of the IDS file, binary file-like object or IDS content
+    :type source: str or file-like object or bytes
+    :param validate: Boolean specifying if the document is validated against the IDS schema
+    :type validate: boolean
+    :return: IDS object
+    :rtype: ids.Ids
+    '''
+    parser = etree.XMLParser(remove_comments=True, resolve_entities=False, no_network=True, huge_tree=True)
+    if isinstance(source, (bytes, bytearray)):
+        root = etree.fromstring(bytes(source), parser)
+    else:
+        root = etree.parse(source, parser).getroot()
+    if validate:
+        schema = get_ids_schema()
+        if not schema.validate(root):
+            raise Exception('The IDS document does not match the IDS schema: ' + str(schema.error_log.last_error))
+    if root.tag != ids_tag('ids'):
+        raise Exception('The document is not an IDS document (root element: ' + str(root.tag) + ')')
+
+    my_ids = ids.Ids()
+    info = root.find(ids_tag('info'))
+    for name in INFO_ELEMENTS:
+        value = info.findtext(ids_tag(name)) if info is not None else None
+        if value:
+            my_ids.info[name] = value
+    specifications = root.find(ids_tag('specifications'))
+    if specifications is not None:
+        for element in specifications.iterchildren(ids_tag('specification')):
+            my_ids.specifications.append(parse_specification(element))
+    return my_ids
+
+def local_name(element):
+    '''Returns the tag of the element without namespace.'''
+    tag = element.tag
+    return tag[tag.index('}') + 1:] if tag[0] == '{' else tag
+
+def parse_specification(element):
+    '''Creates an IDS specification from a specification element (see ifctester's Specification.parse).'''
+    specification = ids.Specification()
+    specification.name = element.get('name', '')
+    specification.description = element.get('description', '')
+    specification.instructions = element.get('instructions', '')
+    specification.ifcVersion = element.get('ifcVersion', '').split()
+    applicability = element.find(ids_tag('applicability'))
+    if applicability is None:
+        specification.minOccurs = 0
+        specification.maxOccurs = 'unbounded'
+        specification.applicability = []
+    else:
+        #Like ids.open, missing occurrence attributes get the defaults of xs:occurs
+        specification.minOccurs = int(applicability.get('minOccurs', 1))
+        max_occurs = applicability.get('maxOccurs', '1')
+        specification.maxOccurs = max_occurs if max_occurs == 'unbounded' else int(max_occurs)
+        specification.applicability = parse_clause(applicability)
+    requirements = element.find(ids_tag('requirements'))
+    specification.requirements = parse_clause(requirements) if requirements is not None else []
+    return specification
+
+def parse_clause(clause_element):
+    '''Creates the IDS facets of an applicability or requirements element.'''
+    facets = []
+    for element in clause_element.iterchildren(etree.Element):
+        facet_type = local_name(element)
+        if facet_type not in FACET_ELEMENTS: continue
+        facets.append(parse_facet(getattr(facet, facet_type[0].upper() + facet_type[1:])(), element))
+    return facets
+
+def parse_facet(ids_facet, element):
+    '''Sets the parameters of an IDS facet from a facet element (see ifctester's Facet.parse).
+
+    :param ids_facet: New IDS facet with default parameters
+    :type ids_facet: ifctester facet
+    :param element: Facet element
+    :type element: etree.Element
+    :return: IDS facet
+    :rtype: ifctester facet
+    '''
+    ids_facet.cardinality = 'required'
+    for name, value in element.attrib.items():
+        setattr(ids_facet, name, value)
+    for child in element.iterchildren(etree.Element):
+        name = local_name(child)
+        #The entity of a PartOf facet is nested in an entity element
+        if name == 'entity' and isinstance(ids_facet, facet.PartOf):
+            parse_facet_values(ids_facet, child)
+        else:
+            setattr(ids_facet, name, parse_ids_value(child))
+    return ids_facet
+
+def parse_facet_values(ids_facet, element):
+    '''Sets the parameters of the child elements of the element (e.g. name and predefinedType) on the IDS facet.'''
+    for child in element.iterchildren(etree.Element):
+        setattr(ids_facet, local_name(child), parse_ids_value(child))
+
+def parse_ids_value(element):
+    '''Returns the simple value or restriction of a facet parameter element (see ifctester's Facet.parse).'''
+    for child in element.iterchildren(etree.Element):
+        if child.tag == ids_tag('simpleValue'):
+            return child.text or None
+        if child.tag == xs_tag('restriction'):
+            return parse_restriction(child)
+    return None
+
+def parse_restriction(element):
+    '''Creates an IDS restriction from an xs:restriction element (see ifctester's Restriction.parse).'''
+    restriction = ids.Restriction()
+    restriction.base = element.get('base', 'xs:string')[3:]
+    values = {}
+    for child in element.iterchildren(etree.Element):
+        constraint = local_name(child)
+        if constraint == 'annotation': continue
+        value = child.get('value')
+        if constraint in INTEGER_CONSTRAINTS: value = int(value)
+        values.setdefault(constraint, []).append(value)
+    for constraint, constraint_values in values.items():
+        #Like Restriction.parse, only enumerations and repeated constraints are stored as lists
+        restriction.options[constraint] = constraint_values if constraint == 'enumeration' or len(constraint_values) > 1 else constraint_values[0]
+    return restriction
@@ -0,0 +1,154 @@
+'''Incremental re-conversion of edited workbooks.
+
+An IncrementalState keeps the intermediate results of the previous conversion of a workbook by content hashes:
+the expansion of each merged data row (see expand_row), the specification merged for each merge key
+(see merge_row_expansions) and the results of each group of specifications structured by structure_specs_list_by_Ifc_versions
+or compared by add_values_to_general_specs.
+When the edited workbook is converted with this state, only added or changed rows, the specifications they contribute to
+and the affected groups are processed again. Unchanged results are reused, so the output equals a full conversion.
+Results that are not used by a conversion are dropped from the state, so it only refers to the latest version of the workbook.
+'''
+import os
+import hmac
+import pickle
+import hashlib
+import tempfile
+
+STATE_CACHES = ('rows', 'specs', 'ifc_version_groups', 'groups')
+#Length of the HMAC-SHA256 signature in front of the pickled state of a signed state file
+SIGNATURE_SIZE = hashlib.sha256().digest_size
+
+def content_key(value):
+    '''Creates a compact key of the content of a value from its representation.
+    Unlike hash(), the key is equal in all processes, so it can be stored with the state.
+
+    :param value: Value consisting of tuples, lists, dictionaries, facets and single values
+    :type value: object
+    :return: Content key
+    :rtype: bytes
+    '''
+    return hashlib.blake2b(repr(value).encode('utf-8'), digest_size=16).digest()
+
+class IncrementalState:
+    '''Results of the previous conversion of a workbook by their content keys.
+
+    The results are only valid for the converter version and the conversion settings (columns, file separators,
+    applicability options) they were created with. If one of them changes, all results are discarded.
+    '''
+
+    def __init__(self, version):
+        '''
+        :param version: Version of the converter that creates the results
+        :type version: str
+        '''
+        self.version = version
+        self.settings = None
+        self.caches = {cache: {} for cache in STATE_CACHES}
+        self.used = None
+        self.reprocessed = {cache: 0 for cache in STATE_CACHES}
+
+    def start(self, settings):
+        '''Starts a conversion with the given settings. Discards all results if the settings differ from the previous conversion.
+
+        :param settings: Hashable conversion settings
+        :type settings: tuple
+        '''
+        if settings != self.settings:
+            self.settings = settings
+            self.caches = {cache: {} for cache in STATE_CACHES}
+        self.used = {cache: {} for cache in STATE_CACHES}
+        self.reprocessed = {cache: 0 for cache in STATE_CACHES}
+
+    def memo(self, cache, key, compute):
+        '''Returns the result stored for the key by the previous conversion, or computes and stores it.
+
+        :param cache: Name of the cache (see STATE_CACHES)
+        :type cache: str
+        :param key: Content key of the input of the result (see content_key)
+        :type key: bytes
+        :param compute: Function computing the result. Results must not be altered after they are stored
+        :type compute: function
+        :return: Result
+        :rtype: object
+        '''
+        used = self.used[cache]
+        if key in used:
+            return used[key]
+        previous = self.caches[cache]
+        if key in previous:
+            value = previous[key]
+        else:
+            value = compute()
+            self.reprocessed[cache] += 1
+        used[key] = value
+        return value
+
+    def finish(self):
+        '''Finishes a conversion and keeps only the results used by it for the next conversion.'''
+        self.caches = self.used
+        self.used = None
+
+def sign_state(data, key):
+    '''Returns the HMAC-SHA256 signature of the pickled state.'''
+    return hmac.new(key, data, hashlib.sha256).digest()
+
+def load_state(path, version, key=None):
+    '''Loads the state of the previous conversion from a file.
+    Returns an empty state if the file does not exist, cannot be read or was created by another converter version.
+
+    With a key, the file must start with the HMAC-SHA256 signature of the pickled state (see save_state). The signature is
+    verified before the state is unpickled, so a state file that was not written with the key is ignored and never unpickled.
+
+    :param path: Path of the state file, None for an empty state
+    :type path: str
+    :param version: Version of the converter
+    :type version: str
+    :param key: Secret key of the signature, optional
+    :type key: bytes
+    :return: Incremental state
+    :rtype: IncrementalState
+    '''
+    if path is None:
+        return IncrementalState(version)
+    try:
+        with open(path, 'rb') as f:
+            data = f.read()
+        if key is not None:
+            signature, data = data[:SIGNATURE_SIZE], data[SIGNATURE_SIZE:]
+            if not hmac.compare_digest(signature, sign_state(data, key)):
+                raise Exception('invalid signature')
+        state = pickle.loads(data)
+    except FileNotFoundError:
+        return IncrementalState(version)
+    except Exception as error:
+        print('Incremental state ignored: ', error)
+        return IncrementalState(version)
+    if not isinstance(state, IncrementalState) or state.version != version:
+        return IncrementalState(version)
+    return state
+
+def save_state(state, path, key=None):
+    '''Saves the state of a finished conversion to a file.
+    The file is replaced at once, so that a concurrent conversion never reads a partially written state.
+
+    :param state: Incremental state
+    :type state: IncrementalState
+    :param path: Path of the state file
+    :type path: str
+    :param key: Secret key of the signature written in front of the pickled state (see load_state), optional
+    :type key: bytes
+    :return: None
+    '''
+    data = pickle.dumps(state, protocol=pickle.HIGHEST_PROTOCOL)
+    if key is not None:
+        data = sign_state(data, key) + data
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, temporary_path = tempfile.mkstemp(prefix='.state-', dir=directory)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(temporary_path, path)
+    except BaseException:
+        os.unlink(temporary_path)
+        raise
@@ -0,0 +1,164 @@
+'''Specification model of the IDS4ALL converter.
+
+Facets, general data and specification data are stored as immutable Facet objects with tuples of interned
+values, and each specification as a Spec object. Previously they were nested dictionaries of lists that had
+to be deep-copied before they could be shared and were merged with deepmerge.
+Since facets are never altered, they can be shared between specifications and merging creates a new facet.
+'''
+import sys
+from collections.abc import Mapping
+
+def intern_value(value):
+    '''Interns strings, so that equal values of all facets share one string object. Other values are returned unchanged.'''
+    return sys.intern(value) if type(value) is str else value
+
+def freeze_values(values):
+    '''Converts a list of values into a tuple of interned values. Single values are interned only.
+
+    :param values: List of values or single value
+    :type values: list, tuple, str, int, float or bool
+    :return: Tuple of values or single value
+    :rtype: tuple, str, int, float or bool
+    '''
+    if isinstance(values, (list, tuple)):
+        return tuple(intern_value(value) for value in values)
+    return intern_value(values)
+
+class Facet(Mapping):
+    '''Immutable mapping of facet parameters to tuples of values (key: (value, value, value)).
+
+    Behaves like a read-only dictionary that keeps the order of its keys. Two facets are equal if they contain the
+    same keys with equal values, regardless of the key order. Facets are hashable, the hash is computed once.
+    '''
+    __slots__ = ('_keys', '_values', '_hash')
+
+    def __init__(self, items=()):
+        '''
+        :param items: Dictionary or (key, values) pairs of the facet
+        :type items: dict or Facet or iterable
+        '''
+        if isinstance(items, Mapping):
+            items = items.items()
+        keys = []
+        values = []
+        for key, value in items:
+            keys.append(intern_value(key))
+            values.append(freeze_values(value))
+        self._keys = tuple(keys)
+        self._values = tuple(values)
+        self._hash = None
+
+    def __getitem__(self, key):
+        try:
+            return self._values[self._keys.index(key)]
+        except ValueError:
+            raise KeyError(key) from None
+
+    def __contains__(self, key):
+        return key in self._keys
+
+    def __iter__(self):
+        return iter(self._keys)
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __eq__(self, other):
+        if not isinstance(other, Facet):
+            return NotImplemented
+        if self._keys == other._keys:
+            return self._values == other._values
+        return len(self._keys) == len(other._keys) and hash(self) == hash(other) and dict(zip(self._keys, self._values)) == dict(zip(other._keys, other._values))
+
+    def __hash__(self):
+        if self._hash is None:
+            self._hash = hash(frozenset(zip(self._keys, self._values)))
+        return self._hash
+
+    def __repr__(self):
+        return 'Facet(' + repr(dict(zip(self._keys, self._values))) + ')'
+
+    def __reduce__(self):
+        #Pickled as (key, values) pairs without the cached hash, which differs between processes.
+        #Values are interned again when unpickled.
+        return (Facet, (tuple(zip(self._keys, self._values)),))
+
+    def replace(self, key, values):
+        '''Returns a copy of the facet in which the values of the given key are replaced (or added).
+
+        :param key: Facet parameter
+        :type key: str
+        :param values: New values of the parameter
+        :type values: list or tuple
+        :return: New facet
+        :rtype: Facet
+        '''
+        items = [(k, values if k == key else v) for k, v in zip(self._keys, self._values)]
+        if key not in self._keys:
+            items.append((key, values))
+        return Facet(items)
+
+    def merge(self, other):
+        '''Returns a new facet containing the parameters of both facets.
+        Values of parameters that exist in both facets are appended without duplicates, like deepmerge's append_unique strategy.
+
+        :param other: Facet that is merged into this facet
+        :type other: Facet
+        :return: Merged facet (this facet if nothing is added)
+        :rtype: Facet
+        '''
+        items = dict(zip(self._keys, self._values))
+        changed = False
+        for key, values in other.items():
+            if key not in items:
+                items[key] = values
+                changed = True
+            elif isinstance(items[key], tuple) and isinstance(values, tuple):
+                base_values = set(items[key])
+                new_values = tuple(value for value in values if value not in base_values)
+                if new_values:
+                    items[key] = items[key] + new_values
+                    changed = True
+            elif items[key] != values:
+                items[key] = values
+                changed = True
+        return Facet(items) if changed else self
+
+    def asdict(self):
+        '''Returns the facet as dictionary of lists (key = [value, value, value]).'''
+        return {key: list(values) if isinstance(values, tuple) else values for key, values in zip(self._keys, self._values)}
+
+class Spec:
+    '''Specification with applicability, requirements, general data and specification data.
+
+    The applicability is a tuple of facets and does not change after the specification is created.
+    The requirements are a list of facets, merging a requirement replaces its facet in the list.
+    '''
+    __slots__ = ('app', 'req', 'general', 'spec')
+
+    def __init__(self, app, req, general, spec):
+        '''
+        :param app: Facets of the applicability
+        :type app: tuple
+        :param req: Facets of the requirements
+        :type req: list
+        :param general: General data (Phase, Role, Usecase)
+        :type general: Facet
+        :param spec: Specification data (SpecificationCardinality, SpecificationIfcVersion, SpecificationName)
+        :type spec: Facet
+        '''
+        self.app = app
+        self.req = req
+        self.general = general
+        self.spec = spec
+
+    def __reduce__(self):
+        return (Spec, (self.app, self.req, self.general, self.spec))
+
+    def __repr__(self):
+        return 'Spec(app=' + repr(self.app) + ', req=' + repr(self.req) + ', general=' + repr(self.general) + ', spec=' + repr(self.spec) + ')'
+
+    def asdict(self):
+        '''Returns the specification as nested dictionaries and lists ({'app': [...], 'req': [...], 'general': {...}, 'spec': {...}}).'''
+        return {'app': [facet.asdict() for facet in self.app], 'req': [facet.asdict() for facet in self.req],
+                'general': self.general.asdict(), 'spec': self.spec.asdict()}
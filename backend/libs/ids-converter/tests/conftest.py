@@ -0,0 +1,5 @@
+'''The converter modules are imported from the converter directory like in IDS4ALL-main.py and the backend tasks.'''
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,49 @@
+'''Tests of the per-row expansion of applicability combinations ('OR' values) in excel_to_spec_list.'''
+import pandas as pd
+import pytest
+import ids4all
+from custom_functions import count_combinations, generate_combinations
+
+#Rows of the Specifications sheet, the second row (Excel row 3) expands into 3 x 2 combinations
+ROWS = [
+    {'A.Entity': 'IFCWALL', 'R.PropertySet': 'Pset_A', 'R.Property': 'P1'},
+    {'A.Entity': 'IFCWALL|IFCSLAB|IFCBEAM', 'A.Material': 'Concrete|Steel', 'R.PropertySet': 'Pset_A', 'R.Property': 'P2'},
+    {'A.Entity': 'IFCDOOR', 'R.PropertySet': 'Pset_A', 'R.Property': 'P3'},
+]
+
+@pytest.fixture
+def workbook_path(tmp_path):
+    path = str(tmp_path / 'combinations.xlsx')
+    metadata = [['Entry', 'Value'], ['Sheet name', 'Specifications'], ['Skipped rows', 0], ['Title', 'Combinations'], ['IFC version', 'IFC4']]
+    with pd.ExcelWriter(path, engine='openpyxl') as writer:
+        pd.DataFrame(metadata).to_excel(writer, sheet_name='IDS4ALL', header=False, index=False)
+        pd.DataFrame(ROWS).to_excel(writer, sheet_name='Specifications', index=False)
+    return path
+
+def process(workbook_path, max_combinations, diagnostics=None):
+    with ids4all.open_excel_source(workbook_path) as workbook:
+        sheet_name, ifc_version, separate_by, skipped_rows, is_entity_based_app, data_dict = ids4all.get_metadata(workbook)
+        return ids4all.process_excel_data(workbook, sheet_name, separate_by, skipped_rows, ifc_version, is_entity_based_app, max_combinations, diagnostics)
+
+def test_count_matches_generated_combinations():
+    data = [{'Entity': ['IFCWALL', 'IFCSLAB', 'IFCBEAM']}, {'Material': ['Concrete', 'Steel'], 'MaterialUri': None}, {'PropertySet': ['Pset_A']}]
+    combinations = list(generate_combinations(data))
+    assert count_combinations(data) == len(combinations) == 6
+    assert len({repr(combination) for combination in combinations}) == 6
+
+def test_expansion_diagnostics(workbook_path):
+    diagnostics = {}
+    process(workbook_path, 6, diagnostics)
+    assert diagnostics['rows'] == 3
+    assert diagnostics['combinations'] == 8
+    assert diagnostics['max_combinations_per_row'] == 6
+    assert diagnostics['expanded_rows'] == {3: 6}
+
+def test_expansion_limit_reports_excel_row(workbook_path):
+    with pytest.raises(Exception, match=r'^Row 3: The applicability expands into 6 combinations .* limit of 5 combinations per row'):
+        process(workbook_path, 5)
+
+def test_preview_collects_expansion_limit_error(workbook_path):
+    preview = ids4all.preview_excel_to_ids(workbook_path, 'combinations', 5)
+    assert [row_error['row'] for row_error in preview['row_errors']] == [3]
+    assert preview['rows'] == 3
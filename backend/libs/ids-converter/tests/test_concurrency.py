@@ -0,0 +1,42 @@
+'''Concurrent conversions in the threads of one process (see ConversionContext).'''
+import os
+from concurrent.futures import ThreadPoolExecutor
+import benchmark
+import ids4all
+
+SAMPLE_WORKBOOK_PATH = os.path.join(os.path.dirname(__file__), '..', '..', '..', '..', 'sample', 'test.xlsx')
+THREADS = 8
+
+def convert(excel_name):
+    diagnostics = {}
+    documents = ids4all.convert_excel_to_ids(SAMPLE_WORKBOOK_PATH, excel_name, diagnostics=diagnostics, validate=True)
+    return documents, diagnostics
+
+def test_concurrent_conversions_are_isolated_and_identical():
+    expected_documents, expected_diagnostics = convert('test')
+    with ThreadPoolExecutor(max_workers=THREADS) as executor:
+        results = list(executor.map(convert, ['test'] * THREADS + ['other'] * THREADS))
+
+    for documents, diagnostics in results[:THREADS]:
+        assert documents == expected_documents
+        assert diagnostics['counters'] == expected_diagnostics['counters']
+    #Conversions of another workbook name only differ in the file names
+    for documents, diagnostics in results[THREADS:]:
+        assert [document['filename'] for document in documents] == ['other' + document['filename'][len('test'):] for document in expected_documents]
+        assert [document['content'] for document in documents] == [document['content'] for document in expected_documents]
+        assert diagnostics['counters'] == expected_diagnostics['counters']
+
+def test_concurrent_conversions_keep_their_property_descriptions(tmp_path):
+    #The property descriptions differ between the seeds and are collected in the context of each conversion
+    paths = []
+    for seed in range(2):
+        path = str(tmp_path / f'workbook{seed}.xlsx')
+        benchmark.generate_workbook(path, 100, seed=seed, property_count=20, descriptions=True)
+        paths.append(path)
+    expected = [ids4all.convert_excel_to_ids(path, 'workbook') for path in paths]
+    assert expected[0] != expected[1]
+
+    with ThreadPoolExecutor(max_workers=THREADS) as executor:
+        results = list(executor.map(lambda path: ids4all.convert_excel_to_ids(path, 'workbook'), paths * THREADS))
+    for number, documents in enumerate(results):
+        assert documents == expected[number % 2]
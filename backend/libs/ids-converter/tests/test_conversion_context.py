@@ -0,0 +1,69 @@
+'''Tests of the stage times and counters of a conversion (see ConversionContext).'''
+import os
+import pytest
+import conversion_context
+import ids4all
+from conversion_context import ConversionContext
+
+SAMPLE_WORKBOOK_PATH = os.path.join(os.path.dirname(__file__), '..', '..', '..', '..', 'sample', 'test.xlsx')
+
+@pytest.fixture
+def clock(monkeypatch):
+    #time.perf_counter returns the given times one after another
+    def set_times(*times):
+        monkeypatch.setattr(conversion_context.time, 'perf_counter', iter(times).__next__)
+    return set_times
+
+def test_stages_follow_each_other(clock):
+    clock(0.0, 1.0, 1.0, 3.0)
+    context = ConversionContext()
+    context.start_stage('read_excel')
+    context.start_stage('merge_specs')
+    context.end_stage()
+    context.end_stage()
+    assert context.current_stage is None
+    assert context.statistics() == {'stages': {'read_excel': 1.0, 'merge_specs': 2.0}, 'counters': {}}
+
+def test_stage_times_with_same_name_are_added_up(clock):
+    clock(0.0, 1.0, 1.0, 3.0, 3.0, 6.0)
+    context = ConversionContext()
+    context.start_stage('write_xml')
+    context.start_stage('other')
+    context.start_stage('write_xml')
+    context.end_stage()
+    assert list(context.statistics()['stages'].items()) == [('write_xml', 4.0), ('other', 2.0)]
+
+def test_counters():
+    context = ConversionContext()
+    context.count('rows', 0)
+    context.count('merges')
+    context.count('merges', 3)
+    assert context.statistics()['counters'] == {'rows': 0, 'merges': 4}
+
+def test_worker_statistics_are_added_separately(clock):
+    clock(0.0, 1.0)
+    context = ConversionContext()
+    context.count('ids_files')
+    context.start_stage('write_ids_files')
+    context.add_worker_statistics({'stages': {'write_xml': 0.25}, 'counters': {'deepdiff_calls': 2}})
+    context.add_worker_statistics({'stages': {'write_xml': 0.5}, 'counters': {'deepdiff_calls': 1, 'ids_files': 1}})
+    context.end_stage()
+    assert context.statistics() == {'stages': {'write_ids_files': 1.0}, 'counters': {'ids_files': 2, 'deepdiff_calls': 3}, 'worker_stages': {'write_xml': 0.75}}
+
+def test_statistics_are_a_copy():
+    context = ConversionContext()
+    context.count('rows')
+    context.statistics()['counters']['rows'] = 10
+    assert context.statistics()['counters'] == {'rows': 1}
+
+def test_conversion_reports_stages_and_counters():
+    diagnostics = {}
+    documents = ids4all.convert_excel_to_ids(SAMPLE_WORKBOOK_PATH, 'test', diagnostics=diagnostics)
+    assert list(diagnostics['stages']) == ['read_excel', 'groupby', 'row_dicts', 'expand_rows', 'merge_specs', 'ifc_versions', 'add_values_to_general_specs', 'write_xml', 'create_specifications']
+    assert all(seconds >= 0 for seconds in diagnostics['stages'].values())
+    assert 'worker_stages' not in diagnostics
+    counters = diagnostics['counters']
+    assert counters['rows'] == diagnostics['rows']
+    assert counters['specs'] == sum(document['specification_count'] for document in documents)
+    assert counters['ids_files'] == len(documents)
+    assert counters['merges'] >= 0 and counters['deepdiff_calls'] >= 0
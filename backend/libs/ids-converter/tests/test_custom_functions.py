@@ -0,0 +1,49 @@
+'''Regression tests of add_values_to_general_specs.
+
+Pairs of specifications are partly decided without DeepDiff, so these tests fix which requirements are merged
+for pairs that are decided by facet containment, by the DeepDiff cutoff and by DeepDiff itself.
+'''
+from deepdiff.diff import CUTOFF_INTERSECTION_FOR_PAIRS_DEFAULT
+import custom_functions
+from conversion_context import ConversionContext
+from spec_model import Facet, Spec
+
+WALL = Facet({'Entity': ('IFCWALL',)})
+SOLID_WALL = Facet({'Entity': ('IFCWALL',), 'PredefinedType': ('SOLIDWALL',)})
+PROPERTY_Q = Facet({'PropertySet': ('Pset_B',), 'Property': ('Q',)})
+PROPERTY_R = Facet({'PropertySet': ('Pset_B',), 'Property': ('R',)})
+
+def requirement(value):
+    return Facet({'PropertySet': ('Pset_A',), 'Property': ('P',), 'PropertyValue': (value,)})
+
+def merge_pair(app_general, app_specific):
+    '''Runs add_values_to_general_specs on a general and a specific specification.
+
+    :return: Requirements of the general specification and counters of the conversion
+    :rtype: tuple
+    '''
+    general = Facet()
+    spec = Facet({'SpecificationIfcVersion': ('IFC4',)})
+    specs_list = [Spec(app_general, [requirement('1')], general, spec), Spec(app_specific, [requirement('2')], general, spec)]
+    context = ConversionContext()
+    custom_functions.add_values_to_general_specs(specs_list, [], context)
+    return specs_list[0].req, context.counters
+
+def test_cutoff_matches_pinned_deepdiff():
+    assert custom_functions.DEEPDIFF_CUTOFF_INTERSECTION_FOR_PAIRS == CUTOFF_INTERSECTION_FOR_PAIRS_DEFAULT
+
+def test_contained_facets_are_merged_without_deepdiff():
+    req, counters = merge_pair((WALL,), (WALL, PROPERTY_Q))
+    assert req == [requirement('1').merge(requirement('2'))]
+    assert counters == {'deepdiff_calls': 0, 'merges': 1}
+
+def test_unpaired_facets_are_not_merged():
+    #[{Entity}] vs [{Entity, PredefinedType}, {Property}]: DeepDiff reports a changed value instead of pairing the facets
+    req, counters = merge_pair((WALL,), (SOLID_WALL, PROPERTY_Q))
+    assert req == [requirement('1')]
+    assert counters == {'deepdiff_calls': 0, 'merges': 0}
+
+def test_paired_facets_are_merged_after_deepdiff():
+    req, counters = merge_pair((WALL, PROPERTY_Q), (SOLID_WALL, PROPERTY_Q, PROPERTY_R))
+    assert req == [requirement('1').merge(requirement('2'))]
+    assert counters == {'deepdiff_calls': 1, 'merges': 1}
@@ -0,0 +1,40 @@
+'''Tests of the IDS4ALL pipeline in ids4all.py.'''
+import os
+import pytest
+import benchmark
+import ids4all
+from conversion_context import ConversionContext
+
+@pytest.fixture
+def separated_workbook(tmp_path):
+    '''Processes a generated workbook with a Phase separator.
+
+    :return: Separated excel data, metadata of the IDS4ALL sheet, name of the IDS4ALL sheet and context of the conversion
+    :rtype: tuple
+    '''
+    path = str(tmp_path / 'separated.xlsx')
+    benchmark.generate_workbook(path, 200, separators=True)
+    context = ConversionContext()
+    with ids4all.open_excel_source(path) as workbook:
+        sheet_name, ifc_version, separate_by, skipped_rows, is_entity_based_app, data_dict = ids4all.get_metadata(workbook)
+        separated_excel_data = ids4all.process_excel_data(workbook, sheet_name, separate_by, skipped_rows, ifc_version, is_entity_based_app, context=context)
+    return separated_excel_data, data_dict, sheet_name, context
+
+@pytest.mark.parametrize('jobs', [1, 2])
+def test_create_ids_files_counts_written_files(tmp_path, separated_workbook, jobs):
+    separated_excel_data, data_dict, sheet_name, context = separated_workbook
+    assert len(separated_excel_data) > 2
+    output_path = tmp_path / 'out'
+    #A directory in place of the first IDS file makes writing it fail
+    first_key = next(iter(separated_excel_data))
+    os.makedirs(output_path / ids4all.ids_filename('separated', sheet_name, first_key))
+
+    ids4all.create_ids_files(separated_excel_data, data_dict, str(output_path), 'separated', sheet_name, jobs=jobs, context=context)
+    statistics = context.statistics()
+    assert statistics['counters']['ids_files'] == len(separated_excel_data) - 1
+    if jobs > 1:
+        assert set(statistics['worker_stages']) == {'create_specifications', 'write_xml'}
+        assert 'write_ids_files' in statistics['stages']
+    else:
+        assert 'worker_stages' not in statistics
+        assert 'write_xml' in statistics['stages']
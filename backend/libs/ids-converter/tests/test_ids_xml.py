@@ -0,0 +1,58 @@
+'''Tests of the lxml IDS reader against ifctester's ids.open.'''
+import os
+import pytest
+from ifctester import ids
+from lxml import etree
+import ids4all
+import ids_xml
+from custom_functions import iter_ids_specifications
+
+SAMPLE_IDS_PATH = os.path.join(os.path.dirname(__file__), '..', '..', '..', '..', 'sample', 'IDS_SimpleBIM_examples.ids')
+SAMPLE_WORKBOOK_PATH = os.path.join(os.path.dirname(__file__), '..', '..', '..', '..', 'sample', 'test.xlsx')
+#Attribute values that Ids.to_xml writes although they are the defaults of the IDS schema
+DEFAULT_ATTRIBUTES = {'cardinality': 'required', 'fixed': 'false'}
+
+def sample_with_restriction_content(content):
+    '''Returns the sample IDS document with the content inserted into its first xs:restriction element.'''
+    with open(SAMPLE_IDS_PATH, 'rb') as file:
+        source = file.read()
+    start = source.index(b'>', source.index(b'<xs:restriction')) + 1
+    return source[:start] + content + source[start:]
+
+@pytest.mark.parametrize('content', [b'', b'<xs:pattern value="[a-z]+"/>'])
+def test_valid_restrictions_are_accepted(content):
+    source = sample_with_restriction_content(content)
+    my_ids = ids_xml.open_ids(source)
+    assert len(my_ids.specifications) == len(ids.open(source.decode('utf-8')).specifications)
+
+@pytest.mark.parametrize('content', [b'<xs:bogus/>', b'<xs:enumeration/>', b'<xs:enumeration value="a" foo="b"/>', b'<xs:length value="abc"/>'])
+def test_invalid_restrictions_are_rejected(content):
+    source = sample_with_restriction_content(content)
+    with pytest.raises(Exception):
+        ids.open(source.decode('utf-8'))
+    with pytest.raises(Exception, match='does not match the IDS schema'):
+        ids_xml.open_ids(source)
+
+def canonical_ids(source):
+    '''Returns the canonical XML of an IDS document without whitespace, comments and attributes with default values.'''
+    document = etree.fromstring(source, etree.XMLParser(remove_blank_text=True, remove_comments=True))
+    for element in document.iter():
+        for name, value in DEFAULT_ATTRIBUTES.items():
+            if element.get(name) == value:
+                del element.attrib[name]
+    return etree.tostring(document, method='c14n')
+
+def test_write_ids_matches_to_xml(tmp_path):
+    with ids4all.open_excel_source(SAMPLE_WORKBOOK_PATH) as workbook:
+        sheet_name, ifc_version, separate_by, skipped_rows, is_entity_based_app, data_dict = ids4all.get_metadata(workbook)
+        separated_excel_data = ids4all.process_excel_data(workbook, sheet_name, separate_by, skipped_rows, ifc_version, is_entity_based_app)
+    assert separated_excel_data
+    for key, sep_data in separated_excel_data.items():
+        my_ids = ids4all.create_ids_info(sep_data, data_dict)
+        my_ids.specifications = list(iter_ids_specifications(sep_data['specs']))
+        content, count = ids_xml.ids_to_bytes(my_ids, comment=ids4all.ATTRIBUTION_COMMENT, validate=True)
+        assert count == len(my_ids.specifications) > 0
+
+        my_ids.to_xml(str(tmp_path / 'to_xml.ids'))
+        with open(tmp_path / 'to_xml.ids', 'rb') as file:
+            assert canonical_ids(content) == canonical_ids(file.read())
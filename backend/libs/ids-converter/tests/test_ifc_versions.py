@@ -0,0 +1,60 @@
+'''Tests of structuring specifications by their ifc versions (structure_specs_list_by_Ifc_versions).
+
+The specifications are grouped by applicability, file separator values and cardinality before their ifc versions are compared.
+The result is compared with the previous comparison of all pairs of the specification list.
+'''
+import random
+import pytest
+import custom_functions
+from spec_model import Facet, Spec
+
+IFC_VERSIONS = [('IFC4',), ('IFC4X3_ADD2',), ('IFC4', 'IFC4X3_ADD2'), ('IFC2X3', 'IFC4', 'IFC4X3_ADD2'), ('IFC2X3',)]
+
+def generate_specs(count, seed):
+    '''Generates specifications with few distinct applicabilities, so that many of them share their group.'''
+    rng = random.Random(seed)
+    specs_list = []
+    for _ in range(count):
+        app = (Facet({'Entity': (rng.choice(['IFCWALL', 'IFCSLAB', 'IFCDOOR']),)}),)
+        req = [Facet({'PropertySet': ('Pset_A',), 'Property': ('P' + str(rng.randrange(6)),), 'PropertyValue': (rng.choice('ABC'),)})]
+        general = Facet({'Phase': (rng.choice(['LP1', 'LP2']),), 'Role': (rng.choice(['Architect', 'Engineer']),)})
+        spec = {'SpecificationIfcVersion': rng.choice(IFC_VERSIONS)}
+        if rng.random() < 0.3:
+            spec['SpecificationCardinality'] = ('required',)
+        specs_list.append(Spec(app, req, general, Facet(spec)))
+    return specs_list
+
+def structure_all_pairs(specs_list, separate_by):
+    '''Structures the specifications by comparing all pairs of the list, like before the specifications were grouped.'''
+    for i in range(len(specs_list)):
+        for j in range(i+1, len(specs_list)):
+            spec_i, spec_j = specs_list[i], specs_list[j]
+            versions_i = spec_i.spec['SpecificationIfcVersion']
+            versions_j = spec_j.spec['SpecificationIfcVersion']
+            if not versions_i: break
+            if not versions_j: continue
+            if custom_functions.ifc_version_group_key(spec_i, separate_by) != custom_functions.ifc_version_group_key(spec_j, separate_by): continue
+            if all(version in versions_j for version in versions_i):
+                custom_functions.structure_specifications_by_Ifc_versions(spec_i, spec_j, versions_i, versions_j)
+            elif all(version in versions_i for version in versions_j):
+                custom_functions.structure_specifications_by_Ifc_versions(spec_j, spec_i, versions_j, versions_i)
+
+@pytest.mark.parametrize('seed', range(5))
+@pytest.mark.parametrize('separate_by', [[], ['Phase']])
+def test_groups_match_all_pairs(seed, separate_by):
+    specs_list = generate_specs(120, seed)
+    expected = generate_specs(120, seed)
+    custom_functions.structure_specs_list_by_Ifc_versions(specs_list, separate_by)
+    structure_all_pairs(expected, separate_by)
+    assert [spec.asdict() for spec in specs_list] == [spec.asdict() for spec in expected]
+
+def test_specific_versions_receive_general_requirements():
+    wall = (Facet({'Entity': ('IFCWALL',)}),)
+    general = Spec(wall, [Facet({'PropertySet': ('Pset_A',), 'Property': ('P1',)})], Facet(), Facet({'SpecificationIfcVersion': ('IFC4', 'IFC4X3_ADD2')}))
+    specific = Spec(wall, [Facet({'PropertySet': ('Pset_A',), 'Property': ('P2',)})], Facet(), Facet({'SpecificationIfcVersion': ('IFC4',)}))
+    other = Spec(wall, [], Facet(), Facet({'SpecificationCardinality': ('required',), 'SpecificationIfcVersion': ('IFC4',)}))
+    custom_functions.structure_specs_list_by_Ifc_versions([general, specific, other], [])
+    assert general.spec['SpecificationIfcVersion'] == ('IFC4X3_ADD2',)
+    assert [req['Property'] for req in specific.req] == [('P2',), ('P1',)]
+    #A specification with another cardinality is not structured
+    assert other.req == []
@@ -0,0 +1,38 @@
+'''Tests of the incremental state files.'''
+import os
+import pickle
+import ids4all
+from incremental import IncrementalState, load_state, save_state
+
+SAMPLE_WORKBOOK_PATH = os.path.join(os.path.dirname(__file__), '..', '..', '..', '..', 'sample', 'test.xlsx')
+KEY = b'secret'
+
+def test_signed_state_is_loaded(tmp_path):
+    path = str(tmp_path / 'test.state')
+    state = ids4all.load_incremental_state(None, KEY)
+    ids4all.convert_excel_to_ids(SAMPLE_WORKBOOK_PATH, 'test', incremental_state=state)
+    save_state(state, path, KEY)
+
+    loaded = ids4all.load_incremental_state(path, KEY)
+    assert loaded.settings == state.settings
+    assert {cache: len(results) for cache, results in loaded.caches.items()} == {cache: len(results) for cache, results in state.caches.items()}
+    diagnostics = {}
+    ids4all.convert_excel_to_ids(SAMPLE_WORKBOOK_PATH, 'test', diagnostics=diagnostics, incremental_state=loaded)
+    assert diagnostics['reprocessed_rows'] == 0
+
+def test_state_with_other_signature_is_not_unpickled(tmp_path, monkeypatch):
+    path = str(tmp_path / 'test.state')
+    save_state(IncrementalState('1'), path, b'other')
+
+    def fail_loads(data):
+        raise AssertionError('state was unpickled')
+    monkeypatch.setattr(pickle, 'loads', fail_loads)
+    assert load_state(path, '1', KEY).settings is None
+
+def test_unsigned_state_is_not_loaded_with_key(tmp_path):
+    path = str(tmp_path / 'test.state')
+    state = IncrementalState('1')
+    state.start(('settings',))
+    save_state(state, path)
+    assert load_state(path, '1', KEY).settings is None
+    assert load_state(path, '1').settings == ('settings',)
@@ -0,0 +1,59 @@
+'''Tests of merge_rows against the pandas groupby aggregation it replaces.'''
+import numpy as np
+import pandas as pd
+import pytest
+from custom_functions import KEYWORD_ROW, merge_rows
+
+def reference_merge_rows(df, group_columns, merged_columns, join_values):
+    #Previous implementation with pandas groupby and Python aggregation functions
+    if join_values:
+        function = lambda x: '|'.join(map(str, x.dropna()))
+    else:
+        function = lambda x: list(x)
+    aggregations = {column: function for column in merged_columns}
+    aggregations[KEYWORD_ROW] = 'first'
+    return df.groupby(group_columns, sort=False).agg(aggregations).reset_index()
+
+@pytest.fixture
+def df():
+    return pd.DataFrame({
+        'Entity': ['IFCWALL', 'IFCSLAB', 'IFCWALL', 'IFCWALL', 'IFCSLAB', 'IFCDOOR'],
+        'PropertySet': ['Pset_A', 'Pset_A', 'Pset_A', 'Pset_B', 'Pset_A', 'Pset_A'],
+        'Number': [1, 2, 1, 1, 2, 3],
+        'Value': ['a', np.nan, 'b', 'c', 'd', np.nan],
+        'Count': [1.5, 2.0, np.nan, 4.0, 5.0, 6.0],
+        KEYWORD_ROW: [2, 3, 4, 5, 6, 7],
+    })
+
+@pytest.mark.parametrize('join_values', [True, False])
+def test_merge_rows_matches_groupby(df, join_values):
+    group_columns = ['Entity', 'PropertySet', 'Number']
+    merged_columns = ['Value', 'Count']
+    expected = reference_merge_rows(df, group_columns, merged_columns, join_values)
+    merged = merge_rows(df, group_columns, merged_columns, join_values)
+    pd.testing.assert_frame_equal(merged, expected)
+
+def test_merged_rows_keep_order_and_first_row(df):
+    merged = merge_rows(df, ['Entity', 'PropertySet'], ['Value'], True)
+    assert merged[['Entity', 'PropertySet']].values.tolist() == [['IFCWALL', 'Pset_A'], ['IFCSLAB', 'Pset_A'], ['IFCWALL', 'Pset_B'], ['IFCDOOR', 'Pset_A']]
+    assert merged[KEYWORD_ROW].tolist() == [2, 3, 5, 7]
+    assert merged['Value'].tolist() == ['a|b', 'd', 'c', '']
+
+def test_object_columns_become_numeric_like_pandas():
+    df = pd.DataFrame({'Key': pd.Series([1, 2, 1], dtype=object), 'Flag': pd.Series([True, False, True], dtype=object),
+                       'Value': ['a', 'b', 'c'], KEYWORD_ROW: [2, 3, 4]})
+    merged = merge_rows(df, ['Key', 'Flag'], ['Value'], False)
+    pd.testing.assert_frame_equal(merged, reference_merge_rows(df, ['Key', 'Flag'], ['Value'], False))
+    assert merged['Value'].tolist() == [['a', 'c'], ['b']]
+
+def test_empty_dataframe():
+    df = pd.DataFrame({'Key': pd.Series([], dtype=object), 'Value': pd.Series([], dtype=object), KEYWORD_ROW: pd.Series([], dtype='int64')})
+    merged = merge_rows(df, ['Key'], ['Value'], True)
+    assert merged.empty
+    assert list(merged.columns) == ['Key', 'Value', KEYWORD_ROW]
+
+def test_equal_values_of_different_types_are_merged():
+    df = pd.DataFrame({'Key': pd.Series([1, True, 'x', 1.0], dtype=object), 'Value': ['a', 'b', 'c', 'd'], KEYWORD_ROW: [2, 3, 4, 5]})
+    merged = merge_rows(df, ['Key'], ['Value'], True)
+    pd.testing.assert_frame_equal(merged, reference_merge_rows(df, ['Key'], ['Value'], True))
+    assert merged['Value'].tolist() == ['a|b|d', 'c']
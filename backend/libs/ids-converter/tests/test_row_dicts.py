@@ -0,0 +1,47 @@
+'''Tests of the column-wise conversion of facet dataframes into dictionaries (dataframe_to_dicts, dataframe_to_dict_lists).
+The results must equal the row-wise conversion of each df.iloc[i] with pandas_row_to_dict and pandas_row_to_dict_list.
+'''
+import numpy as np
+import pandas as pd
+import pytest
+from custom_functions import KEYWORD_MISSING, dataframe_to_dict_lists, dataframe_to_dicts, pandas_row_to_dict, pandas_row_to_dict_list
+
+DATAFRAMES = {
+    #Merged rows contain lists of values, missing values are KEYWORD_MISSING
+    'merged': pd.DataFrame({
+        'Entity': [['IFCWALL', 'IFCWALL'], 'IFCSLAB|IFCBEAM', KEYWORD_MISSING, ['IFCDOOR', 'IFCWINDOW', 'IFCDOOR']],
+        'PropertySet': [['Pset_A', 'Pset_B'], 'Pset_A', 'Pset_C', [KEYWORD_MISSING, 'Pset_A', 'Pset_B']],
+        'Property': [['P1', KEYWORD_MISSING], 'P2', ' A \\&B|_MISSING_|A ', ['P3', 'P4', 'P5']],
+        'PropertyValue': [['1', '2,5'], KEYWORD_MISSING, np.nan, [KEYWORD_MISSING, KEYWORD_MISSING, KEYWORD_MISSING]],
+    }),
+    'duplicate_columns': pd.DataFrame([['LP1', 'LP2|LP1', np.nan], [np.nan, 'Architect', 3]], columns=['Phase', 'Phase.1', 'Role']),
+    #Numeric columns are converted to numpy scalars, like df.iloc[i]
+    'numeric': pd.DataFrame({'Value': [1, 2, 3], 'Other': [1.5, np.nan, 2.0]}),
+    'empty': pd.DataFrame({'Entity': []}, dtype=object),
+}
+
+def value_types(value):
+    '''Returns the value with the types of all contained values, so that 1 and np.int64(1) are distinguished.'''
+    if isinstance(value, dict):
+        return {key: value_types(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [value_types(item) for item in value]
+    return (type(value), value if value == value else 'nan')
+
+@pytest.mark.parametrize('name', DATAFRAMES)
+def test_dicts_equal_row_wise_conversion(name):
+    df = DATAFRAMES[name]
+    expected = [pandas_row_to_dict(df.iloc[i]) for i in range(len(df))]
+    assert value_types(dataframe_to_dicts(df)) == value_types(expected)
+
+@pytest.mark.parametrize('name', [name for name in DATAFRAMES if name != 'duplicate_columns'])
+def test_dict_lists_equal_row_wise_conversion(name):
+    df = DATAFRAMES[name]
+    expected = [pandas_row_to_dict_list(df.iloc[i]) for i in range(len(df))]
+    assert value_types(dataframe_to_dict_lists(df)) == value_types(expected)
+
+def test_dict_lists_split_facets():
+    dict_lists = dataframe_to_dict_lists(DATAFRAMES['merged'])
+    assert dict_lists[0] == [{'Entity': 'IFCWALL', 'PropertySet': 'Pset_A', 'Property': 'P1', 'PropertyValue': '1'},
+                             {'Entity': 'IFCWALL', 'PropertySet': 'Pset_B', 'PropertyValue': '2,5'}]
+    assert dataframe_to_dicts(DATAFRAMES['merged'])[1] == {'Entity': ['IFCSLAB', 'IFCBEAM'], 'PropertySet': ['Pset_A'], 'Property': ['P2']}
@@ -0,0 +1,64 @@
+'''Tests of merging the specifications of all rows by merge key (merge_row_expansions).
+
+Combinations with equal specification cardinality and ifc versions, equal file separator values and an equal applicability
+are merged into one specification, like the previous pairwise comparison of every combination with all created specifications.
+'''
+from custom_functions import merge_row_expansions, spec_merge_key
+from spec_model import Facet
+
+WALL = Facet({'Entity': ('IFCWALL',)})
+SLAB = Facet({'Entity': ('IFCSLAB',)})
+EXTERNAL = Facet({'PropertySet': ('Pset_Common',), 'Property': ('IsExternal',), 'PropertyValue': ('TRUE',)})
+IFC4 = Facet({'SpecificationIfcVersion': ('IFC4',)})
+
+def requirement(name, value=None):
+    items = {'PropertySet': ('Pset_A',), 'Property': (name,)}
+    if value is not None:
+        items['PropertyValue'] = (value,)
+    return Facet(items)
+
+def row(combinations, requirements, general=(), spec=IFC4):
+    '''Creates the expansion of one row (see expand_row).'''
+    return Facet(general), spec, tuple(combinations), tuple(requirements), (), len(combinations)
+
+def test_equal_applicability_is_merged():
+    specs = merge_row_expansions([
+        row([(WALL, EXTERNAL), (SLAB,)], [requirement('P1')]),
+        #Equal facets with their parameters in another order
+        row([(WALL, Facet({'PropertyValue': ('TRUE',), 'Property': ('IsExternal',), 'PropertySet': ('Pset_Common',)}))], [requirement('P2')]),
+        row([(SLAB,)], [requirement('P1', 'A')]),
+    ], [])
+    assert [spec.app for spec in specs] == [(WALL, EXTERNAL), (SLAB,)]
+    assert specs[0].req == [requirement('P1'), requirement('P2')]
+    #Requirements that only differ in their values are merged
+    assert specs[1].req == [requirement('P1').merge(requirement('P1', 'A'))]
+
+def test_separators_and_specification_data_separate_specifications():
+    required = Facet({'SpecificationCardinality': ('required',), 'SpecificationIfcVersion': ('IFC4',)})
+    specs = merge_row_expansions([
+        row([(WALL,)], [requirement('P1')], {'Phase': ('LP1',), 'Role': ('Architect',)}),
+        row([(WALL,)], [requirement('P2')], {'Phase': ('LP2',)}),
+        row([(WALL,)], [requirement('P3')], {'Phase': ('LP1',), 'Role': ('Engineer',)}),
+        row([(WALL,)], [requirement('P4')], {'Phase': ('LP1',)}, required),
+        row([(WALL,)], [requirement('P5')], {'Phase': ('LP1',)}, Facet({'SpecificationIfcVersion': ('IFC2X3',)})),
+    ], ['Phase'])
+    assert [[req['Property'][0] for req in spec.req] for spec in specs] == [['P1', 'P3'], ['P2'], ['P4'], ['P5']]
+    #General data that does not separate specifications is merged
+    assert specs[0].general == Facet({'Phase': ('LP1',), 'Role': ('Architect', 'Engineer')})
+
+def test_specifications_keep_creation_order():
+    specs = merge_row_expansions([
+        row([(SLAB,)], []),
+        row([(WALL,)], [requirement('P1')]),
+        row([(SLAB,)], [requirement('P2')]),
+    ], [])
+    assert [spec.app for spec in specs] == [(SLAB,), (WALL,)]
+    assert specs[0].req == [requirement('P2')]
+
+def test_empty_combination_does_not_create_specification():
+    assert merge_row_expansions([row([()], [])], []) == []
+
+def test_merge_key_ignores_non_separating_data():
+    key = spec_merge_key(Facet({'Phase': ('LP1',), 'Role': ('Architect',)}), Facet({'SpecificationIfcVersion': ('IFC4',), 'SpecificationName': ('A',)}), (WALL,), ['Phase'])
+    assert key == spec_merge_key(Facet({'Phase': ('LP1',)}), Facet({'SpecificationName': ('B',), 'SpecificationIfcVersion': ('IFC4',)}), (WALL,), ['Phase'])
+    assert key != spec_merge_key(Facet({'Role': ('Architect',)}), IFC4, (WALL,), ['Phase'])
@@ -0,0 +1,55 @@
+'''Tests of the immutable facet and specification model (spec_model.py).'''
+import pickle
+import pytest
+from spec_model import Facet, Spec
+
+def test_equality_and_hash_ignore_key_order():
+    facet = Facet({'PropertySet': ['Pset_A'], 'Property': ['P1']})
+    reordered = Facet([('Property', ('P1',)), ('PropertySet', ('Pset_A',))])
+    assert facet == reordered
+    assert hash(facet) == hash(reordered)
+    assert len({facet, reordered}) == 1
+    assert facet != Facet({'PropertySet': ['Pset_A'], 'Property': ['P2']})
+    assert facet != Facet({'PropertySet': ['Pset_A']})
+    assert facet != {'PropertySet': ('Pset_A',), 'Property': ('P1',)}
+
+def test_facet_is_read_only_mapping():
+    values = ['IFCWALL']
+    facet = Facet({'Entity': values})
+    values.append('IFCSLAB')
+    assert facet['Entity'] == ('IFCWALL',)
+    assert list(facet) == ['Entity'] and 'Entity' in facet and len(facet) == 1
+    assert facet.get('Property') is None
+    with pytest.raises(TypeError):
+        facet['Entity'] = ('IFCSLAB',)
+
+def test_values_are_interned():
+    first = Facet({'Entity': [''.join(['IFC', 'WALL'])]})
+    second = Facet({'Entity': [''.join(['IFCW', 'ALL'])]})
+    assert first['Entity'][0] is second['Entity'][0]
+
+def test_merge_appends_unique_values():
+    facet = Facet({'Phase': ['LP1', 'LP2'], 'Role': ['Architect'], 'Count': 1})
+    merged = facet.merge(Facet({'Phase': ['LP2', 'LP3', 'LP1'], 'Usecase': ['Check'], 'Count': 2}))
+    assert merged.asdict() == {'Phase': ['LP1', 'LP2', 'LP3'], 'Role': ['Architect'], 'Count': 2, 'Usecase': ['Check']}
+    #The merged facets are not altered
+    assert facet.asdict() == {'Phase': ['LP1', 'LP2'], 'Role': ['Architect'], 'Count': 1}
+    #Nothing is added, so the facet itself is returned
+    assert facet.merge(Facet({'Phase': ['LP2']})) is facet
+    assert facet.merge(Facet()) is facet
+
+def test_replace():
+    facet = Facet({'SpecificationIfcVersion': ['IFC4', 'IFC4X3_ADD2'], 'SpecificationName': ['A']})
+    assert facet.replace('SpecificationIfcVersion', ('IFC4',)).asdict() == {'SpecificationIfcVersion': ['IFC4'], 'SpecificationName': ['A']}
+    assert facet.replace('SpecificationCardinality', ['required'])['SpecificationCardinality'] == ('required',)
+    assert facet['SpecificationIfcVersion'] == ('IFC4', 'IFC4X3_ADD2')
+
+def test_pickle_round_trip():
+    app = (Facet({'Entity': ['IFCWALL'], 'PredefinedType': ['SOLIDWALL']}),)
+    spec = Spec(app, [Facet({'PropertySet': ['Pset_A'], 'Property': ['P1']})], Facet({'Phase': ['LP1']}), Facet({'SpecificationIfcVersion': ['IFC4']}))
+    loaded = pickle.loads(pickle.dumps(spec))
+    assert loaded.asdict() == spec.asdict()
+    assert loaded.app == app and hash(loaded.app) == hash(app)
+    assert loaded.app[0]['Entity'][0] is app[0]['Entity'][0]
+    assert spec.asdict() == {'app': [{'Entity': ['IFCWALL'], 'PredefinedType': ['SOLIDWALL']}], 'req': [{'PropertySet': ['Pset_A'], 'Property': ['P1']}],
+                             'general': {'Phase': ['LP1']}, 'spec': {'SpecificationIfcVersion': ['IFC4']}}
@@ -0,0 +1,62 @@
+'''Tests of the workbook session, which loads a workbook once instead of reading it with pd.read_excel three times.'''
+import datetime
+import os
+import openpyxl
+import pandas as pd
+import pytest
+import ids4all
+import workbook_session
+from workbook_session import WorkbookSession
+
+SAMPLE_WORKBOOK_PATH = os.path.join(os.path.dirname(__file__), '..', '..', '..', '..', 'sample', 'test.xlsx')
+
+@pytest.fixture
+def edge_case_workbook(tmp_path):
+    '''Writes a workbook with skipped rows, duplicate column names, empty, numeric, error and date cells and trailing empty rows.'''
+    path = str(tmp_path / 'edge_cases.xlsx')
+    workbook = openpyxl.Workbook()
+    metadata = workbook.active
+    metadata.title = 'IDS4ALL'
+    for row in [['Entry', 'Value'], ['Sheet name', 'Specifications'], ['Skipped rows', 1], ['IFC version', 'IFC4'], ['Title', None], [None, None]]:
+        metadata.append(row)
+    sheet = workbook.create_sheet('Specifications')
+    sheet.append(['Skipped title row'])
+    sheet.append(['A.Entity', 'R.Property', 'R.Property', 'R.PropertyValue', 'Date', None])
+    sheet.append(['IFCWALL', 'P1', 'P2', 1.0, datetime.datetime(2024, 1, 2), None])
+    sheet.append([None, None, None, None, None, None])
+    sheet.append(['IFCSLAB|IFCBEAM', 'P3', None, 2.5, None, None])
+    sheet.append(['IFCDOOR', '#N/A', 'P4', '#DIV/0!', None, None])
+    sheet.append([None, None, None, None, None, None])
+    workbook.save(path)
+    return path
+
+@pytest.mark.parametrize('path', ['sample', 'edge_cases'])
+def test_reads_equal_read_excel(path, edge_case_workbook):
+    path = SAMPLE_WORKBOOK_PATH if path == 'sample' else edge_case_workbook
+    with WorkbookSession(path) as session:
+        metadata = session.read_metadata()
+        pd.testing.assert_frame_equal(metadata, pd.read_excel(path, sheet_name='IDS4ALL', header=None, skiprows=1, usecols=[0, 1]))
+        data_dict = {key: value for key, value in zip(metadata[0], metadata[1]) if pd.notna(value)}
+        sheet_name, skipped_rows = data_dict['Sheet name'], data_dict.get('Skipped rows', 0)
+
+        columns = session.columns(sheet_name, skipped_rows)
+        assert columns == pd.read_excel(path, sheet_name=sheet_name, skiprows=skipped_rows, nrows=0).columns.tolist()
+        usecols = columns[::2]
+        pd.testing.assert_frame_equal(session.read_columns(sheet_name, skipped_rows, usecols),
+                                      pd.read_excel(path, sheet_name=sheet_name, skiprows=skipped_rows, usecols=usecols))
+
+@pytest.mark.parametrize('source', ['path', 'bytes', 'file'])
+def test_conversion_loads_workbook_once(source, monkeypatch):
+    loads = []
+    load_workbook = openpyxl.load_workbook
+    def counting_load_workbook(*args, **kwargs):
+        loads.append(args)
+        return load_workbook(*args, **kwargs)
+    monkeypatch.setattr(workbook_session.openpyxl, 'load_workbook', counting_load_workbook)
+
+    with open(SAMPLE_WORKBOOK_PATH, 'rb') as file:
+        excel_source = {'path': SAMPLE_WORKBOOK_PATH, 'bytes': file.read(), 'file': file}[source]
+        file.seek(0)
+        documents = ids4all.convert_excel_to_ids(excel_source, 'test')
+    assert [document['specification_count'] for document in documents] == [158]
+    assert len(loads) == 1
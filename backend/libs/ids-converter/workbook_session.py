@@ -0,0 +1,166 @@
+'''Workbook session for the IDS4ALL converter.
+
+Opens an IDS4ALL workbook once (openpyxl read-only mode) and serves the IDS4ALL metadata sheet, the
+header row and the columns of the specification sheet from that single load. Previously the workbook
+was loaded by pandas three times (metadata, header with nrows=0 and data with usecols).
+'''
+import io
+import os
+import numpy as np
+import openpyxl
+from openpyxl.cell.cell import ERROR_CODES
+from pandas.io.parsers import TextParser
+
+METADATA_SHEET_NAME = 'IDS4ALL'
+
+class WorkbookSession:
+    '''Workbook opened once for all reads of one conversion.
+
+    The workbook is loaded once in openpyxl read-only mode and each sheet is streamed once as plain values.
+    The values are converted and parsed like pd.read_excel does (openpyxl cell conversion and pandas TextParser),
+    so the resulting data frames are equal to the ones of the corresponding pd.read_excel calls.
+    Can be used as context manager.
+    '''
+
+    def __init__(self, excel_source):
+        '''
+        :param excel_source: Path to an excel file, raw workbook bytes or a file-like object
+        :type excel_source: str or bytes or file-like object
+        '''
+        self.workbook = openpyxl.load_workbook(normalise_excel_source(excel_source), read_only=True, data_only=True, keep_links=False)
+        self._sheet_data = {}
+
+    def sheet_data(self, sheet_name):
+        '''Streams a sheet once and returns its converted cell values. The values are kept until read_columns is called for the sheet.
+
+        :param sheet_name: Name of the sheet
+        :type sheet_name: str
+        :return: List of rows (lists of cell values) of equal length
+        :rtype: list
+        '''
+        if sheet_name not in self._sheet_data:
+            sheet = self.workbook[sheet_name]
+            sheet.reset_dimensions()
+            data = []
+            last_row_with_data = -1
+            for row_number, row in enumerate(sheet.iter_rows(values_only=True)):
+                converted_row = [convert_cell_value(value) for value in row]
+                #Trim trailing empty cells and rows like pd.read_excel
+                while converted_row and converted_row[-1] == '':
+                    converted_row.pop()
+                if converted_row:
+                    last_row_with_data = row_number
+                data.append(converted_row)
+            data = data[:last_row_with_data + 1]
+            if data:
+                max_width = max(len(row) for row in data)
+                data = [row + [''] * (max_width - len(row)) for row in data]
+            self._sheet_data[sheet_name] = data
+        return self._sheet_data[sheet_name]
+
+    def read_metadata(self):
+        '''Reads the first two columns of the IDS4ALL sheet (entries and values) without header.
+
+        :return: Data frame with the entries in column 0 and the values in column 1
+        :rtype: Pandas dataframe
+        '''
+        return parse_sheet_data(self.sheet_data(METADATA_SHEET_NAME), header=None, skiprows=1, usecols=[0, 1])
+
+    def columns(self, sheet_name, skipped_rows):
+        '''Returns the column names of a sheet (duplicate names are numbered by pandas with name.1, name.2 ...).
+
+        :param sheet_name: Name of the sheet
+        :type sheet_name: str
+        :param skipped_rows: Number of skipped rows at the top of the sheet
+        :type skipped_rows: int
+        :return: List of column names
+        :rtype: list
+        '''
+        return parse_sheet_data(self.sheet_data(sheet_name), header=0, skiprows=skipped_rows, nrows=0).columns.tolist()
+
+    def read_columns(self, sheet_name, skipped_rows, usecols):
+        '''Returns the given columns of a sheet in the order of the sheet, like pd.read_excel with usecols.
+        The values of the sheet are released afterwards, since only the returned columns are used from then on.
+
+        :param sheet_name: Name of the sheet
+        :type sheet_name: str
+        :param skipped_rows: Number of skipped rows at the top of the sheet
+        :type skipped_rows: int
+        :param usecols: Column names to return (must exist in the sheet)
+        :type usecols: list
+        :return: Data frame containing the given columns
+        :rtype: Pandas dataframe
+        '''
+        data = self.sheet_data(sheet_name)
+        self._sheet_data.pop(sheet_name)
+        return parse_sheet_data(data, header=0, skiprows=skipped_rows, usecols=usecols)
+
+    def close(self):
+        '''Closes the workbook and releases all streamed sheets.'''
+        self._sheet_data.clear()
+        self.workbook.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+def convert_cell_value(value):
+    '''Converts a cell value like pd.read_excel does for openpyxl cells:
+    empty cells become empty strings, error values become NaN and floats without decimal places become integers.
+
+    :param value: Cell value
+    :type value: str, int, float, bool, datetime or None
+    :return: Converted cell value
+    :rtype: str, int, float, bool or datetime
+    '''
+    if value is None:
+        return ''
+    if isinstance(value, str) and value in ERROR_CODES:
+        return np.nan
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+def parse_sheet_data(data, header, skiprows, usecols=None, nrows=None):
+    '''Parses converted cell values into a data frame with the same parser and options as pd.read_excel.
+
+    :param data: Rows of cell values created by WorkbookSession.sheet_data
+    :type data: list
+    :return: Data frame
+    :rtype: Pandas dataframe
+    '''
+    parser = TextParser(data, header=header, skiprows=skiprows, usecols=usecols, nrows=nrows, skip_blank_lines=False)
+    return parser.read(nrows=nrows)
+
+def normalise_excel_source(excel_source):
+    '''Normalises the given workbook source so that it can be opened by openpyxl.
+
+    :param excel_source: Path to an excel file, raw workbook bytes or a file-like object
+    :type excel_source: str or bytes or file-like object
+    :return: Path or seekable in-memory buffer of the workbook
+    :rtype: str or io.BytesIO
+    '''
+    if isinstance(excel_source, (str, os.PathLike)):
+        return excel_source
+    if isinstance(excel_source, (bytes, bytearray, memoryview)):
+        return io.BytesIO(bytes(excel_source))
+    if hasattr(excel_source, 'read'):
+        if hasattr(excel_source, 'seek') and hasattr(excel_source, 'seekable') and excel_source.seekable():
+            excel_source.seek(0)
+            return excel_source
+        return io.BytesIO(excel_source.read())
+    raise TypeError('Unsupported excel source: ' + type(excel_source).__name__)
+
+def open_workbook_session(excel_source):
+    '''Returns the given workbook session or opens a new one for a path, bytes or file-like object.
+
+    :param excel_source: Workbook session, path to an excel file, raw workbook bytes or a file-like object
+    :type excel_source: WorkbookSession or str or bytes or file-like object
+    :return: Workbook session
+    :rtype: WorkbookSession
+    '''
+    if isinstance(excel_source, WorkbookSession):
+        return excel_source
+    return WorkbookSession(excel_source)
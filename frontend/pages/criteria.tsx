@@ -39,6 +39,13 @@ export default function Criteria() {
       const formData = new FormData()
       formData.append('excel_file', file)
 
+      // 증분 변환: 이 브라우저에서 같은 이름으로 마지막에 변환한 워크북의 해시를 함께 전송
+      const baseHashKey = `ids-workbook-hash:${file.name}`
+      const baseHash = window.localStorage.getItem(baseHashKey)
+      if (baseHash) {
+        formData.append('excel_base_hash', baseHash)
+      }
+
       // 비동기 변환 요청 (task_id 수신)
       const kickResponse = await fetch('/api/excel-to-ids/', {
         method: 'POST',
@@ -82,6 +89,9 @@ export default function Criteria() {
               reject(new Error(status.error || '작업이 실패했습니다.'))
             } else if (status.state === 'SUCCESS') {
               clearInterval(interval)
+              if (kickData.workbook_hash) {
+                window.localStorage.setItem(baseHashKey, kickData.workbook_hash)
+              }
               // 완료되면 결과 파일 다운로드 요청
               const dlRes = await fetch(`/api/download-result/${kickData.task_id}/`)
               if (!dlRes.ok) {